@@ -0,0 +1,82 @@
+"""
+Compare JSON and MessagePack payload size and encode/decode CPU time for large order lists.
+
+Usage: python benchmarks/bench_msgpack.py [--orders 10000] [--repeat 5]
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+from decimal import Decimal
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'customer_order_service.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from customerorder.catalog import catalog  # noqa: E402
+from customerorder.models import Order, OrderStatus, User  # noqa: E402
+from customerorder.renderers import MessagePackParser, MessagePackRenderer  # noqa: E402
+from customerorder.serializers import OrderSerializer  # noqa: E402
+
+
+def build_payload(count):
+    """
+    Serialize `count` in-memory orders the same way OrderListView does.
+    """
+    customer = User(id=1, username='benchmark', email='benchmark@example.com')
+    now = datetime.datetime.now(datetime.timezone.utc)
+    statuses = OrderStatus.values
+    # Item names are served from a warm catalog cache, as in a long-running worker.
+    catalog._remember([(f'Item {n}', n + 1) for n in range(500)])
+    orders = [
+        Order(id=i, customer=customer, catalog_item_id=i % 500 + 1, amount=Decimal(i % 10000) + Decimal('0.99'),
+              status=statuses[i % len(statuses)], created_at=now, order_number=f'IT{now:%Y%m%d%H%M%S}{i:06d}')
+        for i in range(count)
+    ]
+    return OrderSerializer(orders, many=True).data
+
+
+def cpu_time(func, repeat):
+    """
+    Best-of-`repeat` process CPU time for one call of `func`.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        func()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    data = build_payload(args.orders)
+    formats = [
+        ('json', JSONRenderer(), JSONParser()),
+        ('msgpack', MessagePackRenderer(), MessagePackParser()),
+    ]
+
+    print(f"{args.orders} orders, best of {args.repeat}")
+    print(f"{'format':<10}{'bytes':>12}{'encode ms':>12}{'decode ms':>12}")
+    for name, renderer, parser_ in formats:
+        body = renderer.render(data)
+        encode = cpu_time(lambda: renderer.render(data), args.repeat)
+        decode = cpu_time(lambda: parser_.parse(BytesIO(body)), args.repeat)
+        print(f"{name:<10}{len(body):>12}{encode * 1000:>12.1f}{decode * 1000:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
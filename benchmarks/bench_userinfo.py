@@ -0,0 +1,64 @@
+"""
+Measure OIDC userinfo claim building in calls/second.
+
+Each userinfo call mirrors the provider's userinfo endpoint: a freshly loaded user and both
+the standard and the custom scope claims classes building their response. build_claims alone
+is timed for comparison.
+
+Usage: python benchmarks/bench_userinfo.py [--calls 20000]
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'customer_order_service.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from oidc_provider.lib.claims import StandardScopeClaims  # noqa: E402
+from oidc_provider.models import Client, Token  # noqa: E402
+
+from customerorder.claims import build_claims  # noqa: E402
+from customerorder.models import User  # noqa: E402
+from customerorder.oidc_views import CustomScopeClaims  # noqa: E402
+
+TEMPLATE_USER = User(id=1, username='benchmark', email='benchmark@example.com', first_name='Bench',
+                     last_name='Mark', phone_number='+254700000000', customer_code='CUST2024092112000001')
+CLIENT = Client(name='benchmark', client_id='benchmark')
+
+
+def userinfo_call():
+    """
+    Build the userinfo response the way the provider does for one request.
+    """
+    user = copy.copy(TEMPLATE_USER)  # Each request loads its own User instance
+    token = Token(user=user, client=CLIENT)
+    token.scope = ['openid', 'profile', 'email', 'phone', 'customer']
+    response = StandardScopeClaims(token).create_response_dic()
+    response.update(CustomScopeClaims(token).create_response_dic())
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'call':<14}{'calls/s':>12}")
+    for label, call in (('userinfo', userinfo_call), ('build_claims', lambda: build_claims(TEMPLATE_USER))):
+        call()
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            call()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<14}{args.calls / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Measure webhook delivery throughput in deliveries/second against a local stub receiver.
+
+Queues `--events` deliveries for each of `--endpoints` subscriptions in a scratch SQLite
+database and times WebhookWorker rounds until all of them are delivered.
+
+Usage: python benchmarks/bench_webhooks.py [--endpoints 3] [--events 1000] [--delay 0.01]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'customer_order_service.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+SCRATCH_DIR = tempfile.TemporaryDirectory()
+settings.DATABASES['default']['NAME'] = os.path.join(SCRATCH_DIR.name, 'bench.sqlite3')
+django.setup()
+
+from aiohttp import ClientSession, web  # noqa: E402
+from asgiref.sync import sync_to_async  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+
+from customerorder import events, webhooks  # noqa: E402
+from customerorder.models import DeliveryStatus, WebhookDelivery, WebhookSubscription  # noqa: E402
+
+
+async def start_receiver(delay):
+    """
+    Start a local endpoint that accepts every batch after `delay` seconds.
+    """
+    async def handle(request):
+        await request.read()
+        await asyncio.sleep(delay)
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_post('/{tail:.*}', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    return runner, f'http://127.0.0.1:{runner.addresses[0][1]}'
+
+
+def queue_deliveries(base_url, endpoints, count):
+    WebhookDelivery.objects.all().delete()
+    WebhookSubscription.objects.all().delete()
+    subscriptions = [WebhookSubscription.objects.create(url=f'{base_url}/{n}', max_concurrency=2)
+                     for n in range(endpoints)]
+    WebhookDelivery.objects.bulk_create(
+        WebhookDelivery(subscription=subscription, event_type=events.ORDER_CREATED, payload={'n': n})
+        for subscription in subscriptions for n in range(count)
+    )
+
+
+async def run(args):
+    runner, base_url = await start_receiver(args.delay)
+    try:
+        await sync_to_async(queue_deliveries)(base_url, args.endpoints, args.events)
+        worker = webhooks.WebhookWorker(batch_size=args.batch_size)
+        started = time.perf_counter()
+        attempted = 0
+        async with ClientSession() as session:
+            while attempted < args.endpoints * args.events:
+                sent = await worker.run_once(session)
+                if not sent:
+                    break
+                attempted += sent
+        elapsed = time.perf_counter() - started
+        delivered = await sync_to_async(
+            WebhookDelivery.objects.filter(status=DeliveryStatus.DELIVERED).count
+        )()
+    finally:
+        await runner.cleanup()
+    return delivered, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoints', type=int, default=3)
+    parser.add_argument('--events', type=int, default=1000, help="Deliveries queued per endpoint.")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--delay', type=float, default=0.01, help="Receiver response time in seconds.")
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    delivered, elapsed = asyncio.run(run(args))
+    print(f"{'delivered':<12}{'seconds':>10}{'deliveries/s':>16}")
+    print(f"{delivered:<12}{elapsed:>10.2f}{delivered / elapsed:>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Load test comparing `manage.py runserver` with the Gunicorn production entry point.
+
+Starts each server on a local port, drives it with concurrent keep-alive clients
+for a fixed duration, and reports requests/second plus RSS and PSS (proportional
+set size, which credits shared copy-on-write pages fairly) per server process.
+
+Usage: python benchmarks/loadtest.py [--path /healthz/] [--duration 10] [--clients 16] [--workers 4]
+Linux only: memory is read from /proc.
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def process_tree(pid):
+    """
+    Return `pid` and all of its descendants.
+    """
+    pids = [pid]
+    for child in Path(f'/proc/{pid}/task/{pid}/children').read_text().split():
+        pids.extend(process_tree(int(child)))
+    return pids
+
+
+def memory_kb(pid):
+    """
+    Return (rss, pss) in kB for one process.
+    """
+    rss = pss = 0
+    for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines():
+        if line.startswith('Rss:'):
+            rss = int(line.split()[1])
+        elif line.startswith('Pss:'):
+            pss = int(line.split()[1])
+    return rss, pss
+
+
+def wait_until_ready(port, timeout=60):
+    """
+    Poll the liveness endpoint until the server answers.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/healthz/')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def drive(port, path, duration, clients):
+    """
+    Hammer `path` from `clients` threads for `duration` seconds; return (requests, errors).
+    """
+    counts = [0] * clients
+    errors = [0] * clients
+    stop_at = time.monotonic() + duration
+
+    def client(index):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        while time.monotonic() < stop_at:
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status < 500:
+                    counts[index] += 1
+                else:
+                    errors[index] += 1
+            except OSError:
+                errors[index] += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts), sum(errors)
+
+
+def run(name, command, port, env, args):
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(port)
+        requests, errors = drive(port, args.path, args.duration, args.clients)
+        pids = process_tree(server.pid)
+        memory = [memory_kb(pid) for pid in pids]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    rss = [m[0] for m in memory]
+    pss = [m[1] for m in memory]
+    print(f"{name:<10}{requests / args.duration:>10.0f}{errors:>8}{len(pids):>7}"
+          f"{max(rss) / 1024:>12.1f}{sum(pss) / 1024:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--path', default='/healthz/')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    env = dict(os.environ, DEBUG='False', WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads))
+    servers = [
+        ('runserver', [sys.executable, 'manage.py', 'runserver', '--noreload', '127.0.0.1:8101'], 8101),
+        ('gunicorn', [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', '127.0.0.1:8102',
+                      '--access-logfile', '/dev/null', 'customer_order_service.wsgi:application'], 8102),
+    ]
+
+    print(f"GET {args.path} for {args.duration:.0f}s with {args.clients} clients")
+    print(f"{'server':<10}{'req/s':>10}{'errors':>8}{'procs':>7}{'max RSS MB':>12}{'total PSS MB':>14}")
+    for name, command, port in servers:
+        run(name, command, port, env, args)
+
+
+if __name__ == '__main__':
+    main()
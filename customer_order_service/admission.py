@@ -0,0 +1,236 @@
+"""
+Adaptive admission control.
+
+Every API request is classified into a route group (auth, order reads, order writes).
+Each group has a concurrency limit that adapts to the latency it observes: it grows by
+about one per round of fast responses and shrinks multiplicatively when responses
+exceed the group's latency target or fail. Requests over their group's limit, or over
+the process capacity, are turned away at once with 503 and `Retry-After` instead of
+occupying a worker thread behind a slow dependency. Low-priority groups (login and
+writes, which call Firebase or the SMS provider) may not use the last
+ADMISSION_READ_RESERVE fraction of the capacity, so cheap reads keep flowing.
+
+Limits are per process: with gunicorn's gthread worker the capacity should match
+GUNICORN_THREADS.
+"""
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+from django.urls import Resolver404, resolve
+
+HIGH_PRIORITY = 'high'
+LOW_PRIORITY = 'low'
+
+AUTH_ROUTES = {'login', 'register'}
+ORDER_ROUTES = {'order-list', 'order-create', 'order-search', 'order-detail', 'order-report'}
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+DEFAULT_GROUPS = {
+    'auth': {'target_latency': 1.0, 'priority': LOW_PRIORITY},
+    'order_reads': {'target_latency': 0.3, 'priority': HIGH_PRIORITY},
+    'order_writes': {'target_latency': 1.0, 'priority': LOW_PRIORITY},
+}
+
+
+def route_group(request):
+    """
+    Returns the admission group for a request, or None for routes that are not limited
+    (health probes, admin, schema, the event stream).
+    """
+    try:
+        url_name = resolve(request.path_info).url_name
+    except Resolver404:
+        return None
+    if url_name in AUTH_ROUTES:
+        return 'auth'
+    if url_name in ORDER_ROUTES:
+        return 'order_reads' if request.method in READ_METHODS else 'order_writes'
+    return None
+
+
+class AdaptiveLimit:
+    """
+    AIMD concurrency limit for one route group, driven by observed latency.
+    Not thread-safe on its own; the controller serialises access.
+    """
+
+    def __init__(self, name, target_latency, priority=HIGH_PRIORITY, initial_limit=4, min_limit=1,
+                 max_limit=64, backoff=0.7, smoothing=0.2):
+        self.name = name
+        self.target_latency = target_latency
+        self.priority = priority
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.latency = None
+        self.accepted = 0
+        self.rejected = 0
+        self.last_decrease = 0.0
+
+    @property
+    def current(self):
+        return max(self.min_limit, int(self.limit))
+
+    def record(self, latency, failed, now):
+        """
+        Fold one completed request into the latency average and adjust the limit.
+        """
+        self.latency = latency if self.latency is None else (
+            self.smoothing * latency + (1 - self.smoothing) * self.latency)
+        if failed or latency > self.target_latency:
+            # Requests that were already in flight will report the same slowdown; only
+            # back off once per target period so the limit does not collapse to the floor.
+            if now - self.last_decrease >= self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def retry_after(self):
+        """
+        Seconds a rejected client should wait: roughly the time for the group to drain.
+        """
+        return min(30, max(1, math.ceil(self.latency or self.target_latency)))
+
+
+class AdmissionController:
+    """
+    Decides, per request, whether there is room for it, and learns from how it went.
+    """
+
+    def __init__(self, groups, capacity, read_reserve=0.25, clock=time.monotonic):
+        self.capacity = capacity
+        self.reserved = math.ceil(capacity * read_reserve)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.groups = {
+            name: AdaptiveLimit(name, initial_limit=capacity, max_limit=capacity, **options)
+            for name, options in groups.items()
+        }
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            getattr(settings, 'ADMISSION_GROUPS', DEFAULT_GROUPS),
+            capacity=getattr(settings, 'ADMISSION_CAPACITY', 4),
+            read_reserve=getattr(settings, 'ADMISSION_READ_RESERVE', 0.25),
+        )
+
+    @property
+    def in_flight(self):
+        return sum(group.in_flight for group in self.groups.values())
+
+    def acquire(self, name):
+        """
+        Admit a request to a group. Returns a ticket to pass to release(), or None if rejected.
+        """
+        group = self.groups[name]
+        with self.lock:
+            in_flight = self.in_flight
+            available = self.capacity - (self.reserved if group.priority == LOW_PRIORITY else 0)
+            if group.in_flight >= group.current or in_flight >= available:
+                group.rejected += 1
+                return None
+            group.in_flight += 1
+            group.accepted += 1
+        return group, self.clock()
+
+    def release(self, ticket, failed=False):
+        group, started = ticket
+        now = self.clock()
+        with self.lock:
+            group.in_flight -= 1
+            group.record(now - started, failed, now)
+
+    def metrics(self):
+        """
+        Render the limiter state in the Prometheus text exposition format.
+        """
+        lines = [
+            '# TYPE admission_capacity gauge',
+            f'admission_capacity {self.capacity}',
+        ]
+        samples = {
+            'admission_limit': ('gauge', lambda g: g.current),
+            'admission_in_flight': ('gauge', lambda g: g.in_flight),
+            'admission_latency_seconds': ('gauge', lambda g: g.latency or 0),
+            'admission_accepted_total': ('counter', lambda g: g.accepted),
+            'admission_rejected_total': ('counter', lambda g: g.rejected),
+        }
+        with self.lock:
+            for metric, (kind, value) in samples.items():
+                lines.append(f'# TYPE {metric} {kind}')
+                lines.extend(f'{metric}{{group="{name}"}} {value(group)}' for name, group in self.groups.items())
+        return '\n'.join(lines) + '\n'
+
+
+admission_controller = AdmissionController.from_settings()
+
+
+class AdmissionControlMiddleware:
+    """
+    Sheds API requests that their route group has no room for. See the module docstring.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response, controller=None):
+        if not getattr(settings, 'ADMISSION_CONTROL_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.controller = controller or admission_controller
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        group = route_group(request)
+        if group is None:
+            return self.get_response(request)
+        ticket = self.controller.acquire(group)
+        if ticket is None:
+            return self.reject(group)
+        failed = True
+        try:
+            response = self.get_response(request)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.controller.release(ticket, failed)
+
+    async def __acall__(self, request):
+        group = route_group(request)
+        if group is None:
+            return await self.get_response(request)
+        ticket = self.controller.acquire(group)
+        if ticket is None:
+            return self.reject(group)
+        failed = True
+        try:
+            response = await self.get_response(request)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.controller.release(ticket, failed)
+
+    def reject(self, group):
+        response = JsonResponse({'detail': 'Service is overloaded, please retry later.'}, status=503)
+        response['Retry-After'] = str(self.controller.groups[group].retry_after())
+        return response
+
+
+def admission_metrics(request):
+    """
+    Current admission limits, in-flight requests and shed counts for this process.
+    """
+    return HttpResponse(admission_controller.metrics(), content_type='text/plain; version=0.0.4')
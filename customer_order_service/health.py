@@ -0,0 +1,28 @@
+import logging
+
+from django.db import DatabaseError, connections
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+
+def liveness(request):
+    """
+    Liveness probe: the process is up and able to serve requests.
+    """
+    return JsonResponse({'status': 'ok'})
+
+
+def readiness(request):
+    """
+    Readiness probe: every configured database accepts queries.
+    """
+    for alias in connections:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError:
+            # The error text can name hosts and credentials; keep it in the logs, not the response.
+            logger.exception(f"Readiness check failed for database {alias}")
+            return JsonResponse({'status': 'unavailable', 'database': alias}, status=503)
+    return JsonResponse({'status': 'ok'})
@@ -0,0 +1,267 @@
+"""
+On-demand request profiling.
+
+A request is profiled when it carries a valid `X-Profile-Token` header (minted by staff
+through /api/admin/profiles/token/ and valid for PROFILING_TOKEN_MAX_AGE seconds) or
+when it is picked by the PROFILING_SAMPLE_RATE sampler. A profiled request runs under
+cProfile with every SQL query and its duration recorded; the cProfile stats and a JSON
+summary are written to PROFILING_DIR and listed by /api/admin/profiles/.
+
+Requests that are not picked pay for one header lookup (and one random number when
+sampling is on); with PROFILING_ENABLED off the middleware is not loaded at all.
+Only one request per process is profiled at a time.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, Http404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from customerorder.authentication import FirebaseAuthentication
+
+TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_SALT = 'request-profiling'
+PROFILE_ID_RE = re.compile(r'^\d{8}T\d{6}-[0-9a-f]{12}$')
+TOP_FUNCTIONS = 40
+
+
+def _settings():
+    return {
+        'directory': getattr(settings, 'PROFILING_DIR', settings.BASE_DIR / 'profiles'),
+        'sample_rate': getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0),
+        'token_max_age': getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 900),
+        'max_artifacts': getattr(settings, 'PROFILING_MAX_ARTIFACTS', 200),
+    }
+
+
+def issue_token(user):
+    """
+    Returns a signed header value that enables profiling for requests that carry it.
+    """
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def valid_token(value, max_age):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(value, max_age=max_age)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that records each query's SQL and duration.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'database': context['connection'].alias,
+                'sql': sql,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                'many': many,
+            })
+
+
+def _artifact_paths(directory, profile_id):
+    return os.path.join(directory, f'{profile_id}.json'), os.path.join(directory, f'{profile_id}.prof')
+
+
+def write_artifact(directory, request, response, profiler, recorder, duration, reason, max_artifacts):
+    """
+    Save the cProfile stats and a JSON summary of one request. Returns the profile id.
+    """
+    os.makedirs(directory, exist_ok=True)
+    profile_id = f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:12]}"
+    summary_path, stats_path = _artifact_paths(directory, profile_id)
+    profiler.dump_stats(stats_path)
+
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+    queries = recorder.queries
+    summary = {
+        'id': profile_id,
+        'created_at': timezone.now().isoformat(),
+        'reason': reason,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status_code': getattr(response, 'status_code', None),
+        'duration_ms': round(duration * 1000, 3),
+        'query_count': len(queries),
+        'query_time_ms': round(sum(query['duration_ms'] for query in queries), 3),
+        'queries': queries,
+        'top_functions': text.getvalue(),
+    }
+    with open(summary_path, 'w', encoding='utf-8') as handle:
+        json.dump(summary, handle)
+
+    _prune(directory, max_artifacts)
+    return profile_id
+
+
+def _prune(directory, max_artifacts):
+    """
+    Keep only the newest `max_artifacts` profiles.
+    """
+    ids = sorted(name[:-5] for name in os.listdir(directory) if name.endswith('.json'))
+    for profile_id in ids[:-max_artifacts] if max_artifacts else ():
+        for path in _artifact_paths(directory, profile_id):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_artifacts(directory):
+    """
+    Returns the summaries of the stored profiles, newest first, without their query lists.
+    """
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name), encoding='utf-8') as handle:
+                summary = json.load(handle)
+            summaries.append({key: value for key, value in summary.items()
+                              if key not in ('queries', 'top_functions')})
+    return summaries
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests picked by a signed header or the sampler. See the module docstring.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.options = _settings()
+        self.lock = threading.Lock()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            # Async views are long-lived streams; they are never profiled.
+            return self.get_response(request)
+        reason = self.reason(request)
+        if reason is None or not self.lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request, reason)
+        finally:
+            self.lock.release()
+
+    def reason(self, request):
+        """
+        Returns why this request should be profiled, or None.
+        """
+        token = request.META.get(TOKEN_HEADER)
+        if token is not None and valid_token(token, self.options['token_max_age']):
+            return 'token'
+        sample_rate = self.options['sample_rate']
+        if sample_rate and random.random() < sample_rate:
+            return 'sampled'
+        return None
+
+    def profile(self, request, reason):
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - started
+
+        profile_id = write_artifact(self.options['directory'], request, response, profiler, recorder,
+                                    duration, reason, self.options['max_artifacts'])
+        response['X-Profile-Id'] = profile_id
+        return response
+
+
+class ProfileTokenView(APIView):
+    """
+    API view for staff to obtain a short-lived X-Profile-Token header value.
+    """
+    permission_classes = [IsAdminUser]
+    authentication_classes = [FirebaseAuthentication]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Issue a profiling token for the requesting staff user.
+        """
+        return Response({
+            'header': 'X-Profile-Token',
+            'token': issue_token(request.user),
+            'expires_in': _settings()['token_max_age'],
+        }, status=status.HTTP_201_CREATED)
+
+
+class ProfileListView(APIView):
+    """
+    API view for staff to list stored request profiles.
+    """
+    permission_classes = [IsAdminUser]
+    authentication_classes = [FirebaseAuthentication]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Return the summaries of the stored profiles, newest first.
+        """
+        return Response(list_artifacts(_settings()['directory']))
+
+
+class ProfileDetailView(APIView):
+    """
+    API view for staff to retrieve one profile: its JSON summary with every SQL query,
+    or the raw cProfile stats with `?download=pstats` (load with `python -m pstats`).
+    """
+    permission_classes = [IsAdminUser]
+    authentication_classes = [FirebaseAuthentication]
+
+    def get(self, request, profile_id, *args, **kwargs):
+        """
+        Return the requested profile.
+        """
+        if not PROFILE_ID_RE.match(profile_id):
+            raise Http404
+        summary_path, stats_path = _artifact_paths(_settings()['directory'], profile_id)
+        if not os.path.exists(summary_path):
+            raise Http404
+        if request.query_params.get('download') == 'pstats':
+            return FileResponse(open(stats_path, 'rb'), as_attachment=True, filename=f'{profile_id}.prof')
+        with open(summary_path, encoding='utf-8') as handle:
+            return Response(json.load(handle))
@@ -0,0 +1,102 @@
+import hashlib
+import threading
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views import View
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+SCHEMA_PATH = settings.BASE_DIR / 'schema.yaml'
+YAML_MEDIA_TYPE = 'application/vnd.oai.openapi'
+JSON_MEDIA_TYPE = 'application/vnd.oai.openapi+json'
+
+
+def generate_schema():
+    """
+    Introspect every view and return the OpenAPI schema as YAML bytes.
+    """
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+
+class SchemaArtifact:
+    """
+    The pre-generated schema held in memory as YAML and JSON bytes with their ETags.
+    """
+
+    def __init__(self, yaml_bytes):
+        data = yaml.safe_load(yaml_bytes)
+        json_bytes = OpenApiJsonRenderer().render(data, renderer_context={})
+        self.bodies = {YAML_MEDIA_TYPE: yaml_bytes, JSON_MEDIA_TYPE: json_bytes}
+        self.etags = {
+            media_type: '"{}"'.format(hashlib.sha256(body).hexdigest()[:32])
+            for media_type, body in self.bodies.items()
+        }
+        self.filename = "{title} ({version})".format(
+            title=spectacular_settings.TITLE or 'schema',
+            version=data.get('info', {}).get('version', ''),
+        )
+
+
+def _wants_json(request):
+    """
+    Pick JSON for `?format=json` or when JSON is listed before YAML in the Accept header.
+    """
+    if 'format' in request.GET:
+        return request.GET['format'] in ('json', 'openapi-json')
+    for part in request.headers.get('Accept', '').split(','):
+        media_type = part.split(';')[0].strip()
+        if media_type.endswith('json'):
+            return True
+        if media_type.endswith('yaml') or media_type == YAML_MEDIA_TYPE:
+            return False
+    return False
+
+
+_artifact = None
+_artifact_lock = threading.Lock()
+
+
+def get_artifact():
+    """
+    Load the committed schema artifact once per process. If it is missing (e.g. in
+    a fresh checkout), generate it in memory instead so the docs still work.
+    """
+    global _artifact
+    if _artifact is None:
+        with _artifact_lock:
+            if _artifact is None:
+                try:
+                    yaml_bytes = SCHEMA_PATH.read_bytes()
+                except FileNotFoundError:
+                    yaml_bytes = generate_schema()
+                _artifact = SchemaArtifact(yaml_bytes)
+    return _artifact
+
+
+class CachedSchemaView(View):
+    """
+    Serves the pre-generated OpenAPI schema from memory with an ETag and long-lived caching,
+    so loading the Swagger and ReDoc pages never triggers view introspection.
+    """
+    cache_control = 'public, max-age=86400'
+
+    def get(self, request, *args, **kwargs):
+        artifact = get_artifact()
+        wants_json = _wants_json(request)
+        media_type = JSON_MEDIA_TYPE if wants_json else YAML_MEDIA_TYPE
+        etag = artifact.etags[media_type]
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(artifact.bodies[media_type], content_type=media_type)
+            suffix = 'json' if wants_json else 'yaml'
+            response['Content-Disposition'] = f'inline; filename="{artifact.filename}.{suffix}"'
+        response['ETag'] = etag
+        response['Cache-Control'] = self.cache_control
+        response['Vary'] = 'Accept'
+        return response
@@ -17,7 +17,7 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-$qfi93p0%m_2%6!3xc)o(i%wlg
 DEBUG = os.getenv('DEBUG', 'True').lower() in ('true', '1', 't')
 
 # Allowed hosts for the application (set in production)
-ALLOWED_HOSTS = ['localhost', '127.0.0.1']  # Add other allowed hosts if necessary
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 
 # Application definition
@@ -42,6 +42,8 @@ AFRICASTALKING_API_KEY = os.getenv('AFRICASTALKING_API_KEY', 'atsk_9c5a548336fa8
 
 # Middleware settings
 MIDDLEWARE = [
+    'customer_order_service.admission.AdmissionControlMiddleware',  # Sheds load before any other work
+    'customer_order_service.profiling.ProfilingMiddleware',  # Profiles requests on demand
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,6 +55,24 @@ MIDDLEWARE = [
     'oidc_provider.middleware.SessionManagementMiddleware',  # Session management for OIDC
 ]
 
+# Admission control: per-process concurrency capacity (match the gthread thread count)
+# and the share of it kept free for order reads
+ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'True').lower() in ('true', '1', 't')
+ADMISSION_CAPACITY = int(os.getenv('ADMISSION_CAPACITY', os.getenv('GUNICORN_THREADS', 4)))
+ADMISSION_READ_RESERVE = float(os.getenv('ADMISSION_READ_RESERVE', 0.25))
+
+# On-demand request profiling (see customer_order_service/profiling.py)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'True').lower() in ('true', '1', 't')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.0))  # Fraction of requests profiled
+PROFILING_DIR = os.getenv('PROFILING_DIR', BASE_DIR / 'profiles')
+PROFILING_TOKEN_MAX_AGE = int(os.getenv('PROFILING_TOKEN_MAX_AGE', 900))  # Seconds a profiling token is valid
+PROFILING_MAX_ARTIFACTS = int(os.getenv('PROFILING_MAX_ARTIFACTS', 200))
+
+# Django REST Framework settings
+REST_FRAMEWORK = {
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+}
+
 # API documentation settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'CUSTOMER_ORDER APIS',
@@ -71,6 +91,15 @@ OIDC_IDTOKEN_EXPIRE = 3600  # ID token expiration time
 OIDC_CODE_EXPIRE = 600  # Code expiration time
 OIDC_EXTRA_SCOPE_CLAIMS = 'customerorder.oidc_views.CustomScopeClaims'  # Custom claims
 
+# Cache settings. Use a shared backend (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://redis:6379/0) whenever more than one process runs: the order event stream relies on it.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 # Content Security Policy settings
 CSP_DEFAULT_SRC = ("'self'",)
 CSP_STYLE_SRC = ("'self'", "https://cdnjs.cloudflare.com")
@@ -114,6 +143,17 @@ DATABASES = {
     }
 }
 
+# Order shards: database aliases that hold orders, partitioned by customer (see customerorder/sharding.py).
+# ORDER_SHARDS=shard1,shard2 adds a SQLite database per alias next to db.sqlite3; unset keeps every
+# order on `default`. List `default` first when sharding an existing installation.
+ORDER_SHARDS = [alias for alias in os.getenv('ORDER_SHARDS', 'default').split(',') if alias] or ['default']
+for alias in ORDER_SHARDS:
+    DATABASES.setdefault(alias, {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'{alias}.sqlite3',
+    })
+DATABASE_ROUTERS = ['customerorder.sharding.OrderShardRouter']
+
 # Password validation settings
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -2,14 +2,25 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from drf_spectacular.views import SpectacularSwaggerView, SpectacularRedocView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from customer_order_service.admission import admission_metrics
+from customer_order_service.health import liveness, readiness
+from customer_order_service.profiling import ProfileDetailView, ProfileListView, ProfileTokenView
+from customer_order_service.schema import CachedSchemaView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('healthz/', liveness, name='liveness'),
+    path('readyz/', readiness, name='readiness'),
+    path('metrics/admission/', admission_metrics, name='admission-metrics'),
 
     path('api/', include('customerorder.urls')),
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/admin/profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('api/admin/profiles/token/', ProfileTokenView.as_view(), name='profile-token'),
+    path('api/admin/profiles/<str:profile_id>/', ProfileDetailView.as_view(), name='profile-detail'),
+    path('api/schema/', CachedSchemaView.as_view(), name='schema'),
     path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
 
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CustorderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customerorder'
+
+    def ready(self):
+        """
+        Connect the app's signal handlers.
+        """
+        from . import signals  # noqa: F401
@@ -24,7 +24,7 @@ class FirebaseAuthentication(BaseAuthentication):
             decoded_token = auth.verify_id_token(token)
             uid = decoded_token['uid']
 
-            user = User.objects.get(uid=uid)
+            user = User.objects.get(uid=uid, deleted_at__isnull=True)
             return (user, token)
         except (auth.InvalidIdTokenError, auth.ExpiredIdTokenError, auth.RevokedIdTokenError, User.DoesNotExist) as e:
             raise AuthenticationFailed(str(e))
@@ -0,0 +1,217 @@
+"""
+The item catalog.
+
+Orders reference an Item instead of repeating the item's name. ItemCatalog interns
+names in process: creating an order for a known item or rendering an order's item
+name needs no catalog query. Item names never change, so cached entries never go
+stale; an entry is only remembered once the transaction that read or created it
+has committed.
+
+Each item also keeps counters of its live orders and their total amount, maintained
+like the rollups as orders are created, changed and deleted: order writes append
+ItemCounterDelta rows and compact() folds them into the items. Items live on `default`
+even when orders are sharded; counter changes from a shard are appended when the
+shard's transaction commits.
+"""
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+ITEM_CACHE_SIZE = getattr(settings, 'ITEM_CACHE_SIZE', 10000)
+COMPACT_BATCH_SIZE = getattr(settings, 'ITEM_COUNTER_COMPACT_BATCH_SIZE', 5000)
+
+
+def normalize_name(name):
+    """
+    Collapse whitespace so ' Laptop  Bag' and 'Laptop Bag' are the same item.
+    """
+    return ' '.join(name.split())
+
+
+class ItemCatalog:
+    """
+    In-process, bounded map between item names and ids.
+    """
+
+    def __init__(self, max_size=ITEM_CACHE_SIZE):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.ids = {}
+        self.names = {}
+
+    def _remember(self, pairs):
+        with self.lock:
+            if len(self.ids) + len(pairs) > self.max_size:
+                self.ids.clear()
+                self.names.clear()
+            for name, item_id in pairs:
+                self.ids[name] = item_id
+                self.names[item_id] = name
+
+    def _remember_on_commit(self, pairs):
+        if pairs:
+            transaction.on_commit(lambda: self._remember(pairs), using='default')
+
+    def clear(self):
+        with self.lock:
+            self.ids.clear()
+            self.names.clear()
+
+    def forget(self, item_id):
+        with self.lock:
+            name = self.names.pop(item_id, None)
+            if name is not None:
+                self.ids.pop(name, None)
+
+    def intern(self, name):
+        """
+        Returns the id of the item called `name`, adding it to the catalog if needed.
+        """
+        return self.intern_many([name])[normalize_name(name)]
+
+    def intern_many(self, names):
+        """
+        Returns a dict mapping each (normalized) name to its item id, with one query
+        for the unknown names and one insert for the new ones.
+        """
+        from .models import Item
+
+        names = {normalize_name(name) for name in names}
+        found = {name: self.ids[name] for name in names if name in self.ids}
+        missing = names - found.keys()
+        if missing:
+            items = Item.objects.using('default')
+            known = dict(items.filter(name__in=missing).values_list('name', 'pk'))
+            if len(known) < len(missing):
+                items.bulk_create([Item(name=name) for name in missing - known.keys()], ignore_conflicts=True)
+                known = dict(items.filter(name__in=missing).values_list('name', 'pk'))
+            self._remember_on_commit(list(known.items()))
+            found.update(known)
+        return found
+
+    def name_for(self, item_id):
+        """
+        Returns the name of an item, or '' for an unknown id.
+        """
+        name = self.names.get(item_id)
+        if name is None:
+            name = self.names_for([item_id]).get(item_id, '')
+        return name
+
+    def names_for(self, item_ids):
+        """
+        Returns a dict mapping item ids to names, with one query for the uncached ones.
+        """
+        from .models import Item
+
+        found = {item_id: self.names[item_id] for item_id in item_ids if item_id in self.names}
+        missing = set(item_ids) - found.keys()
+        if missing:
+            known = dict(Item.objects.using('default').filter(pk__in=missing).values_list('pk', 'name'))
+            self._remember_on_commit([(name, item_id) for item_id, name in known.items()])
+            found.update(known)
+        return found
+
+
+catalog = ItemCatalog()
+
+
+def apply_deltas(deltas, using='default'):
+    """
+    Record {item id: (count, amount)} deltas to the item counters, for orders written to `using`.
+    This is a single insert; the Item rows themselves are only written by compact().
+    """
+    from .models import ItemCounterDelta
+
+    def record():
+        ItemCounterDelta.objects.using('default').bulk_create([
+            ItemCounterDelta(item_id=item_id, order_count=count, total_amount=amount)
+            for item_id, (count, amount) in deltas.items()
+            if count or amount
+        ])
+
+    if using == 'default':
+        record()
+    else:
+        transaction.on_commit(record, using=using)
+
+
+def compact(batch_size=COMPACT_BATCH_SIZE):
+    """
+    Fold up to `batch_size` pending counter deltas into the items, one update per item, in one
+    short transaction. Concurrent compactions take disjoint batches. Returns the number of deltas folded.
+    """
+    from .models import Item, ItemCounterDelta
+
+    with transaction.atomic(using='default'):
+        pending = list(
+            ItemCounterDelta.objects.using('default')
+            .select_for_update(skip_locked=True)
+            .order_by('pk')
+            .values_list('pk', 'item_id', 'order_count', 'total_amount')[:batch_size]
+        )
+        totals = {}
+        for _, item_id, count, amount in pending:
+            _add(totals, item_id, count, amount)
+        for item_id, (count, amount) in totals.items():
+            if count or amount:
+                Item.objects.using('default').filter(pk=item_id).update(
+                    order_count=F('order_count') + count, total_amount=F('total_amount') + amount,
+                )
+        ItemCounterDelta.objects.using('default').filter(pk__in=[row[0] for row in pending]).delete()
+    return len(pending)
+
+
+def _add(deltas, item_id, count, amount):
+    current_count, current_amount = deltas.get(item_id, (0, Decimal('0')))
+    deltas[item_id] = (current_count + count, current_amount + Decimal(amount))
+
+
+def record_order_saved(order, using='default'):
+    """
+    Move an order's contribution from its previously counted item and amount to its current ones.
+    """
+    previous = getattr(order, '_item_state', None)
+    current = order.item_state()
+    if previous == current:
+        return
+    deltas = {}
+    if previous is not None:
+        _add(deltas, previous[0], -1, -Decimal(previous[1]))
+    _add(deltas, current[0], 1, current[1])
+    apply_deltas(deltas, using)
+    order._item_state = current
+
+
+def record_order_deleted(order, using='default'):
+    """
+    Remove a deleted order's contribution from its item's counters.
+    """
+    item_id, amount = getattr(order, '_item_state', None) or order.item_state()
+    apply_deltas({item_id: (-1, -Decimal(amount))}, using)
+    order._item_state = None
+
+
+def add_orders(orders, using='default'):
+    """
+    Count many orders at once, with one update per item, e.g. after a bulk insert.
+    """
+    _apply_orders(orders, 1, using)
+
+
+def remove_orders(orders, using='default'):
+    """
+    Uncount many orders at once, with one update per item.
+    """
+    _apply_orders(orders, -1, using)
+
+
+def _apply_orders(orders, sign, using):
+    deltas = {}
+    for order in orders:
+        item_id, amount = order.item_state()
+        _add(deltas, item_id, sign, sign * Decimal(amount))
+    apply_deltas(deltas, using)
@@ -0,0 +1,16 @@
+def build_claims(user):
+    """
+    Compute the OIDC claims for a user from the fields on the User row itself.
+    The provider has already loaded the user, so this needs no queries and is not cached.
+    """
+    return {
+        'sub': str(user.pk),
+        'name': user.get_full_name() or user.username,
+        'given_name': user.first_name,
+        'family_name': user.last_name,
+        'preferred_username': user.username,
+        'email': user.email,
+        'phone_number': user.phone_number,
+        'customer_id': str(user.pk),
+        'customer_code': user.customer_code,
+    }
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import catalog, rollups, search
+from .models import Order, User
+from .sharding import is_sharded, order_shards
+
+PURGE_BATCH_SIZE = 500
+
+
+def soft_delete_orders(orders, using='default'):
+    """
+    Hide orders from every read path: mark them deleted and take them out of the
+    search index, rollups and item counters in a single short transaction.
+    """
+    requested = {order.pk: order for order in orders}
+    if not requested:
+        return 0
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        # Re-read under lock so rollups lose exactly what they currently hold for each order.
+        live = list(Order.objects.using(using).select_for_update().filter(pk__in=requested))
+        ids = [order.pk for order in live]
+        Order.all_objects.using(using).filter(pk__in=ids).update(deleted_at=now)
+        search.unindex_orders(ids, using=using)
+        rollups.remove_orders(live, using=using)
+        catalog.remove_orders(live, using=using)
+    for pk in ids:
+        requested[pk].deleted_at = now
+    return len(ids)
+
+
+def soft_delete_order(order, using='default'):
+    """
+    Soft-delete one order; the purge_deleted command removes it later.
+    """
+    return soft_delete_orders([order], using=using)
+
+
+def soft_delete_customer(user, using='default'):
+    """
+    Deactivate a customer and mark them deleted, in constant time. Their orders are
+    removed in batches by purge_deleted, after which the user row itself is deleted.
+    """
+    user.deleted_at = timezone.now()
+    user.is_active = False
+    user.save(update_fields=['deleted_at', 'is_active'], using=using)
+
+
+class PurgeStats:
+    """
+    Running totals for a purge.
+    """
+
+    def __init__(self):
+        self.orders_hidden = 0
+        self.orders_purged = 0
+        self.customers_purged = 0
+
+    def __bool__(self):
+        return bool(self.orders_hidden or self.orders_purged or self.customers_purged)
+
+
+def purge_batch(batch_size=PURGE_BATCH_SIZE, older_than=timedelta(days=30), using='default'):
+    """
+    Do one bounded unit of deletion work on every order shard, each step in its own short transaction:
+
+    1. soft-delete up to `batch_size` live orders of deleted customers,
+    2. hard-delete up to `batch_size` soft-deleted orders that belong to a deleted customer
+       or were deleted more than `older_than` ago,
+    3. delete deleted customers that have no orders left.
+
+    Only the first `batch_size` deleted customers by id are handled per batch; once purged
+    they make way for the next ones. `using` is the database holding the users. Returns a
+    PurgeStats; it is falsy once there is nothing left to do.
+    """
+    stats = PurgeStats()
+    # Users and orders may live on different databases, so the ids are read up front.
+    deleted_customers = list(
+        User.objects.using(using).filter(deleted_at__isnull=False).order_by('pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    shards = order_shards() if is_sharded() else [using]
+
+    for alias in shards:
+        orphans = list(
+            Order.objects.using(alias).filter(customer_id__in=deleted_customers).order_by('pk')[:batch_size]
+        )
+        stats.orders_hidden += soft_delete_orders(orphans, using=alias)
+
+        expired = Order.all_objects.using(alias).filter(
+            Q(customer_id__in=deleted_customers) | Q(deleted_at__lt=timezone.now() - older_than),
+            deleted_at__isnull=False,
+        )
+        ids = list(expired.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if ids:
+            with transaction.atomic(using=alias):
+                Order.all_objects.using(alias).filter(pk__in=ids).delete()
+            stats.orders_purged += len(ids)
+
+    remaining = set()
+    for alias in shards:
+        remaining.update(
+            Order.all_objects.using(alias).filter(customer_id__in=deleted_customers)
+            .values_list('customer_id', flat=True).distinct()
+        )
+    purgeable = [pk for pk in deleted_customers if pk not in remaining]
+    for user in User.objects.using(using).filter(pk__in=purgeable):
+        with transaction.atomic(using=using):
+            user.delete(using=using)
+        stats.customers_purged += 1
+    return stats
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+EVENT_LOG_SIZE = getattr(settings, 'ORDER_EVENTS_LOG_SIZE', 100)
+EVENT_LOG_TIMEOUT = getattr(settings, 'ORDER_EVENTS_LOG_TIMEOUT', 3600)
+HEARTBEAT_SECONDS = getattr(settings, 'ORDER_EVENTS_HEARTBEAT_SECONDS', 15)
+POLL_INTERVAL_SECONDS = getattr(settings, 'ORDER_EVENTS_POLL_INTERVAL_SECONDS', 1.0)
+BATCH_SIZE = getattr(settings, 'ORDER_EVENTS_BATCH_SIZE', 50)
+MAX_CONNECTION_SECONDS = getattr(settings, 'ORDER_EVENTS_MAX_CONNECTION_SECONDS', 300)
+GAP_WAIT_SECONDS = getattr(settings, 'ORDER_EVENTS_GAP_WAIT_SECONDS', 5)
+TICKET_MAX_AGE = getattr(settings, 'ORDER_EVENTS_TICKET_MAX_AGE', 60)
+TICKET_SALT = 'order-event-stream'
+
+ORDER_CREATED = 'order.created'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+ORDER_UPDATED = 'order.updated'
+ORDER_EVENT_TYPES = (ORDER_CREATED, ORDER_STATUS_CHANGED, ORDER_UPDATED)
+
+
+def order_payload(order):
+    """
+    Returns the JSON-serializable representation of an order carried by order events.
+    """
+    return {
+        'id': order.pk,
+        'order_number': order.order_number,
+        'customer_id': order.customer_id,
+        'item': order.item,
+        'amount': str(order.amount),
+        'status': order.status,
+        'created_at': order.created_at.isoformat() if order.created_at else None,
+    }
+
+
+class OrderEventLog:
+    """
+    A short, per-customer log of order events kept in the Django cache.
+
+    Every event gets the next id from a per-customer counter and is stored under its
+    own key, so writers in different workers never overwrite each other. Readers fetch
+    the ids they have not seen yet; with a shared cache backend this is the fan-out
+    between workers. Only the last EVENT_LOG_SIZE events can be replayed.
+    """
+
+    def __init__(self, size=EVENT_LOG_SIZE, timeout=EVENT_LOG_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+
+    def _counter_key(self, customer_id):
+        return f'order-events:{customer_id}:last'
+
+    def _event_key(self, customer_id, event_id):
+        return f'order-events:{customer_id}:{event_id}'
+
+    def append(self, customer_id, event_type, data):
+        """
+        Store an event and return its id.
+        """
+        counter_key = self._counter_key(customer_id)
+        cache.add(counter_key, 0, None)
+        event_id = cache.incr(counter_key)
+        cache.set(self._event_key(customer_id, event_id),
+                  {'id': event_id, 'type': event_type, 'data': data}, self.timeout)
+        return event_id
+
+    def latest_id(self, customer_id):
+        """
+        Returns the id of the customer's most recent event, or 0.
+        """
+        return cache.get(self._counter_key(customer_id), 0)
+
+    def read_since(self, customer_id, last_id, limit, skip_missing=False):
+        """
+        Returns up to `limit` events after `last_id` in id order, the id to resume from, and
+        whether the read stopped at a missing event. Events that fell out of the log are skipped.
+
+        A writer increments the counter before it stores the event, so a missing id may still
+        be on its way: the read stops before it rather than skip it for good. Pass
+        `skip_missing` to read past ids that stay missing, e.g. evicted events.
+        """
+        latest = self.latest_id(customer_id)
+        if last_id > latest:
+            # The counter was lost (e.g. cache flush); restart from the current position.
+            return [], latest, False
+        first = max(last_id + 1, latest - self.size + 1)
+        last = min(latest, first + limit - 1)
+        if first > last:
+            return [], last_id, False
+        keys = [self._event_key(customer_id, event_id) for event_id in range(first, last + 1)]
+        found = cache.get_many(keys)
+        if skip_missing:
+            return [found[key] for key in keys if key in found], last, False
+        events = []
+        for key in keys:
+            if key not in found:
+                return events, first + len(events) - 1, True
+            events.append(found[key])
+        return events, last, False
+
+
+class Subscription:
+    """
+    A wake-up handle for one streaming connection, signalled from any thread.
+    """
+
+    def __init__(self, customer_id):
+        self.customer_id = customer_id
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def notify(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout):
+        """
+        Wait until notified or until `timeout` seconds pass, then re-arm.
+        """
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.event.clear()
+
+
+class EventBroker:
+    """
+    In-process pub/sub that wakes this worker's streaming connections as soon as an
+    event for their customer is published, instead of waiting for the next poll.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def subscribe(self, customer_id):
+        subscription = Subscription(customer_id)
+        with self.lock:
+            self.subscriptions.setdefault(customer_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.customer_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.customer_id, None)
+
+    def notify(self, customer_id):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(customer_id, ()))
+        for subscription in subscriptions:
+            subscription.notify()
+
+
+event_log = OrderEventLog()
+broker = EventBroker()
+
+
+def publish(customer_id, event_type, data):
+    """
+    Record an event in the customer's log and wake local subscribers.
+    """
+    event_id = event_log.append(customer_id, event_type, data)
+    broker.notify(customer_id)
+    return event_id
+
+
+def publish_many(order_events):
+    """
+    Publish (event type, data, customer id) events, e.g. after a bulk change to many orders.
+    """
+    for event_type, data, customer_id in order_events:
+        publish(customer_id, event_type, data)
+
+
+def issue_ticket(user):
+    """
+    Returns a signed value that opens the user's event stream, and nothing else, for
+    TICKET_MAX_AGE seconds. It stands in for the Firebase token in the stream URL, which
+    access logs record.
+    """
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+def ticket_user_id(ticket):
+    """
+    Returns the user id a ticket was issued to, or None if it is invalid or expired.
+    """
+    try:
+        return int(signing.TimestampSigner(salt=TICKET_SALT).unsign(ticket, max_age=TICKET_MAX_AGE))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def format_event(event):
+    """
+    Encode one event in the text/event-stream wire format.
+    """
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+async def stream_events(customer_id, last_event_id=None, heartbeat=HEARTBEAT_SECONDS,
+                        poll_interval=POLL_INTERVAL_SECONDS, batch_size=BATCH_SIZE,
+                        max_duration=MAX_CONNECTION_SECONDS, retry_ms=3000):
+    """
+    Yield server-sent events for a customer until `max_duration` seconds have passed,
+    after which the client reconnects with Last-Event-ID and resumes where it left off.
+
+    New events are picked up when the in-process broker signals or, for events written by
+    other workers, on the next poll. At most `batch_size` events are held in memory at a time.
+    """
+    loop = asyncio.get_running_loop()
+    subscription = broker.subscribe(customer_id)
+    read_since = sync_to_async(event_log.read_since, thread_sensitive=False)
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        if last_event_id is None:
+            last_event_id = await sync_to_async(event_log.latest_id, thread_sensitive=False)(customer_id)
+        started = last_sent = loop.time()
+        gap_since = None
+        while max_duration is None or loop.time() - started < max_duration:
+            # Give an event whose id is taken but not yet stored GAP_WAIT_SECONDS to arrive.
+            skip_missing = gap_since is not None and loop.time() - gap_since >= GAP_WAIT_SECONDS
+            events, last_event_id, waiting = await read_since(customer_id, last_event_id, batch_size, skip_missing)
+            if not waiting:
+                gap_since = None
+            elif gap_since is None:
+                gap_since = loop.time()
+            if events:
+                for event in events:
+                    yield format_event(event)
+                last_sent = loop.time()
+                if len(events) == batch_size:
+                    continue
+            elif loop.time() - last_sent >= heartbeat:
+                yield ": heartbeat\n\n"
+                last_sent = loop.time()
+            await subscription.wait(min(poll_interval, heartbeat))
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from customerorder import rollups
+from customerorder.sharding import order_shards
+
+
+def _parse_moment(value):
+    """
+    Parse an ISO date or datetime argument into an aware datetime.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date: {value}")
+        moment = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the hourly and daily order rollups from the order table.
+    """
+    help = "Recompute hourly and daily order rollups, optionally limited to a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day to rebuild (ISO date or datetime).")
+        parser.add_argument('--end', help="Day after the last day to rebuild (ISO date or datetime).")
+        parser.add_argument('--database', help="Database alias to rebuild (default: every order shard).")
+
+    def handle(self, *args, **options):
+        start = _parse_moment(options['start']) if options['start'] else None
+        end = _parse_moment(options['end']) if options['end'] else None
+        if start and end and start >= end:
+            raise CommandError("--start must be before --end.")
+
+        for alias in [options['database']] if options['database'] else order_shards():
+            written = rollups.backfill(start=start, end=end, using=alias)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup rows on {alias}."))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customerorder import catalog, rollups
+from customerorder.sharding import order_shards
+
+
+class Command(BaseCommand):
+    """
+    Fold the rollup and item counter deltas appended by order writes into the rollup rows and items.
+    """
+    help = ("Fold pending order rollup deltas into the hourly and daily rollups, and item counter deltas "
+            "into the items, one short transaction per batch.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=rollups.COMPACT_BATCH_SIZE, help="Deltas per transaction.")
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help="Keep running, checking for new deltas every SECONDS once idle.")
+        parser.add_argument('--database', help="Database alias to compact (default: every order shard).")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        aliases = [options['database']] if options['database'] else order_shards()
+
+        total = 0
+        while True:
+            folded = sum(rollups.compact(options['batch_size'], using=alias) for alias in aliases)
+            if options['database'] in (None, 'default'):  # items live on default
+                folded += catalog.compact(options['batch_size'])
+            total += folded
+            if folded:
+                continue
+            if options['watch'] is None:
+                break
+            time.sleep(options['watch'])
+
+        self.stdout.write(self.style.SUCCESS(f"Folded {total} rollup and item counter deltas."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_order_service.schema import SCHEMA_PATH, generate_schema
+
+
+class Command(BaseCommand):
+    """
+    Write the OpenAPI schema artifact served by /api/schema/.
+    """
+    help = "Generate the OpenAPI schema artifact (schema.yaml), or check that it is up to date."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=str(SCHEMA_PATH), help="Where to write the schema.")
+        parser.add_argument('--check', action='store_true',
+                            help="Exit with an error instead of writing if the file differs from the live views.")
+
+    def handle(self, *args, **options):
+        schema = generate_schema()
+        if options['check']:
+            try:
+                with open(options['file'], 'rb') as handle:
+                    current = handle.read()
+            except FileNotFoundError:
+                current = None
+            if current != schema:
+                raise CommandError(f"{options['file']} is out of date; run `python manage.py generate_schema`.")
+            self.stdout.write(self.style.SUCCESS(f"{options['file']} is up to date."))
+            return
+
+        with open(options['file'], 'wb') as handle:
+            handle.write(schema)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['file']}."))
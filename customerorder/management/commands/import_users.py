@@ -0,0 +1,65 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customerorder.user_import import FIREBASE_IMPORT_LIMIT, HASH_ALGORITHMS, Checkpoint, UserImporter, \
+    read_records
+
+
+class Command(BaseCommand):
+    """
+    Bulk import existing customers into Firebase and the local user table.
+    """
+    help = (
+        "Import users from a CSV or NDJSON file (username, email, phone_number and optional uid, "
+        "customer_code, password_hash, password_salt) using Firebase's batch import API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with header) or .ndjson/.jsonl file of users.")
+        parser.add_argument('--chunk-size', type=int, default=FIREBASE_IMPORT_LIMIT,
+                            help=f"Users per Firebase import call (max {FIREBASE_IMPORT_LIMIT}).")
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help="Maximum number of Firebase import calls in flight.")
+        parser.add_argument('--hash-algorithm', choices=sorted(HASH_ALGORITHMS),
+                            help="Algorithm of the password_hash column, if present.")
+        parser.add_argument('--hash-rounds', type=int, default=1,
+                            help="Rounds used by the password hash algorithm.")
+        parser.add_argument('--checkpoint', help="Checkpoint file used to resume (default: <path>.checkpoint).")
+        parser.add_argument('--rejects', help="CSV file to write rejected records and reasons to.")
+
+    def handle(self, *args, **options):
+        hash_alg = None
+        if options['hash_algorithm']:
+            hash_alg = HASH_ALGORITHMS[options['hash_algorithm']](options['hash_rounds'])
+
+        rejects_file = open(options['rejects'], 'a', newline='', encoding='utf-8') if options['rejects'] else None
+        rejects_writer = csv.writer(rejects_file) if rejects_file else None
+
+        def on_reject(record, reason):
+            if rejects_writer:
+                rejects_writer.writerow([record.get('username'), record.get('email'), reason])
+
+        def on_progress(stats):
+            self.stdout.write(f"Processed {stats.processed} records "
+                              f"({stats.created} created, {stats.rejected} rejected)")
+
+        try:
+            importer = UserImporter(
+                chunk_size=options['chunk_size'],
+                concurrency=options['concurrency'],
+                hash_alg=hash_alg,
+                checkpoint=Checkpoint(options['checkpoint'] or f"{options['path']}.checkpoint"),
+                on_reject=on_reject,
+                on_progress=on_progress,
+            )
+            stats = importer.run(read_records(options['path']))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        finally:
+            if rejects_file:
+                rejects_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Import finished: {stats.created} users created, {stats.rejected} rejected."
+        ))
@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customerorder.deletion import PURGE_BATCH_SIZE, purge_batch
+
+
+class Command(BaseCommand):
+    """
+    Remove soft-deleted orders and deleted customers in small batches.
+    """
+    help = "Purge soft-deleted orders and the orders of deleted customers, one short transaction per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE, help="Rows per transaction.")
+        parser.add_argument('--older-than-days', type=int, default=30,
+                            help="Keep orders soft-deleted through the API for this many days.")
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help="Seconds to sleep between batches so other writers get the locks.")
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help="Keep running, checking for new work every SECONDS once idle.")
+        parser.add_argument('--database', default='default', help="Database alias holding the users.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        older_than = timedelta(days=options['older_than_days'])
+
+        totals = {'hidden': 0, 'purged': 0, 'customers': 0}
+        while True:
+            stats = purge_batch(options['batch_size'], older_than, using=options['database'])
+            totals['hidden'] += stats.orders_hidden
+            totals['purged'] += stats.orders_purged
+            totals['customers'] += stats.customers_purged
+            if stats:
+                time.sleep(options['pause'])
+                continue
+            if options['watch'] is None:
+                break
+            time.sleep(options['watch'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {totals['purged']} orders ({totals['hidden']} hidden from deleted customers) "
+            f"and {totals['customers']} customers."
+        ))
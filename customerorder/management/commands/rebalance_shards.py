@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customerorder.models import User
+from customerorder.sharding import is_sharded, move_customer, move_source, order_shards
+
+
+class Command(BaseCommand):
+    """
+    Move customers' orders between order shards.
+    """
+    help = "Move the orders of the given customers, or of every customer on a drained shard, to another shard."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customer', type=int, action='append', default=[], metavar='ID',
+                            help="Id of a customer to move (repeatable).")
+        parser.add_argument('--drain', metavar='ALIAS', help="Move every customer off this shard.")
+        parser.add_argument('--to', metavar='ALIAS',
+                            help="Target shard (default with --drain: spread over the remaining shards).")
+        parser.add_argument('--batch-size', type=int, default=500, help="Orders copied per transaction.")
+        parser.add_argument('--settle', type=float, default=2.0,
+                            help="Seconds to wait for in-flight writes after fencing a customer.")
+        parser.add_argument('--dry-run', action='store_true', help="Only print the planned moves.")
+
+    def handle(self, *args, **options):
+        if not is_sharded():
+            raise CommandError("ORDER_SHARDS lists a single database; there is nothing to rebalance.")
+        shards = order_shards()
+        for alias in filter(None, (options['to'], options['drain'])):
+            if alias not in shards:
+                raise CommandError(f"Unknown shard: {alias}")
+        if bool(options['customer']) == bool(options['drain']):
+            raise CommandError("Pass either --customer or --drain.")
+        if options['customer'] and not options['to']:
+            raise CommandError("--customer needs --to.")
+
+        if options['drain']:
+            targets = [options['to']] if options['to'] else [alias for alias in shards if alias != options['drain']]
+            if not targets or options['drain'] in targets:
+                raise CommandError("--to must be a different shard than --drain.")
+            customers = [customer for customer in User.objects.order_by('pk').iterator()
+                         if move_source(customer) == options['drain']]
+        else:
+            targets = [options['to']]
+            customers = list(User.objects.filter(pk__in=options['customer']).order_by('pk'))
+            missing = set(options['customer']) - {customer.pk for customer in customers}
+            if missing:
+                raise CommandError(f"Unknown customers: {', '.join(map(str, sorted(missing)))}")
+
+        moved = 0
+        for index, customer in enumerate(customers):
+            target = targets[index % len(targets)]
+            source = move_source(customer)
+            if source == target:
+                continue
+            self.stdout.write(f"Customer {customer.pk}: {source} -> {target}")
+            if not options['dry_run']:
+                moved += move_customer(customer, target, batch_size=options['batch_size'],
+                                       settle=options['settle'])
+
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} orders of {len(customers)} customers."))
@@ -0,0 +1,41 @@
+import asyncio
+import signal
+
+import aiohttp
+from django.core.management.base import BaseCommand
+
+from customerorder.webhooks import MAX_ATTEMPTS, WebhookWorker
+
+
+class Command(BaseCommand):
+    """
+    Deliver queued webhook events until interrupted.
+    """
+    help = "Run the asyncio webhook delivery worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Events per POST to one endpoint.")
+        parser.add_argument('--timeout', type=float, default=10, help="Per-request timeout in seconds.")
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS,
+                            help="Attempts before a delivery is dead-lettered.")
+        parser.add_argument('--once', action='store_true', help="Send one wave to every endpoint and exit.")
+
+    def handle(self, *args, **options):
+        worker = WebhookWorker(batch_size=options['batch_size'], timeout=options['timeout'],
+                               max_attempts=options['max_attempts'])
+        if options['once']:
+            attempted = asyncio.run(self._run_once(worker))
+            self.stdout.write(self.style.SUCCESS(f"Attempted {attempted} deliveries."))
+            return
+        asyncio.run(self._run_forever(worker))
+
+    async def _run_once(self, worker):
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=worker.timeout)) as session:
+            return await worker.run_once(session)
+
+    async def _run_forever(self, worker):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await worker.run(stop=stop)
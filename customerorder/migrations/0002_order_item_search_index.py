@@ -0,0 +1,50 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the item search index for the current database backend.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS customerorder_order_item_trgm "
+            "ON customerorder_order USING gin (item gin_trgm_ops)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS customerorder_order_item_tsv "
+            "ON customerorder_order USING gin (to_tsvector('simple', item))"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS customerorder_order_fts "
+            "USING fts5(item, customer_id UNINDEXED, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            "INSERT INTO customerorder_order_fts (rowid, item, customer_id) "
+            "SELECT id, item, customer_id FROM customerorder_order"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    """
+    Drop the item search index for the current database backend.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS customerorder_order_item_trgm")
+        schema_editor.execute("DROP INDEX IF EXISTS customerorder_order_item_tsv")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS customerorder_order_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customerorder', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index, hints={'model_name': 'order'}),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customerorder', '0004_webhooks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
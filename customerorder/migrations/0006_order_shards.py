@@ -0,0 +1,62 @@
+# Generated by Django 5.1.1 on 2026-10-19 06:19
+
+import copy
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, router
+
+
+def drop_cross_shard_foreign_keys(apps, schema_editor):
+    """
+    Drop the database foreign keys from orders to users and from webhook deliveries to
+    subscriptions on databases created before they were declared without constraints.
+    """
+    connection = schema_editor.connection
+    for model_name, field_name in (('order', 'customer'), ('webhookdelivery', 'subscription')):
+        model = apps.get_model('customerorder', model_name)
+        if not router.allow_migrate_model(connection.alias, model):
+            continue
+        field = model._meta.get_field(field_name)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        if not any(c['foreign_key'] and c['columns'] == [field.column] for c in constraints.values()):
+            continue
+        constrained = copy.copy(field)
+        constrained.db_constraint = True
+        schema_editor.alter_field(model, constrained, field)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customerorder', '0005_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('next_value', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='order_shard',
+            field=models.CharField(blank=True, help_text="Database alias holding this customer's orders.", max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='customer',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='orders', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='webhookdelivery',
+            name='subscription',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='deliveries', to='customerorder.webhooksubscription'),
+        ),
+        migrations.RunPython(drop_cross_shard_foreign_keys, migrations.RunPython.noop,
+                             hints={'model_name': 'order'}),
+    ]
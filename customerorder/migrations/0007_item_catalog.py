@@ -0,0 +1,117 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:02
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+from django.db.models import Count, F, Sum
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def create_item_search_index(apps, schema_editor):
+    """
+    Index item names for search on PostgreSQL. SQLite searches its FTS5 table of orders.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS customerorder_item_name_trgm "
+            "ON customerorder_item USING gin (name gin_trgm_ops)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS customerorder_item_name_tsv "
+            "ON customerorder_item USING gin (to_tsvector('simple', name))"
+        )
+
+
+def drop_item_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS customerorder_item_name_trgm")
+        schema_editor.execute("DROP INDEX IF EXISTS customerorder_item_name_tsv")
+
+
+def link_orders_to_items(apps, schema_editor):
+    """
+    Point every order at the catalog entry for its item name, one short transaction per
+    batch, then count each item's live orders. Items live on `default`, which must be
+    migrated before the order shards.
+    """
+    alias = schema_editor.connection.alias
+    orders = apps.get_model('customerorder', 'Order')._base_manager.using(alias)
+    Item = apps.get_model('customerorder', 'Item')
+    items = Item._base_manager.using('default')
+
+    while True:
+        with transaction.atomic(using=alias):
+            batch = list(
+                orders.filter(catalog_item__isnull=True).order_by('pk').values_list('pk', 'item')[:BACKFILL_BATCH_SIZE]
+            )
+            if not batch:
+                break
+            names = {pk: ' '.join(item.split()) for pk, item in batch}
+            wanted = set(names.values())
+            ids = dict(items.filter(name__in=wanted).values_list('name', 'pk'))
+            if len(ids) < len(wanted):
+                items.bulk_create([Item(name=name) for name in wanted - ids.keys()], ignore_conflicts=True)
+                ids = dict(items.filter(name__in=wanted).values_list('name', 'pk'))
+            by_item = defaultdict(list)
+            for pk, name in names.items():
+                by_item[ids[name]].append(pk)
+            for item_id, pks in by_item.items():
+                orders.filter(pk__in=pks).update(catalog_item_id=item_id)
+
+    totals = (
+        orders.filter(deleted_at__isnull=True)
+        .values('catalog_item_id')
+        .annotate(count=Count('id'), total=Sum('amount'))
+        .order_by()
+    )
+    for row in totals.iterator():
+        items.filter(pk=row['catalog_item_id']).update(
+            order_count=F('order_count') + row['count'], total_amount=F('total_amount') + row['total'],
+        )
+
+
+def restore_item_names(apps, schema_editor):
+    """
+    Copy item names back onto the orders when migrating backwards.
+    """
+    alias = schema_editor.connection.alias
+    orders = apps.get_model('customerorder', 'Order')._base_manager.using(alias)
+    items = apps.get_model('customerorder', 'Item')._base_manager.using('default')
+    item_ids = orders.values_list('catalog_item_id', flat=True).distinct().order_by()
+    names = dict(items.values_list('pk', 'name'))
+    for item_id in list(item_ids):
+        with transaction.atomic(using=alias):
+            orders.filter(catalog_item_id=item_id).update(item=names.get(item_id, ''))
+
+
+class Migration(migrations.Migration):
+    # The backfill commits batch by batch.
+    atomic = False
+
+    dependencies = [
+        ('customerorder', '0006_order_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Item',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('order_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(create_item_search_index, drop_item_search_index, hints={'model_name': 'item'}),
+        migrations.AddField(
+            model_name='order',
+            name='catalog_item',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING,
+                                    related_name='orders', to='customerorder.item'),
+        ),
+        migrations.RunPython(link_orders_to_items, restore_item_names, hints={'model_name': 'order'}),
+    ]
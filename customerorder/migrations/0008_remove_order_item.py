@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customerorder', '0007_item_catalog'),
+    ]
+
+    operations = [
+        # The default only lets the column be re-added when migrating backwards.
+        migrations.AlterField(
+            model_name='order',
+            name='item',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='item',
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='catalog_item',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING,
+                                    related_name='orders', to='customerorder.item'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.1 on 2026-10-19 08:15
+
+from django.db import migrations, models
+
+INDEXES = [
+    models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+    models.Index(fields=['created_at'], name='order_created_idx'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    """
+    Build the indexes without locking the order table for writes on PostgreSQL.
+    """
+    Order = apps.get_model('customerorder', 'Order')
+    for index in INDEXES:
+        if schema_editor.connection.vendor == 'postgresql':
+            sql = str(index.create_sql(Order, schema_editor)).replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY IF NOT EXISTS', 1)
+            schema_editor.execute(sql)
+        else:
+            schema_editor.add_index(Order, index)
+
+
+def drop_indexes(apps, schema_editor):
+    Order = apps.get_model('customerorder', 'Order')
+    for index in INDEXES:
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"')
+        else:
+            schema_editor.remove_index(Order, index)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('customerorder', '0008_remove_order_item'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='order', index=index) for index in INDEXES],
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes, hints={'model_name': 'order'}),
+            ],
+        ),
+    ]
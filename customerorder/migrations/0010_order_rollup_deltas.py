@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-19 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customerorder', '0009_order_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRollupDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Completed', 'Completed'), ('Canceled', 'Canceled')], max_length=20)),
+                ('order_count', models.IntegerField()),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=18)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket'], name='rollup_delta_bucket_idx')],
+            },
+        ),
+    ]
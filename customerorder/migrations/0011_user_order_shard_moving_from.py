@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customerorder', '0010_order_rollup_deltas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='order_shard_moving_from',
+            field=models.CharField(blank=True, help_text="Shard this customer's orders are being moved from; order writes are refused while set.", max_length=50, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 07:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customerorder', '0011_user_order_shard_moving_from'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemCounterDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.IntegerField()),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='customerorder.item')),
+            ],
+        ),
+    ]
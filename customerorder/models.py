@@ -1,8 +1,14 @@
-from django.db import models
+import secrets
+from contextlib import nullcontext
+
+from django.db import models, router, transaction
 from django.contrib.auth.models import AbstractUser
 from django.db.models import Max
 from django.utils import timezone
 
+from . import sharding
+from .catalog import catalog, normalize_name
+
 class User(AbstractUser):
     """
     Custom user model extending AbstractUser with additional fields.
@@ -10,6 +16,13 @@ class User(AbstractUser):
     phone_number = models.CharField(max_length=15, unique=True)
     uid = models.CharField(max_length=255, unique=True, blank=True, null=True)
     customer_code = models.CharField(max_length=20, unique=True, blank=True, null=True)
+    deleted_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    order_shard = models.CharField(max_length=50, blank=True, null=True,
+                                   help_text="Database alias holding this customer's orders.")
+    order_shard_moving_from = models.CharField(
+        max_length=50, blank=True, null=True,
+        help_text="Shard this customer's orders are being moved from; order writes are refused while set.",
+    )
 
     def __str__(self):
         """
@@ -19,10 +32,12 @@ class User(AbstractUser):
 
     def save(self, *args, **kwargs):
         """
-        Override save to generate customer code if not provided.
+        Override save to generate customer code if not provided and place new customers on an order shard.
         """
         if not self.customer_code:
             self.code = self.generate_customer_code()
+        if self._state.adding and not self.order_shard and sharding.is_sharded():
+            self.order_shard = sharding.placement_for(self.username)
         super().save(*args, **kwargs)
 
     def generate_customer_code(self):
@@ -43,16 +58,66 @@ class OrderStatus(models.TextChoices):
     COMPLETED = 'Completed'
     CANCELED = 'Canceled'
 
+class Item(models.Model):
+    """
+    Catalog entry for something customers order. Names never change once created.
+    `order_count` and `total_amount` cover the item's live orders on every shard, once the
+    pending ItemCounterDelta rows have been compacted.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    order_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """
+        Returns the string representation of the item.
+        """
+        return self.name
+
+class ItemCounterDelta(models.Model):
+    """
+    A pending change to one item's counters. Order writes only insert deltas, so orders for a
+    popular item never wait on its row; catalog.compact folds them into the Item.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='+')
+    order_count = models.IntegerField()
+    total_amount = models.DecimalField(max_digits=18, decimal_places=2)
+
+class OrderManager(models.Manager):
+    """
+    Default manager for orders that hides soft-deleted rows.
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Order(models.Model):
     """
     Order model representing customer orders.
+    Deleted orders are only marked with `deleted_at`; the purge_deleted command removes them.
+    Orders may live on a different database than their customer (see sharding.py), so the
+    foreign keys are not enforced by the database and deleting a user does not cascade.
+    The item is stored as a reference to the catalog; `item` reads and sets it by name, and a
+    name set is only resolved to a catalog entry when the order is saved.
     """
-    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
-    item = models.CharField(max_length=255)
+    customer = models.ForeignKey(User, on_delete=models.DO_NOTHING, related_name='orders', db_constraint=False)
+    catalog_item = models.ForeignKey(Item, on_delete=models.DO_NOTHING, related_name='orders', db_constraint=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=OrderStatus.choices, default=OrderStatus.PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
     order_number = models.CharField(max_length=50, unique=True, blank=True)
+    deleted_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    objects = OrderManager()
+    all_objects = models.Manager()
+
+    _pending_item = None
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
 
     def __str__(self):
         """
@@ -60,21 +125,100 @@ class Order(models.Model):
         """
         return f"{self.item} - {self.customer.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the loaded state so rollups and item counters can apply deltas and status changes can be
+        detected on save.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._rollup_state = instance.rollup_state()
+        instance._item_state = instance.item_state()
+        instance._loaded_status = instance.status
+        return instance
+
+    @property
+    def item(self):
+        """
+        The item's name: one set but not yet saved, else from a joined or prefetched item,
+        else through the in-process catalog cache.
+        """
+        pending = getattr(self, '_pending_item', None)
+        if pending is not None:
+            return pending
+        if Order.catalog_item.is_cached(self) and self.catalog_item is not None:
+            return self.catalog_item.name
+        return catalog.name_for(self.catalog_item_id) if self.catalog_item_id else ''
+
+    @item.setter
+    def item(self, name):
+        # Looked up (or added to the catalog) by save(), inside the order's transaction.
+        self._pending_item = normalize_name(name)
+
+    def rollup_state(self):
+        """
+        Returns the fields that contribute to the order rollups.
+        """
+        return (self.created_at, self.status, self.amount)
+
+    def item_state(self):
+        """
+        Returns the fields that contribute to the item counters.
+        """
+        return (self.catalog_item_id, self.amount)
+
     def save(self, *args, **kwargs):
         """
-        Override save to generate order number if not provided.
+        Override save to generate order number if not provided, and a globally unique id when sharded.
         """
+        using = kwargs.get('using') or router.db_for_write(Order, instance=self)
         if not self.order_number:
-            self.order_number = generate_order_code(self.item)
-        super().save(*args, **kwargs)
+            self.order_number = generate_order_code(self.item, using=using)
+        if self.pk is None and sharding.is_sharded():
+            self.pk = sharding.order_ids.allocate()[0]
+        # Items live on default: a new item is only committed with the order that names it.
+        items_atomic = nullcontext() if self._pending_item is None or using == 'default' \
+            else transaction.atomic(using='default')
+        with items_atomic, transaction.atomic(using=using):
+            if self._pending_item is not None:
+                self.catalog_item_id = catalog.intern(self._pending_item)
+                self._pending_item = None
+            if not self._state.adding:
+                self._lock_stored_state(using)
+            super().save(*args, **kwargs)
 
-def generate_order_code(item):
+    def delete(self, using=None, keep_parents=False):
+        """
+        Delete the order, taking the contribution to remove from rollups and counters from its locked row.
+        """
+        using = using or router.db_for_write(Order, instance=self)
+        with transaction.atomic(using=using):
+            stored = self._lock_stored_state(using)
+            if stored is not None:
+                self.deleted_at = stored.deleted_at
+            return super().delete(using=using, keep_parents=keep_parents)
+
+    def _lock_stored_state(self, using):
+        """
+        Lock the order's row until the write commits and compare against its stored state rather
+        than the state loaded earlier, so concurrent writes to one order each apply their own change
+        to the rollups, item counters and events exactly once.
+        """
+        stored = Order.all_objects.using(using).select_for_update().filter(pk=self.pk).first()
+        if stored is not None:
+            self._rollup_state = stored._rollup_state
+            self._item_state = stored._item_state
+            self._loaded_status = stored._loaded_status
+        return stored
+
+def generate_order_code(item, using='default'):
     """
     Generate a unique order code based on the item and current timestamp.
+    With sharding, codes are unique within the customer's shard.
     """
     now = timezone.now()
     base_code = f"{item[:2].upper()}{now.strftime('%Y%m%d%H%M%S')}"
-    current_max = Order.objects.filter(
+    current_max = Order.all_objects.using(using).filter(
         created_at__year=now.year,
         created_at__month=now.month,
         created_at__day=now.day,
@@ -84,3 +228,134 @@ def generate_order_code(item):
     ).aggregate(Max('order_number'))
     current_count = int(current_max['order_number__max'][-2:]) + 1 if current_max['order_number__max'] else 1
     return f"{base_code}{current_count:02d}"
+
+
+class RollupGranularity(models.TextChoices):
+    """
+    Enum for rollup bucket sizes.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+
+class OrderRollup(models.Model):
+    """
+    Pre-aggregated order count and revenue per time bucket and status.
+    Maintained incrementally from order writes; rebuilt by the backfill_rollups command.
+    """
+    granularity = models.CharField(max_length=4, choices=RollupGranularity.choices)
+    bucket = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    order_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket', 'status'], name='unique_order_rollup'),
+        ]
+
+    def __str__(self):
+        """
+        Returns the string representation of the rollup row.
+        """
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:%M} {self.status}"
+
+
+class OrderRollupDelta(models.Model):
+    """
+    A pending change to one OrderRollup row. Order writes only insert deltas, so concurrent
+    writes never wait on the current bucket's rollup rows; rollups.compact folds them in.
+    """
+    granularity = models.CharField(max_length=4, choices=RollupGranularity.choices)
+    bucket = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    order_count = models.IntegerField()
+    total_amount = models.DecimalField(max_digits=18, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['granularity', 'bucket'], name='rollup_delta_bucket_idx'),
+        ]
+
+
+def generate_webhook_secret():
+    """
+    Generates a random signing secret for a webhook subscription.
+    """
+    return secrets.token_hex(32)
+
+class WebhookSubscription(models.Model):
+    """
+    An endpoint that receives signed callbacks for order events.
+    Subscriptions without a customer receive events for every order.
+    """
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=generate_webhook_secret)
+    events = models.JSONField(default=list, blank=True, help_text="Event types to send; empty means all.")
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='webhook_subscriptions',
+                                 blank=True, null=True)
+    max_concurrency = models.PositiveSmallIntegerField(default=4)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """
+        Returns the string representation of the subscription.
+        """
+        return self.url
+
+    def wants(self, event_type, customer_id):
+        """
+        Whether this subscription should receive an event for an order of the given customer.
+        """
+        return ((not self.events or event_type in self.events)
+                and (self.customer_id is None or self.customer_id == customer_id))
+
+class DeliveryStatus(models.TextChoices):
+    """
+    Enum for webhook delivery states.
+    """
+    PENDING = 'pending'
+    DELIVERED = 'delivered'
+    DEAD = 'dead'
+
+class WebhookDelivery(models.Model):
+    """
+    Outbox row for one event to be delivered to one subscription.
+    Deliveries that exhaust their retries are kept with status 'dead' for inspection.
+    Stored on the order's shard, so the subscription key is not enforced by the database.
+    """
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.DO_NOTHING, related_name='deliveries',
+                                     db_constraint=False)
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=DeliveryStatus.choices, default=DeliveryStatus.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_delivery_due_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns the string representation of the delivery.
+        """
+        return f"{self.event_type} -> {self.subscription_id} ({self.status})"
+
+
+class IdSequence(models.Model):
+    """
+    Next free id of a sharded table; ids are reserved from it in blocks (see sharding.IdAllocator).
+    """
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField()
+
+    def __str__(self):
+        """
+        Returns the string representation of the sequence.
+        """
+        return f"{self.name}: {self.next_value}"
@@ -1,18 +1,12 @@
 from oidc_provider.lib.claims import ScopeClaims
 
+from .claims import build_claims
+
 def userinfo(claims, user):
     """
     Custom user info to include in the OpenID Connect token.
     """
-    claims['name'] = user.get_full_name() or user.username
-    claims['email'] = user.email
-    claims['preferred_username'] = user.username
-    claims['sub'] = str(user.id)
-
-    if hasattr(user, 'customer'):
-        claims['customer_id'] = str(user.customer.id)
-        claims['customer_code'] = user.customer.code
-
+    claims.update(build_claims(user))
     return claims
 
 class CustomScopeClaims(ScopeClaims):
@@ -29,9 +23,8 @@ class CustomScopeClaims(ScopeClaims):
         Return extra information for the 'customer' scope.
         Available only if the 'customer' scope is requested.
         """
-        if hasattr(self.user, 'customer'):
-            return {
-                'customer_id': str(self.user.customer.id),
-                'customer_code': self.user.customer.code,
-            }
-        return {}
+        claims = build_claims(self.user)
+        return {
+            'customer_id': claims['customer_id'],
+            'customer_code': claims['customer_code'],
+        }
@@ -0,0 +1,248 @@
+"""
+Bulk import of historical orders.
+
+Rows are streamed from a CSV (or NDJSON) file and loaded in chunks, so memory stays
+constant whatever the size of the input. Customers are resolved by phone_number or
+customer_code against a lookup map built once up front. Each chunk is written with
+Postgres COPY, or with bulk_create on other databases, straight to the customer's order
+shard. Signals do not fire for these writes: item names are interned in bulk and the
+item counters updated per chunk, and the search index and rollups of the affected
+shards are rebuilt once the import is done.
+
+Order numbers must be provided and are kept, as are the timestamps. Rows whose order
+number already exists are skipped, so an interrupted import can simply be run again.
+"""
+import csv
+import io
+import time
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import rollups, search
+from .catalog import apply_deltas, catalog, normalize_name
+from .models import Item, Order, OrderStatus, User
+from .sharding import is_sharded, order_ids, order_shards
+from .utils import chunks
+
+IMPORT_CHUNK_SIZE = 5000
+STATUSES = {choice.lower(): choice for choice in OrderStatus.values}
+COPY_COLUMNS = ('customer_id', 'catalog_item_id', 'amount', 'status', 'created_at', 'order_number')
+
+
+class CustomerMap:
+    """
+    In-memory lookup of live customers by phone number and customer code,
+    giving each customer's id and order shard.
+    """
+
+    def __init__(self, using='default'):
+        self.by_phone = {}
+        self.by_code = {}
+        shards = order_shards()
+        customers = User.objects.using(using).filter(deleted_at__isnull=True) \
+            .values_list('pk', 'phone_number', 'customer_code', 'order_shard')
+        for pk, phone_number, customer_code, order_shard in customers.iterator(chunk_size=10000):
+            customer = (pk, order_shard if order_shard in shards else shards[0])
+            if phone_number:
+                self.by_phone[phone_number] = customer
+            if customer_code:
+                self.by_code[customer_code] = customer
+
+    def resolve(self, record):
+        """
+        Returns (customer id, shard) for a record, or None if it names no known customer.
+        """
+        code = (record.get('customer_code') or '').strip()
+        if code:
+            return self.by_code.get(code)
+        return self.by_phone.get((record.get('phone_number') or '').strip())
+
+
+class OrderImportStats:
+    """
+    Running totals for an order import.
+    """
+
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.started = time.monotonic()
+        # Per shard, the earliest and latest imported created_at, for the rollup rebuild.
+        self.ranges = {}
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed else 0.0
+
+    def touch(self, alias, created_at):
+        first, last = self.ranges.get(alias, (created_at, created_at))
+        self.ranges[alias] = (min(first, created_at), max(last, created_at))
+
+
+class OrderImporter:
+    """
+    Loads historical orders in chunks. See the module docstring.
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE, customers=None, on_reject=None, on_progress=None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1.")
+        self.chunk_size = chunk_size
+        self.customers = customers or CustomerMap()
+        self.on_reject = on_reject or (lambda record, reason: None)
+        self.on_progress = on_progress or (lambda stats: None)
+
+    def run(self, records):
+        """
+        Import an iterable of record dicts, then rebuild the search index and rollups of
+        every shard that received orders.
+        """
+        stats = OrderImportStats()
+        for chunk in chunks(records, self.chunk_size):
+            for alias, rows in self._validate(chunk, stats).items():
+                self._load(alias, rows, stats)
+            stats.processed += len(chunk)
+            self.on_progress(stats)
+
+        for alias, (first, last) in stats.ranges.items():
+            search.rebuild_index(using=alias)
+            rollups.backfill(start=first, end=last + timedelta(days=1), using=alias)
+        return stats
+
+    def _reject(self, record, reason, stats):
+        stats.rejected += 1
+        self.on_reject(record, reason)
+
+    def _validate(self, chunk, stats):
+        """
+        Parse and validate a chunk. Returns the accepted rows grouped by shard,
+        as dicts of Order column values.
+        """
+        by_shard = {}
+        seen = set()
+        for record in chunk:
+            customer = self.customers.resolve(record)
+            if customer is None:
+                self._reject(record, "unknown customer", stats)
+                continue
+            item = normalize_name(record.get('item') or '')
+            if not item or len(item) > Item._meta.get_field('name').max_length:
+                self._reject(record, "item is required and at most 255 characters", stats)
+                continue
+            try:
+                amount = Decimal(str(record.get('amount') or '').strip())
+            except InvalidOperation:
+                amount = None
+            if amount is None or not amount.is_finite() or amount < 0 or amount >= Decimal('1e8'):
+                self._reject(record, "invalid amount", stats)
+                continue
+            status = STATUSES.get((record.get('status') or OrderStatus.PENDING).strip().lower())
+            if status is None:
+                self._reject(record, "invalid status", stats)
+                continue
+            try:
+                created_at = parse_datetime((record.get('created_at') or '').strip())
+            except ValueError:
+                created_at = None
+            if created_at is None:
+                self._reject(record, "created_at must be an ISO datetime", stats)
+                continue
+            if timezone.is_naive(created_at):
+                created_at = timezone.make_aware(created_at, dt_timezone.utc)
+            order_number = (record.get('order_number') or '').strip()
+            if not order_number or len(order_number) > Order._meta.get_field('order_number').max_length:
+                self._reject(record, "order_number is required and at most 50 characters", stats)
+                continue
+            if order_number in seen:
+                self._reject(record, "duplicate order_number in input", stats)
+                continue
+            seen.add(order_number)
+
+            customer_id, alias = customer
+            by_shard.setdefault(alias, []).append({
+                'customer_id': customer_id,
+                'catalog_item_id': item,  # the name, replaced by the item id below
+                'amount': amount.quantize(Decimal('0.01')),
+                'status': status,
+                'created_at': created_at,
+                'order_number': order_number,
+            })
+
+        item_ids = catalog.intern_many({row['catalog_item_id'] for rows in by_shard.values() for row in rows})
+        for alias, rows in by_shard.items():
+            for row in rows:
+                row['catalog_item_id'] = item_ids[row['catalog_item_id']]
+            # One query per shard finds the rows a previous run already imported.
+            numbers = [row['order_number'] for row in rows]
+            existing = set(
+                Order.all_objects.using(alias).filter(order_number__in=numbers).values_list('order_number', flat=True)
+            )
+            if existing:
+                stats.skipped += len(existing)
+                by_shard[alias] = [row for row in rows if row['order_number'] not in existing]
+        return by_shard
+
+    def _load(self, alias, rows, stats):
+        if not rows:
+            return
+        if is_sharded():
+            for row, pk in zip(rows, order_ids.allocate(len(rows))):
+                row['id'] = pk
+        with transaction.atomic(using=alias):
+            if connections[alias].vendor == 'postgresql':
+                _copy_rows(alias, rows)
+            else:
+                _create_rows(alias, rows)
+        deltas = {}
+        for row in rows:
+            count, total = deltas.get(row['catalog_item_id'], (0, Decimal('0')))
+            deltas[row['catalog_item_id']] = (count + 1, total + row['amount'])
+        apply_deltas(deltas, using=alias)
+        stats.imported += len(rows)
+        for row in rows:
+            stats.touch(alias, row['created_at'])
+
+
+def _create_rows(alias, rows):
+    """
+    Write rows to the order table with bulk_create, keeping their created_at.
+    """
+    orders = [Order(**row) for row in rows]
+    Order.all_objects.using(alias).bulk_create(orders, batch_size=500)
+    # bulk_create stamps auto_now_add fields with the current time; put the originals back.
+    if any(order.pk is None for order in orders):
+        # Backends that do not return the new ids: find them by order number.
+        ids = dict(Order.all_objects.using(alias).filter(order_number__in=[row['order_number'] for row in rows])
+                   .values_list('order_number', 'pk'))
+        for order in orders:
+            order.pk = ids[order.order_number]
+    for order, row in zip(orders, rows):
+        order.created_at = row['created_at']
+    Order.all_objects.using(alias).bulk_update(orders, ['created_at'], batch_size=500)
+
+
+def _copy_rows(alias, rows):
+    """
+    Write rows to the order table with COPY ... FROM STDIN.
+    """
+    columns = (('id',) if 'id' in rows[0] else ()) + COPY_COLUMNS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column].isoformat() if column == 'created_at' else row[column] for column in columns])
+    buffer.seek(0)
+
+    sql = f"COPY {Order._meta.db_table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    with connections[alias].cursor() as cursor:
+        if hasattr(cursor.cursor, 'copy_expert'):  # psycopg2
+            cursor.cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
@@ -0,0 +1,90 @@
+import datetime
+import decimal
+import uuid
+
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+DECIMAL_EXT_TYPE = 1
+DATE_EXT_TYPE = 2
+
+
+def _default(obj):
+    """
+    Encode the Python types produced by DRF serializers that msgpack does not support natively.
+    Decimals and dates travel as extension types so they decode back to the same type.
+    """
+    if isinstance(obj, decimal.Decimal):
+        return msgpack.ExtType(DECIMAL_EXT_TYPE, str(obj).encode())
+    if isinstance(obj, datetime.datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=datetime.timezone.utc)
+        return msgpack.Timestamp.from_datetime(obj)
+    if isinstance(obj, datetime.date):
+        return msgpack.ExtType(DATE_EXT_TYPE, obj.isoformat().encode())
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if hasattr(obj, '__iter__') and not isinstance(obj, (str, bytes)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not msgpack serializable")
+
+
+def _ext_hook(code, data):
+    """
+    Decode the extension types written by _default.
+    """
+    if code == DECIMAL_EXT_TYPE:
+        return decimal.Decimal(data.decode())
+    if code == DATE_EXT_TYPE:
+        return datetime.date.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def packb(data):
+    """
+    Serialize data to MessagePack bytes.
+    """
+    return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
+
+
+def unpackb(content):
+    """
+    Deserialize MessagePack bytes, restoring Decimal, date and datetime values.
+    """
+    return msgpack.unpackb(content, ext_hook=_ext_hook, raw=False, timestamp=3, strict_map_key=False)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer which serializes to MessagePack.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render `data` into MessagePack bytes.
+        """
+        if data is None:
+            return b''
+        return packb(data)
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parses MessagePack-serialized data.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Parse the incoming bytestream as MessagePack and return the resulting data.
+        """
+        try:
+            return unpackb(stream.read())
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
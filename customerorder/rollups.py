@@ -0,0 +1,262 @@
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncHour
+
+from . import events, webhooks
+from .models import Order, OrderRollup, OrderRollupDelta, RollupGranularity
+from .sharding import order_shards
+
+COMPACT_BATCH_SIZE = getattr(settings, 'ROLLUP_COMPACT_BATCH_SIZE', 5000)
+
+TRUNCATORS = {
+    RollupGranularity.HOUR: TruncHour,
+    RollupGranularity.DAY: TruncDay,
+}
+
+
+def bucket_start(moment, granularity):
+    """
+    Truncate a datetime to the start of its UTC hour or day bucket.
+    """
+    moment = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if granularity == RollupGranularity.DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def _fold(granularity, bucket, status, count, amount, using):
+    """
+    Add a delta to one rollup row, creating the row if it does not exist yet.
+    """
+    rollups = OrderRollup.objects.using(using).filter(granularity=granularity, bucket=bucket, status=status)
+    changes = {'order_count': F('order_count') + count, 'total_amount': F('total_amount') + amount}
+    if rollups.update(**changes):
+        return
+    try:
+        with transaction.atomic(using=using):
+            OrderRollup.objects.using(using).create(
+                granularity=granularity, bucket=bucket, status=status,
+                order_count=count, total_amount=amount,
+            )
+    except IntegrityError:
+        # Another compaction created the row first; apply the delta to it instead.
+        rollups.update(**changes)
+
+
+def _add(deltas, key, count, amount):
+    current_count, current_amount = deltas.get(key, (0, Decimal('0')))
+    deltas[key] = (current_count + count, current_amount + Decimal(amount))
+
+
+def _add_state(deltas, state, sign):
+    created_at, status, amount = state
+    for granularity in RollupGranularity.values:
+        _add(deltas, (granularity, bucket_start(created_at, granularity), status), sign, sign * Decimal(amount))
+
+
+def _record(deltas, using):
+    """
+    Append {(granularity, bucket, status): (count, amount)} deltas with a single insert.
+    Rollup rows themselves are only written by compact(), so order writes never wait on them.
+    """
+    OrderRollupDelta.objects.using(using).bulk_create([
+        OrderRollupDelta(granularity=granularity, bucket=bucket, status=status,
+                         order_count=count, total_amount=amount)
+        for (granularity, bucket, status), (count, amount) in deltas.items()
+        if count or amount
+    ])
+
+
+def apply_state(state, sign, using='default'):
+    """
+    Add (sign=1) or remove (sign=-1) one order's contribution to every rollup granularity.
+    `state` is the (created_at, status, amount) tuple from Order.rollup_state().
+    """
+    deltas = {}
+    _add_state(deltas, state, sign)
+    _record(deltas, using)
+
+
+def record_order_saved(order, using='default'):
+    """
+    Move an order's contribution from its previously recorded state to its current one.
+    """
+    previous = getattr(order, '_rollup_state', None)
+    current = order.rollup_state()
+    if previous == current:
+        return
+    deltas = {}
+    if previous is not None:
+        _add_state(deltas, previous, -1)
+    _add_state(deltas, current, 1)
+    _record(deltas, using)
+    order._rollup_state = current
+
+
+def record_order_deleted(order, using='default'):
+    """
+    Remove a deleted order's contribution from the rollups.
+    """
+    state = getattr(order, '_rollup_state', None) or order.rollup_state()
+    apply_state(state, -1, using)
+    order._rollup_state = None
+
+
+def remove_orders(orders, using='default'):
+    """
+    Remove many orders' contributions at once, with one delta per affected rollup row
+    rather than per order.
+    """
+    _apply_orders(orders, -1, using)
+
+
+def add_orders(orders, using='default'):
+    """
+    Add many orders' contributions at once, e.g. after a bulk insert that bypassed signals.
+    """
+    _apply_orders(orders, 1, using)
+
+
+def _apply_orders(orders, sign, using):
+    deltas = {}
+    for order in orders:
+        _add_state(deltas, order.rollup_state(), sign)
+    _record(deltas, using)
+
+
+def change_status(orders, status):
+    """
+    Set the status of every order in a queryset with a single UPDATE, move their
+    contributions to the new status with one delta insert, and send each changed order's
+    status change event and webhooks. The orders are locked first, so a concurrent change
+    to the same orders cannot move their totals twice. Returns the number of orders changed.
+    """
+    using = orders.db
+    with transaction.atomic(using=using):
+        changed = list(orders.exclude(status=status).select_for_update(of=('self',)).order_by('pk'))
+        if not changed:
+            return 0
+        deltas = {}
+        for order in changed:
+            _add_state(deltas, order.rollup_state(), -1)
+            order.status = status
+            _add_state(deltas, order.rollup_state(), 1)
+        Order.all_objects.using(using).filter(pk__in=[order.pk for order in changed]).update(status=status)
+        _record(deltas, using)
+        order_events = [
+            (events.ORDER_STATUS_CHANGED, events.order_payload(order), order.customer_id) for order in changed
+        ]
+        webhooks.enqueue_many(order_events, using=using)
+        transaction.on_commit(lambda: events.publish_many(order_events), using=using)
+    return len(changed)
+
+
+def compact(batch_size=COMPACT_BATCH_SIZE, using='default'):
+    """
+    Fold up to `batch_size` pending deltas into the rollup rows, one update per affected
+    row, in one short transaction. Concurrent compactions take disjoint batches.
+    Returns the number of deltas folded.
+    """
+    with transaction.atomic(using=using):
+        pending = list(
+            OrderRollupDelta.objects.using(using)
+            .select_for_update(skip_locked=True)
+            .order_by('pk')
+            .values_list('pk', 'granularity', 'bucket', 'status', 'order_count', 'total_amount')[:batch_size]
+        )
+        totals = {}
+        for _, granularity, bucket, status, count, amount in pending:
+            _add(totals, (granularity, bucket, status), count, amount)
+        for (granularity, bucket, status), (count, amount) in totals.items():
+            if count or amount:
+                _fold(granularity, bucket, status, count, amount, using)
+        OrderRollupDelta.objects.using(using).filter(pk__in=[row[0] for row in pending]).delete()
+    return len(pending)
+
+
+def backfill(start=None, end=None, using='default'):
+    """
+    Recompute rollups from the order table for whole days in [start, end).
+    Order writes to the database wait while it runs, so keep ranges short on a live system.
+    Returns the number of rollup rows written.
+    """
+    orders = Order.objects.using(using).all()
+    rollups = OrderRollup.objects.using(using).all()
+    deltas = OrderRollupDelta.objects.using(using).all()
+    if start is not None:
+        start = bucket_start(start, RollupGranularity.DAY)
+        orders = orders.filter(created_at__gte=start)
+        rollups = rollups.filter(bucket__gte=start)
+        deltas = deltas.filter(bucket__gte=start)
+    if end is not None:
+        end = bucket_start(end - timedelta(microseconds=1), RollupGranularity.DAY) + timedelta(days=1)
+        orders = orders.filter(created_at__lt=end)
+        rollups = rollups.filter(bucket__lt=end)
+        deltas = deltas.filter(bucket__lt=end)
+
+    with transaction.atomic(using=using):
+        # Block new deltas until the rebuilt rows are in place, so every order is either in the
+        # aggregates below or has a delta that survives, never neither nor both. On PostgreSQL the
+        # lock also waits for order writes in flight; on SQLite the delete takes the write lock.
+        if connections[using].vendor == 'postgresql':
+            with connections[using].cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {OrderRollupDelta._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+        deltas.delete()
+        rows = []
+        for granularity, truncate in TRUNCATORS.items():
+            aggregates = (
+                orders.annotate(bucket=truncate('created_at', tzinfo=dt_timezone.utc))
+                .values('bucket', 'status')
+                .annotate(order_count=Count('id'), total_amount=Sum('amount'))
+                .order_by()
+            )
+            rows.extend(
+                OrderRollup(granularity=granularity, bucket=row['bucket'], status=row['status'],
+                            order_count=row['order_count'], total_amount=row['total_amount'])
+                for row in aggregates.iterator()
+            )
+        rollups.delete()
+        OrderRollup.objects.using(using).bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def report(start, end, granularity, using=None):
+    """
+    Returns per-bucket order counts and revenue, broken down by status, for [start, end).
+    Rollups from every order shard are summed unless `using` names one database.
+    Deltas not yet compacted are included, read in the same statement as the rollups.
+    """
+    buckets = {}
+    for alias in [using] if using else order_shards():
+        fields = ('bucket', 'status', 'order_count', 'total_amount')
+        window = {'granularity': granularity, 'bucket__gte': bucket_start(start, granularity), 'bucket__lt': end}
+        rows = (
+            OrderRollup.objects.using(alias).filter(**window).values_list(*fields)
+            .union(OrderRollupDelta.objects.using(alias).filter(**window).values_list(*fields), all=True)
+        )
+        for bucket, status, count, amount in rows:
+            entry = buckets.setdefault(bucket, {
+                'bucket': bucket,
+                'order_count': 0,
+                'total_amount': Decimal('0'),
+                'by_status': {},
+            })
+            entry['order_count'] += count
+            entry['total_amount'] += amount
+            by_status = entry['by_status'].setdefault(status, {
+                'order_count': 0,
+                'total_amount': Decimal('0'),
+            })
+            by_status['order_count'] += count
+            by_status['total_amount'] += amount
+    return [
+        dict(entry, by_status=dict(sorted(
+            (status, totals) for status, totals in entry['by_status'].items() if totals['order_count']
+        )))
+        for _, entry in sorted(buckets.items())
+        if entry['order_count']
+    ]
@@ -0,0 +1,299 @@
+import heapq
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, IntegerField
+from django.db.models.expressions import RawSQL
+
+from .catalog import catalog
+from .models import Item, Order
+from .sharding import is_sharded, order_shards, shard_for_customer, with_customers
+
+FTS_TABLE = 'customerorder_order_fts'
+SEARCH_MODES = ('prefix', 'fuzzy')
+MAX_MATCHING_ITEMS = 1000
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(query):
+    """
+    Split a search query into lower-cased word tokens.
+    """
+    return [token.lower() for token in _TOKEN_RE.findall(query)]
+
+
+def _trigrams(query):
+    """
+    Return the distinct trigrams of a query, matching the FTS5 trigram tokenizer.
+    """
+    text = ' '.join(_tokens(query))
+    seen = []
+    for i in range(len(text) - 2):
+        gram = text[i:i + 3]
+        if ' ' not in gram and gram not in seen:
+            seen.append(gram)
+    return seen
+
+
+def _fts_string(value):
+    """
+    Quote a value as an FTS5 string literal.
+    """
+    return '"{}"'.format(value.replace('"', '""'))
+
+
+def index_order(order, using='default'):
+    """
+    Mirror an order's item text into the SQLite FTS5 shadow table.
+    PostgreSQL maintains its GIN indexes itself, so this is a no-op there.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [order.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, item, customer_id) VALUES (%s, %s, %s)",
+            [order.pk, order.item, order.customer_id],
+        )
+
+
+def unindex_order(order_id, using='default'):
+    """
+    Remove an order from the SQLite FTS5 shadow table.
+    """
+    unindex_orders([order_id], using=using)
+
+
+def unindex_orders(order_ids, using='default'):
+    """
+    Remove several orders from the SQLite FTS5 shadow table in one statement.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not order_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", list(order_ids))
+
+
+def rebuild_index(using='default', batch_size=2000):
+    """
+    Repopulate the SQLite FTS5 shadow table from the order table,
+    e.g. after rows were written with bulk operations that bypass signals.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        # Item names come from the catalog, which may live on another database.
+        orders = Order.objects.using(using).values_list('pk', 'catalog_item_id', 'customer_id').order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(orders.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            names = catalog.names_for({item_id for _, item_id, _ in batch})
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, item, customer_id) VALUES (%s, %s, %s)",
+                [(pk, names.get(item_id, ''), customer_id) for pk, item_id, customer_id in batch],
+            )
+
+
+class SQLiteSearchResults:
+    """
+    Lazily evaluated, rank-ordered search results backed by the FTS5 shadow table.
+    Supports count() and slicing so it can be handed to a Django paginator.
+    """
+
+    def __init__(self, match, customer_id=None, prefixes=(), using='default'):
+        self.match = match
+        self.customer_id = customer_id
+        self.prefixes = prefixes
+        self.using = using
+
+    def _where(self):
+        clauses, params = [], []
+        if self.match is not None:
+            clauses.append(f"{FTS_TABLE} MATCH %s")
+            params.append(self.match)
+        if self.customer_id is not None:
+            clauses.append("customer_id = %s")
+            params.append(self.customer_id)
+        for prefix in self.prefixes:
+            # The trigram index matches substrings; anchor each token to a word start.
+            clauses.append("(item LIKE %s OR item LIKE %s)")
+            params.extend([f"{prefix}%", f"% {prefix}%"])
+        return ' AND '.join(clauses) or '1', params
+
+    def count(self):
+        where, params = self._where()
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {where}", params)
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        return [order for _, order in self.ranked(key.start or 0, key.stop)]
+
+    def ranked(self, start=0, stop=None):
+        """
+        Returns (sort key, order) pairs for results [start, stop), best first.
+        """
+        limit = -1 if stop is None else max(stop - start, 0)
+        where, params = self._where()
+        rank = 'rank' if self.match is not None else '0.0'
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, {rank} FROM {FTS_TABLE} WHERE {where} "
+                f"ORDER BY {rank}, rowid DESC LIMIT %s OFFSET %s",
+                params + [limit, start],
+            )
+            rows = cursor.fetchall()
+        orders = with_customers(Order.objects.using(self.using)).in_bulk([pk for pk, _ in rows])
+        return [((rank, -pk), orders[pk]) for pk, rank in rows if pk in orders]
+
+
+def _search_sqlite(query, customer_id, mode, using):
+    tokens = _tokens(query)
+    if mode == 'fuzzy':
+        grams = _trigrams(query)
+        if grams:
+            match = ' OR '.join(_fts_string(gram) for gram in grams)
+            return SQLiteSearchResults(match, customer_id, using=using)
+    # Tokens shorter than a trigram cannot use the index; they are only checked by LIKE.
+    match = ' AND '.join(_fts_string(token) for token in tokens if len(token) >= 3)
+    return SQLiteSearchResults(match or None, customer_id, prefixes=tokens, using=using)
+
+
+def _matching_items(query, mode):
+    """
+    Returns the ids of the catalog items matching a query, best match first.
+    """
+    items = Item.objects.using('default')
+    if mode == 'fuzzy':
+        text = ' '.join(_tokens(query))
+        items = items.filter(
+            RawSQL("customerorder_item.name %% %s", [text], output_field=BooleanField())
+        ).annotate(
+            rank=RawSQL("similarity(customerorder_item.name, %s)", [text], output_field=FloatField())
+        )
+    else:
+        tsquery = ' & '.join(f"{token}:*" for token in _tokens(query))
+        items = items.filter(
+            RawSQL(
+                "to_tsvector('simple', customerorder_item.name) @@ to_tsquery('simple', %s)",
+                [tsquery], output_field=BooleanField(),
+            )
+        ).annotate(
+            rank=RawSQL(
+                "ts_rank(to_tsvector('simple', customerorder_item.name), to_tsquery('simple', %s))",
+                [tsquery], output_field=FloatField(),
+            )
+        )
+    return list(items.order_by('-rank', 'pk').values_list('pk', flat=True)[:MAX_MATCHING_ITEMS])
+
+
+def _search_postgresql(query, customer_id, mode, using):
+    # Names are matched in the (small) item catalog, then orders are fetched by item.
+    item_ids = _matching_items(query, mode)
+    orders = with_customers(Order.objects.using(using)).filter(catalog_item_id__in=item_ids)
+    if customer_id is not None:
+        orders = orders.filter(customer_id=customer_id)
+    return orders.annotate(
+        item_rank=RawSQL("array_position(%s::bigint[], customerorder_order.catalog_item_id)", [item_ids],
+                          output_field=IntegerField())
+    ).order_by('item_rank', '-id')
+
+
+def _ranked(part, stop):
+    """
+    Returns (sort key, order) pairs for the first `stop` results of one shard, best first.
+    Keys compare across shards of the same database vendor.
+    """
+    if isinstance(part, SQLiteSearchResults):
+        return part.ranked(0, stop)
+    # PostgreSQL ranks by the order's position in the item list matched on `default`,
+    # which is the same for every shard; the unindexed fallback only orders by id.
+    return [((getattr(order, 'item_rank', 0), -order.pk), order) for order in part[:stop]]
+
+
+class ShardedSearchResults:
+    """
+    Global search results over several order shards, merged by rank so the best match
+    comes first whichever shard holds it. Supports count() and slicing like the others;
+    a page is built from the first `stop` results of every shard.
+    """
+
+    def __init__(self, parts):
+        self.parts = parts
+        self._counts = None
+
+    def counts(self):
+        if self._counts is None:
+            self._counts = [part.count() for part in self.parts]
+        return self._counts
+
+    def count(self):
+        return sum(self.counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("ShardedSearchResults only supports slicing.")
+        start, stop = key.start or 0, key.stop if key.stop is not None else self.count()
+        if stop <= start:
+            return []
+        merged = heapq.merge(*(_ranked(part, stop) for part in self.parts), key=lambda pair: pair[0])
+        return [order for _, order in list(merged)[start:stop]]
+
+
+def search_orders(query, customer=None, mode='prefix', using=None):
+    """
+    Search orders by item text, ranked by relevance.
+
+    `mode` is either 'prefix' (every word in the query must start a word in the
+    item) or 'fuzzy' (trigram similarity, tolerant of typos). Pass `customer`
+    to scope the search to one customer's orders; leave it as None to search
+    globally. Searches the customer's shard, or every shard when global, unless
+    `using` names a database. Returns an object supporting count() and slicing.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {mode}")
+    if not _tokens(query):
+        return Order.objects.none()
+
+    customer_id = getattr(customer, 'pk', customer)
+    if customer_id is not None:
+        customer_id = int(customer_id)
+    if using is None:
+        if customer is not None:
+            using = shard_for_customer(customer)
+        elif is_sharded():
+            return ShardedSearchResults([search_orders(query, None, mode, using=alias)
+                                         for alias in order_shards()])
+        else:
+            using = 'default'
+    vendor = connections[using].vendor
+    if vendor == 'sqlite':
+        return _search_sqlite(query, customer_id, mode, using)
+    if vendor == 'postgresql':
+        return _search_postgresql(query, customer_id, mode, using)
+
+    # Other backends have no search index; fall back to an unindexed scan.
+    orders = with_customers(Order.objects.using(using))
+    if customer_id is not None:
+        orders = orders.filter(customer_id=customer_id)
+    items = Item.objects.using('default')
+    for token in _tokens(query):
+        items = items.filter(name__icontains=token)
+    return orders.filter(catalog_item_id__in=list(items.values_list('pk', flat=True))).order_by('-id')
@@ -7,13 +7,16 @@ Retrieve the custom user model.
 """
 
 from rest_framework import serializers
-from .models import Order
+from .events import ORDER_EVENT_TYPES
+from .models import Order, RollupGranularity, WebhookSubscription
 
 class OrderSerializer(serializers.ModelSerializer):
     """
     Serializer for the Order model with custom customer details and validation.
+    Items are read and written by name; the model maps names to catalog entries.
     """
     customer_details = serializers.SerializerMethodField()
+    item = serializers.CharField(max_length=255)
 
     class Meta:
         model = Order
@@ -44,7 +47,9 @@ class OrderSerializer(serializers.ModelSerializer):
         """
         validated_data.pop('customer', None)
         user = self.context['request'].user
-        order = Order.objects.create(customer=user, **validated_data)
+        # Saving the instance (rather than Order.objects.create) lets the router pick the user's shard.
+        order = Order(customer=user, **validated_data)
+        order.save()
         return order
 
 class UserSerializer(serializers.ModelSerializer):
@@ -78,3 +83,68 @@ class UserSerializer(serializers.ModelSerializer):
         user.set_password(validated_data['password'])
         user.save()
         return user
+
+class OrderReportQuerySerializer(serializers.Serializer):
+    """
+    Validates the time range and granularity of an order report request.
+    """
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    granularity = serializers.ChoiceField(choices=RollupGranularity.choices, default=RollupGranularity.DAY)
+
+    def validate(self, attrs):
+        """
+        Ensure the range is not empty.
+        """
+        if attrs['start'] >= attrs['end']:
+            raise serializers.ValidationError("start must be before end.")
+        return attrs
+
+class OrderReportStatusSerializer(serializers.Serializer):
+    """
+    Order count and revenue for a single status within a bucket.
+    """
+    order_count = serializers.IntegerField()
+    total_amount = serializers.DecimalField(max_digits=18, decimal_places=2)
+
+class OrderReportBucketSerializer(serializers.Serializer):
+    """
+    Order count and revenue for one time bucket, broken down by status.
+    """
+    bucket = serializers.DateTimeField()
+    order_count = serializers.IntegerField()
+    total_amount = serializers.DecimalField(max_digits=18, decimal_places=2)
+    by_status = serializers.DictField(child=OrderReportStatusSerializer())
+
+class WebhookSubscriptionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for webhook subscriptions. The signing secret is generated server-side.
+    """
+    class Meta:
+        model = WebhookSubscription
+        fields = ['id', 'url', 'secret', 'events', 'customer', 'max_concurrency', 'is_active', 'created_at']
+        read_only_fields = ['secret', 'created_at']
+
+    def validate_events(self, value):
+        """
+        Validates that only known order event types are subscribed to.
+        """
+        unknown = set(value) - set(ORDER_EVENT_TYPES)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown event types: {', '.join(sorted(unknown))}.")
+        return value
+
+    def validate_max_concurrency(self, value):
+        """
+        Validates that at least one request may be in flight.
+        """
+        if value < 1:
+            raise serializers.ValidationError("max_concurrency must be at least 1.")
+        return value
+
+class OrderEventTicketSerializer(serializers.Serializer):
+    """
+    A short-lived ticket for opening the order event stream with `?ticket=`.
+    """
+    ticket = serializers.CharField()
+    expires_in = serializers.IntegerField()
@@ -0,0 +1,306 @@
+"""
+Customer-sharded order storage.
+
+Orders and the tables derived from them (rollups, the webhook outbox, the SQLite search
+index) live on the database aliases listed in ORDER_SHARDS; everything else stays on
+`default`. Every customer's orders live on one shard, recorded in User.order_shard
+(customers without one live on the first shard). With the default
+ORDER_SHARDS = ['default'] nothing is routed and none of this costs anything.
+
+Order and webhook delivery ids are allocated from IdSequence rows on `default` so they
+stay unique across shards and survive moving a customer.
+"""
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+SHARDED_MODELS = {'order', 'orderrollup', 'orderrollupdelta', 'webhookdelivery'}
+ID_BLOCK_SIZE = getattr(settings, 'ORDER_ID_BLOCK_SIZE', 100)
+
+
+def order_shards():
+    return list(getattr(settings, 'ORDER_SHARDS', ['default']))
+
+
+def is_sharded():
+    return order_shards() != ['default']
+
+
+def is_sharded_model(model):
+    return model._meta.app_label == 'customerorder' and model._meta.model_name in SHARDED_MODELS
+
+
+def placement_for(username):
+    """
+    Pick the shard for a new customer, spreading customers evenly over the configured shards.
+    """
+    shards = order_shards()
+    return shards[zlib.crc32(username.encode()) % len(shards)]
+
+
+def shard_for_customer(customer):
+    """
+    Returns the database alias holding a customer's orders. Accepts a User or a user id;
+    passing the User avoids a lookup.
+    """
+    shards = order_shards()
+    if shards == ['default']:
+        return 'default'
+    from .models import User
+
+    if isinstance(customer, User):
+        shard = customer.order_shard
+    else:
+        shard = User.objects.filter(pk=customer).values_list('order_shard', flat=True).first()
+    return shard if shard in shards else shards[0]
+
+
+def with_customers(queryset):
+    """
+    Attach each order's customer in bulk: a join where users share the database,
+    a second query against `default` otherwise.
+    """
+    if queryset.db == 'default':
+        return queryset.select_related('customer')
+    return queryset.prefetch_related('customer')
+
+
+class ShardMoveInProgress(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "This customer's orders are being moved. Please retry shortly."
+    default_code = 'shard_move_in_progress'
+
+
+def ensure_writable(customer):
+    """
+    Refuse order writes for a customer whose orders are being moved between shards.
+    The fence is read from the user row, so every process sees it as soon as a move starts.
+    """
+    if not is_sharded():
+        return
+    from .models import User
+
+    if User.objects.filter(pk=customer.pk, order_shard_moving_from__isnull=False).exists():
+        raise ShardMoveInProgress()
+
+
+def move_source(customer):
+    """
+    Returns the shard a customer's orders are moved from: the shard of an interrupted move
+    still in progress, else their current shard.
+    """
+    return customer.order_shard_moving_from or shard_for_customer(customer)
+
+
+class IdAllocator:
+    """
+    Hands out globally unique ids for a sharded table in blocks reserved from the
+    IdSequence row on `default`, so only one in ID_BLOCK_SIZE inserts touches it.
+    """
+
+    def __init__(self, name, model_name, block_size=ID_BLOCK_SIZE):
+        self.name = name
+        self.model_name = model_name
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.next_id = self.limit = 0
+
+    def _first_free_id(self):
+        """
+        One past the highest id already stored on any shard, for a sequence's first use.
+        """
+        from django.apps import apps
+
+        model = apps.get_model('customerorder', self.model_name)
+        manager = getattr(model, 'all_objects', model._default_manager)
+        return max((manager.using(alias).aggregate(top=Max('pk'))['top'] or 0) for alias in order_shards()) + 1
+
+    def _reserve(self, count):
+        from .models import IdSequence
+
+        with transaction.atomic(using='default'):
+            sequence = IdSequence.objects.select_for_update().filter(name=self.name).first()
+            if sequence is None:
+                try:
+                    with transaction.atomic(using='default'):
+                        sequence = IdSequence.objects.create(name=self.name, next_value=self._first_free_id())
+                except IntegrityError:
+                    sequence = IdSequence.objects.select_for_update().get(name=self.name)
+            start = sequence.next_value
+            sequence.next_value = start + count
+            sequence.save(update_fields=['next_value'])
+        return start
+
+    def allocate(self, count=1):
+        """
+        Returns a list of `count` unused ids.
+        """
+        with self.lock:
+            if count > self.block_size:
+                start = self._reserve(count)
+                return list(range(start, start + count))
+            ids = []
+            while len(ids) < count:
+                if self.next_id >= self.limit:
+                    self.next_id = self._reserve(self.block_size)
+                    self.limit = self.next_id + self.block_size
+                take = min(count - len(ids), self.limit - self.next_id)
+                ids.extend(range(self.next_id, self.next_id + take))
+                self.next_id += take
+            return ids
+
+
+order_ids = IdAllocator('order', 'order')
+delivery_ids = IdAllocator('webhook_delivery', 'webhookdelivery')
+
+
+def assign_ids(instances, allocator):
+    """
+    Give unsaved instances globally unique primary keys before a bulk insert on a shard.
+    """
+    pending = [instance for instance in instances if instance.pk is None]
+    if pending and is_sharded():
+        for instance, pk in zip(pending, allocator.allocate(len(pending))):
+            instance.pk = pk
+    return instances
+
+
+class OrderShardRouter:
+    """
+    Routes orders, rollups and webhook deliveries to their customer's shard and keeps
+    every other model on `default`.
+    """
+
+    def _db_for(self, model, **hints):
+        if not is_sharded():
+            return None
+        if not is_sharded_model(model):
+            # Without this, a customer fetched through an order would be read from the order's shard.
+            return 'default'
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if is_sharded_model(type(instance)):
+            if instance._state.db:
+                return instance._state.db
+            customer = instance._state.fields_cache.get('customer')
+            customer_id = getattr(instance, 'customer_id', None)
+            if customer is not None or customer_id is not None:
+                return shard_for_customer(customer if customer is not None else customer_id)
+            return None
+        # Related lookups from a customer, e.g. `user.orders.all()`.
+        if type(instance)._meta.model_name == 'user':
+            return shard_for_customer(instance)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_sharded() and (is_sharded_model(type(obj1)) or is_sharded_model(type(obj2))):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not is_sharded():
+            return None
+        if app_label == 'customerorder' and model_name in SHARDED_MODELS:
+            return db in order_shards()
+        return db == 'default'
+
+
+def _copy_orders(orders, target, batch_size, on_batch):
+    """
+    Copy orders to `target` in batches with their ids, order numbers and timestamps, and
+    add the live ones to its search index, rollups and item counters. Returns the ids copied.
+    """
+    from . import catalog, rollups, search
+    from .models import Order
+
+    copied, last_pk = [], 0
+    while True:
+        batch = list(orders.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return copied
+        last_pk = batch[-1].pk
+        copied.extend(order.pk for order in batch)
+        # A resumed move finds the orders it copied before it was interrupted already there.
+        present = set(Order.all_objects.using(target).filter(pk__in=[order.pk for order in batch])
+                      .values_list('pk', flat=True))
+        batch = [order for order in batch if order.pk not in present]
+        live = [order for order in batch if order.deleted_at is None]
+        created = [order.created_at for order in batch]
+        with transaction.atomic(using=target):
+            Order.all_objects.using(target).bulk_create(batch)
+            # bulk_create stamps auto_now_add fields with the current time; put the originals back.
+            for order, created_at in zip(batch, created):
+                order.created_at = created_at
+            Order.all_objects.using(target).bulk_update(batch, ['created_at'])
+            for order in live:
+                search.index_order(order, using=target)
+            rollups.add_orders(live, using=target)
+            # Deleting the originals takes them off their items' counters; count the copies.
+            catalog.add_orders(live, using=target)
+        on_batch(len(batch))
+
+
+def move_customer(customer, target, batch_size=500, settle=2.0, on_progress=None):
+    """
+    Move all of a customer's orders (including soft-deleted ones) to another shard.
+
+    A fence on the user row refuses order writes for the customer while the move runs,
+    after `settle` seconds for writes already in flight to finish. Orders are copied
+    in batches with their ids, order numbers and timestamps; then the customer is
+    switched to the new shard and exactly the copied originals are deleted. Orders that
+    still reached the old shard meanwhile are copied in another pass, never deleted
+    uncopied. The search index and rollups follow the orders. An interrupted move keeps
+    its fence and is resumed by moving the customer again. Returns the number of orders moved.
+    """
+    from .models import Order, User
+
+    if target not in order_shards():
+        raise ValueError(f"Unknown shard: {target}")
+    source = move_source(customer)
+    if source == target:
+        return 0
+    on_progress = on_progress or (lambda moved: None)
+
+    User.objects.filter(pk=customer.pk).update(order_shard_moving_from=source)
+    customer.order_shard_moving_from = source
+    time.sleep(settle)
+
+    originals = Order.all_objects.using(source).filter(customer_id=customer.pk).order_by('pk')
+    moved = 0
+
+    def progress(count):
+        nonlocal moved
+        moved += count
+        on_progress(moved)
+
+    while True:
+        copied = _copy_orders(originals, target, batch_size, progress)
+        if not copied:
+            break
+        if customer.order_shard != target:
+            customer.order_shard = target
+            customer.save(update_fields=['order_shard'])
+        for start in range(0, len(copied), batch_size):
+            with transaction.atomic(using=source):
+                # Signals take the live orders out of the source shard's index and rollups.
+                Order.all_objects.using(source).filter(pk__in=copied[start:start + batch_size]).delete()
+
+    if customer.order_shard != target:
+        customer.order_shard = target
+        customer.save(update_fields=['order_shard'])
+    User.objects.filter(pk=customer.pk).update(order_shard_moving_from=None)
+    customer.order_shard_moving_from = None
+    return moved
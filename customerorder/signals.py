@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import catalog, events, rollups, search, webhooks
+from .models import Item, Order, WebhookSubscription
+
+
+@receiver(post_save, sender=Order)
+def index_order_for_search(sender, instance, using, **kwargs):
+    """
+    Keep the order search index in sync when an order is saved.
+    """
+    search.index_order(instance, using=using)
+
+
+@receiver(post_delete, sender=Order)
+def unindex_order_for_search(sender, instance, using, **kwargs):
+    """
+    Remove a deleted order from the search index. Soft-deleted orders were already removed.
+    """
+    if instance.deleted_at is None:
+        search.unindex_order(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Order)
+def update_rollups_on_save(sender, instance, using, **kwargs):
+    """
+    Apply an order's create or status/amount change to the revenue rollups.
+    """
+    rollups.record_order_saved(instance, using=using)
+
+
+@receiver(post_delete, sender=Order)
+def update_rollups_on_delete(sender, instance, using, **kwargs):
+    """
+    Remove a deleted order from the revenue rollups. Soft-deleted orders were already removed.
+    """
+    if instance.deleted_at is None:
+        rollups.record_order_deleted(instance, using=using)
+
+
+@receiver(post_save, sender=Order)
+def update_item_counters_on_save(sender, instance, using, **kwargs):
+    """
+    Apply an order's create or item/amount change to the item counters.
+    """
+    catalog.record_order_saved(instance, using=using)
+
+
+@receiver(post_delete, sender=Order)
+def update_item_counters_on_delete(sender, instance, using, **kwargs):
+    """
+    Remove a deleted order from its item's counters. Soft-deleted orders were already removed.
+    """
+    if instance.deleted_at is None:
+        catalog.record_order_deleted(instance, using=using)
+
+
+@receiver(post_delete, sender=Item)
+def forget_deleted_item(sender, instance, **kwargs):
+    """
+    Drop a deleted item from the in-process catalog cache.
+    """
+    catalog.catalog.forget(instance.pk)
+
+
+@receiver(post_migrate)
+def clear_item_catalog(sender, **kwargs):
+    """
+    Drop the in-process catalog cache after migrations or a flush, which may have removed items.
+    """
+    catalog.catalog.clear()
+
+
+@receiver(post_save, sender=Order)
+def publish_order_event(sender, instance, created, using, **kwargs):
+    """
+    Publish an order event to the customer's event stream once the write commits,
+    and queue it for webhook delivery in the same transaction as the write.
+    """
+    if created:
+        event_type = events.ORDER_CREATED
+    elif instance.status != getattr(instance, '_loaded_status', instance.status):
+        event_type = events.ORDER_STATUS_CHANGED
+    else:
+        event_type = events.ORDER_UPDATED
+    instance._loaded_status = instance.status
+
+    customer_id, payload = instance.customer_id, events.order_payload(instance)
+    webhooks.enqueue(event_type, payload, customer_id, using=using)
+    transaction.on_commit(lambda: events.publish(customer_id, event_type, payload), using=using)
+
+
+@receiver(post_save, sender=WebhookSubscription)
+@receiver(post_delete, sender=WebhookSubscription)
+def invalidate_webhook_subscriptions(sender, **kwargs):
+    """
+    Drop the cached subscription list when a subscription is added, changed or removed.
+    """
+    webhooks.invalidate_subscriptions()
@@ -0,0 +1,13 @@
+import pytest
+
+from customerorder.catalog import catalog
+
+
+@pytest.fixture(autouse=True)
+def clear_item_catalog():
+    """
+    Forget cached item ids between tests: rolled-back items may have been cached by
+    on-commit callbacks run with django_capture_on_commit_callbacks(execute=True).
+    """
+    yield
+    catalog.clear()
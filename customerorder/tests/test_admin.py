@@ -0,0 +1,125 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from customerorder import events, rollups
+from customerorder.admin import EstimatedCountPaginator
+from customerorder.models import (
+    Order, OrderRollup, OrderStatus, RollupGranularity, WebhookDelivery, WebhookSubscription,
+)
+
+User = get_user_model()
+
+
+@pytest.fixture
+def customer():
+    return User.objects.create_user(username='testuser', password='pass', phone_number='+254700000000')
+
+
+@pytest.fixture
+def staff_client(client):
+    admin_user = User.objects.create_superuser(username='admin', password='pass', email='admin@example.com')
+    client.force_login(admin_user)
+    return client
+
+
+def _changelist_queries(staff_client):
+    with CaptureQueriesContext(connection) as queries:
+        response = staff_client.get(reverse('admin:customerorder_order_changelist'))
+    assert response.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.django_db
+class TestOrderAdmin:
+    def test_changelist_queries_do_not_grow_with_rows(self, staff_client, customer):
+        Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        few = _changelist_queries(staff_client)
+
+        other = User.objects.create_user(username='other', password='pass', phone_number='+254700000001')
+        for _ in range(5):
+            Order.objects.create(customer=other, item='Mouse', amount='10.00')
+
+        # Customers and items are joined, not fetched per row.
+        assert _changelist_queries(staff_client) == few
+
+    def test_status_action_updates_orders_and_rollups(self, staff_client, customer,
+                                                      django_capture_on_commit_callbacks):
+        orders = [Order.objects.create(customer=customer, item='Laptop', amount='600.00') for _ in range(2)]
+        Order.objects.create(customer=customer, item='Mouse', amount='20.00')
+        subscription = WebhookSubscription.objects.create(url='https://example.com/hook',
+                                                          events=[events.ORDER_STATUS_CHANGED])
+        cache.clear()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = staff_client.post(reverse('admin:customerorder_order_changelist'), {
+                'action': 'mark_completed',
+                '_selected_action': [order.pk for order in orders],
+            })
+
+        assert response.status_code == 302
+        assert Order.objects.filter(status=OrderStatus.COMPLETED).count() == 2
+        # Subscribers hear about each changed order, as they do for single saves.
+        queued = WebhookDelivery.objects.filter(subscription=subscription).order_by('id')
+        assert [(d.payload['id'], d.payload['status']) for d in queued] == [
+            (order.pk, OrderStatus.COMPLETED) for order in orders
+        ]
+        logged, _, _ = events.event_log.read_since(customer.id, 0, limit=10)
+        assert [(event['type'], event['data']['id']) for event in logged] == [
+            (events.ORDER_STATUS_CHANGED, order.pk) for order in orders
+        ]
+        rollups.compact()
+        for granularity in RollupGranularity.values:
+            rows = OrderRollup.objects.filter(granularity=granularity)
+            pending = rows.get(status=OrderStatus.PENDING)
+            completed = rows.get(status=OrderStatus.COMPLETED)
+            assert (pending.order_count, pending.total_amount) == (1, Decimal('20.00'))
+            assert (completed.order_count, completed.total_amount) == (2, Decimal('1200.00'))
+
+    def test_delete_soft_deletes(self, staff_client, customer):
+        order = Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+
+        response = staff_client.post(reverse('admin:customerorder_order_delete', args=[order.pk]), {'post': 'yes'})
+
+        assert response.status_code == 302
+        assert not Order.objects.filter(pk=order.pk).exists()
+        assert Order.all_objects.get(pk=order.pk).deleted_at is not None
+
+    def test_paginator_counts_exactly_without_planner_estimates(self, customer):
+        Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+
+        # SQLite has no row estimates; small results are always counted exactly.
+        assert EstimatedCountPaginator(Order.objects.order_by('pk'), 100).count == 1
+
+
+@pytest.mark.django_db
+class TestUserAdmin:
+    def test_add_form_asks_for_a_unique_phone_number(self, staff_client, customer):
+        def add(username, phone_number):
+            return staff_client.post(reverse('admin:customerorder_user_add'), {
+                'username': username, 'email': f'{username}@example.com', 'phone_number': phone_number,
+                'usable_password': 'true', 'password1': 'x8#kQ!v2Lm', 'password2': 'x8#kQ!v2Lm',
+            })
+
+        assert add('first', '+254700000001').status_code == 302
+        assert add('second', '+254700000002').status_code == 302
+        for response in (add('third', ''), add('third', '+254700000000')):
+            assert response.status_code == 200
+            assert 'phone_number' in response.context['adminform'].form.errors
+        assert User.objects.get(username='second').phone_number == '+254700000002'
+
+    def test_changelist_and_delete(self, staff_client, customer):
+        response = staff_client.get(reverse('admin:customerorder_user_changelist'), {'q': '+254700000000'})
+        assert response.status_code == 200
+        assert response.context['cl'].result_list[0] == customer
+
+        response = staff_client.post(reverse('admin:customerorder_user_delete', args=[customer.pk]), {'post': 'yes'})
+
+        assert response.status_code == 302
+        customer.refresh_from_db()
+        assert (customer.is_active, customer.deleted_at is not None) == (False, True)
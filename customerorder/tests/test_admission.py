@@ -0,0 +1,131 @@
+import threading
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customer_order_service.admission import AdmissionController, AdmissionControlMiddleware, DEFAULT_GROUPS, \
+    route_group
+
+factory = RequestFactory()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SlowDependencyStub:
+    """
+    Stands in for the view: order writes block, like a hung SMS provider, until released.
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.entered = threading.Semaphore(0)
+
+    def __call__(self, request):
+        if request.method == 'POST':
+            self.entered.release()
+            self.release.wait(5)
+        return HttpResponse('ok')
+
+
+class TestRouteGroups:
+    def test_requests_are_grouped_by_route_and_method(self):
+        assert route_group(factory.post('/api/login/')) == 'auth'
+        assert route_group(factory.get('/api/orders/')) == 'order_reads'
+        assert route_group(factory.get('/api/orders/7/')) == 'order_reads'
+        assert route_group(factory.post('/api/orders/create/')) == 'order_writes'
+        assert route_group(factory.delete('/api/orders/7/')) == 'order_writes'
+        assert route_group(factory.get('/healthz/')) is None
+        assert route_group(factory.get('/no/such/page/')) is None
+
+
+class TestAdmissionControlMiddleware:
+    def test_slow_writes_are_shed_while_reads_keep_flowing(self):
+        controller = AdmissionController(DEFAULT_GROUPS, capacity=4, read_reserve=0.25)
+        stub = SlowDependencyStub()
+        middleware = AdmissionControlMiddleware(stub, controller=controller)
+
+        # Three writes occupy everything low-priority work may use; the last slot is kept for reads.
+        writers = [threading.Thread(target=middleware, args=(factory.post('/api/orders/create/'),))
+                   for _ in range(3)]
+        for writer in writers:
+            writer.start()
+        for _ in writers:
+            assert stub.entered.acquire(timeout=5)
+
+        try:
+            shed = middleware(factory.post('/api/orders/create/'))
+            assert shed.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            assert int(shed['Retry-After']) >= 1
+            assert middleware(factory.post('/api/login/')).status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            assert middleware(factory.get('/api/orders/')).status_code == status.HTTP_200_OK
+        finally:
+            stub.release.set()
+            for writer in writers:
+                writer.join()
+
+        assert controller.in_flight == 0
+        assert controller.groups['order_writes'].rejected == 1
+        assert middleware(factory.post('/api/orders/create/')).status_code == status.HTTP_200_OK
+
+    def test_server_errors_are_released_and_count_as_failures(self):
+        controller = AdmissionController(DEFAULT_GROUPS, capacity=4)
+        middleware = AdmissionControlMiddleware(lambda request: HttpResponse(status=502), controller=controller)
+
+        middleware(factory.post('/api/orders/create/'))
+
+        writes = controller.groups['order_writes']
+        assert writes.in_flight == 0
+        assert writes.current < 4  # backed off
+
+
+class TestAdaptiveLimit:
+    def test_limit_shrinks_when_slow_and_recovers_when_fast(self):
+        clock = FakeClock()
+        controller = AdmissionController(DEFAULT_GROUPS, capacity=16, clock=clock)
+        writes = controller.groups['order_writes']
+
+        # Slow responses (above the 1s target) spread over time keep cutting the limit.
+        for _ in range(10):
+            ticket = controller.acquire('order_writes')
+            clock.now += 3.0
+            controller.release(ticket)
+        assert writes.current == 1
+        ticket = controller.acquire('order_writes')
+        assert ticket is not None
+        assert controller.acquire('order_writes') is None  # one in flight is all it gets now
+        controller.release(ticket)
+
+        for _ in range(200):
+            ticket = controller.acquire('order_writes')
+            clock.now += 0.05
+            controller.release(ticket)
+        assert writes.current == 16
+
+    def test_one_slow_burst_backs_off_once(self):
+        clock = FakeClock()
+        controller = AdmissionController(DEFAULT_GROUPS, capacity=10, clock=clock)
+        tickets = [controller.acquire('order_writes') for _ in range(5)]
+        clock.now += 3.0
+        for ticket in tickets:
+            controller.release(ticket)
+
+        assert controller.groups['order_writes'].current == 7  # 10 * 0.7, not 10 * 0.7 ** 5
+
+
+class TestAdmissionMetrics:
+    def test_metrics_expose_limiter_state(self):
+        response = APIClient().get(reverse('admission-metrics'))
+
+        assert response.status_code == status.HTTP_200_OK
+        body = response.content.decode()
+        assert 'admission_limit{group="order_reads"}' in body
+        assert 'admission_rejected_total{group="order_writes"}' in body
@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customerorder import deletion
+from customerorder.catalog import catalog, compact
+from customerorder.models import Item, Order
+
+User = get_user_model()
+
+
+@pytest.fixture
+def customer():
+    return User.objects.create_user(username='testuser', password='pass', phone_number='+254700000000')
+
+
+@pytest.mark.django_db
+class TestItemCatalog:
+    def test_orders_share_one_catalog_entry_per_item(self, customer):
+        client = APIClient()
+        client.force_authenticate(user=customer)
+
+        response = client.post(reverse('order-create'), {'item': ' Laptop  Bag', 'amount': '40.00'})
+        Order.objects.create(customer=customer, item='Laptop Bag', amount='60.00')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['item'] == 'Laptop Bag'  # clients still send and receive names
+        assert response.data['order_number'].startswith('LA')
+        item = Item.objects.get()
+        assert item.name == 'Laptop Bag'
+        assert set(Order.objects.values_list('catalog_item_id', flat=True)) == {item.pk}
+
+    def test_counters_follow_order_changes(self, customer):
+        laptop = Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        other = Order.objects.create(customer=customer, item='Laptop', amount='800.00')
+
+        order = Order.objects.get(pk=laptop.pk)
+        order.item = 'Desk Lamp'
+        order.amount = Decimal('25.00')
+        order.save()
+        deletion.soft_delete_order(Order.objects.get(pk=other.pk))
+        assert Item.objects.get(name='Laptop').order_count == 0  # writes only append deltas
+        compact()
+
+        counters = {item.name: (item.order_count, item.total_amount) for item in Item.objects.all()}
+        assert counters == {'Laptop': (0, Decimal('0.00')), 'Desk Lamp': (1, Decimal('25.00'))}
+
+        Order.objects.get(pk=laptop.pk).delete()
+        compact()
+        assert Item.objects.get(name='Desk Lamp').order_count == 0
+
+    def test_committed_items_are_resolved_without_queries(self, customer, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            order = Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+
+        order = Order.objects.get(pk=order.pk)
+        with CaptureQueriesContext(connection) as queries:
+            assert order.item == 'Laptop'
+            assert catalog.intern('Laptop') == order.catalog_item_id
+        assert len(queries) == 0
+
+    def test_items_are_only_added_by_saved_orders(self, customer):
+        Order.objects.create(customer=customer, item='Laptop', amount='1200.00', order_number='LA1')
+
+        with CaptureQueriesContext(connection) as queries:
+            order = Order(customer=customer, item='Desk Lamp', amount='25.00', order_number='LA1')
+        assert len(queries) == 0
+        assert order.item == 'Desk Lamp'
+        with pytest.raises(IntegrityError):
+            order.save()
+
+        assert list(Item.objects.values_list('name', flat=True)) == ['Laptop']
+
+    def test_order_writes_do_not_update_the_item_row(self, customer):
+        Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+
+        with CaptureQueriesContext(connection) as queries:
+            Order.objects.create(customer=customer, item='Laptop', amount='800.00')
+
+        assert not any(query['sql'].startswith('UPDATE "customerorder_item"') for query in queries)
+        assert compact() == 2
+        assert Item.objects.get().order_count == 2
@@ -0,0 +1,127 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customerorder import deletion, rollups
+from customerorder.catalog import catalog
+from customerorder.models import Order, OrderRollup, WebhookSubscription
+from customerorder.search import search_orders
+
+User = get_user_model()
+
+
+@pytest.fixture
+def customer():
+    return User.objects.create_user(username='testuser', password='pass', phone_number='+254700000000',
+                                    uid='firebase_uid')
+
+
+@pytest.fixture
+def staff():
+    return User.objects.create_user(username='staff', password='pass', phone_number='+254700000001',
+                                    is_staff=True)
+
+
+def _total_rollup_count():
+    rollups.compact()
+    return sum(OrderRollup.objects.filter(granularity='day').values_list('order_count', flat=True))
+
+
+@pytest.mark.django_db
+class TestOrderSoftDelete:
+    def test_destroy_hides_order_until_purged(self, customer):
+        order = Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        client = APIClient()
+        client.force_authenticate(user=customer)
+
+        response = client.delete(reverse('order-detail', kwargs={'pk': order.pk}))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not Order.objects.filter(pk=order.pk).exists()
+        assert Order.all_objects.get(pk=order.pk).deleted_at is not None  # still on disk
+        assert search_orders('laptop', customer=customer).count() == 0
+        assert _total_rollup_count() == 0
+        assert client.get(reverse('order-detail', kwargs={'pk': order.pk})).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_purge_respects_the_retention_window(self, customer):
+        recent, old = (Order.objects.create(customer=customer, item=item, amount='10.00') for item in ('A', 'B'))
+        deletion.soft_delete_orders([recent, old])
+        Order.all_objects.filter(pk=old.pk).update(deleted_at=timezone.now() - timedelta(days=31))
+
+        call_command('purge_deleted', pause=0)
+
+        assert list(Order.all_objects.values_list('pk', flat=True)) == [recent.pk]
+        assert _total_rollup_count() == 0  # the hard delete did not subtract a second time
+
+
+@pytest.mark.django_db
+class TestCustomerDeletion:
+    def test_delete_request_cost_does_not_grow_with_orders(self, customer, staff):
+        item_id = catalog.intern('Item')
+        Order.objects.bulk_create(
+            Order(customer=customer, catalog_item_id=item_id, amount='1.00', order_number=f'BULK{n}')
+            for n in range(300)
+        )
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.delete(reverse('customer-delete', kwargs={'pk': customer.pk}))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not any('customerorder_order' in query['sql'] for query in queries)  # no cascade in the request
+        customer.refresh_from_db()
+        assert customer.deleted_at is not None and not customer.is_active
+        assert Order.objects.filter(customer=customer).count() == 300  # removed later, in the background
+
+    @patch('firebase_admin.auth.verify_id_token', return_value={'uid': 'firebase_uid'})
+    def test_deleted_customer_cannot_authenticate(self, mock_verify_id_token, customer):
+        deletion.soft_delete_customer(customer)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer token')
+
+        response = client.get(reverse('order-list'))
+        assert response.status_code == status.HTTP_403_FORBIDDEN  # FirebaseAuthentication sends no challenge
+
+    def test_purge_removes_orders_in_batches_then_the_customer(self, customer):
+        other = User.objects.create_user(username='other', password='pass', phone_number='+254700000002')
+        for n in range(7):
+            Order.objects.create(customer=customer, item=f'Item {n}', amount='5.00')
+        kept = Order.objects.create(customer=other, item='Kept', amount='5.00')
+        WebhookSubscription.objects.create(url='https://example.com/hook', customer=customer)
+        deletion.soft_delete_customer(customer)
+
+        batches = []
+        while stats := deletion.purge_batch(batch_size=3):
+            batches.append((stats.orders_hidden, stats.orders_purged, stats.customers_purged))
+
+        assert batches == [(3, 3, 0), (3, 3, 0), (1, 1, 1)]
+        assert not User.objects.filter(pk=customer.pk).exists()
+        assert list(Order.all_objects.all()) == [kept]
+        assert _total_rollup_count() == 1
+        assert search_orders('item').count() == 0
+
+    def test_purge_handles_a_bounded_slice_of_deleted_customers(self, customer):
+        customers = [User.objects.create_user(username=f'gone{n}', password='pass', phone_number=f'+25470000010{n}')
+                     for n in range(5)]
+        for user in customers:
+            Order.objects.create(customer=user, item='Laptop', amount='5.00')
+            deletion.soft_delete_customer(user)
+
+        stats = deletion.purge_batch(batch_size=2)
+
+        # Only the first two deleted customers are handled; the rest wait for later batches.
+        assert (stats.orders_hidden, stats.orders_purged, stats.customers_purged) == (2, 2, 2)
+        assert set(User.objects.values_list('username', flat=True)) == {'testuser', 'gone2', 'gone3', 'gone4'}
+        while deletion.purge_batch(batch_size=2):
+            pass
+        assert not Order.all_objects.exists()
@@ -0,0 +1,144 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from customer_order_service import profiling
+from customerorder import events
+from customerorder.models import Order, OrderStatus
+
+User = get_user_model()
+
+
+@pytest.fixture
+def customer():
+    cache.clear()
+    return User.objects.create_user(username='testuser', password='pass', phone_number='+254700000000',
+                                    uid='firebase_uid')
+
+
+async def _next_chunk(content, timeout=5):
+    chunk = await asyncio.wait_for(content.__anext__(), timeout)
+    return chunk.decode()
+
+
+@pytest.mark.django_db
+class TestOrderEventPublishing:
+    def test_create_and_status_change_are_logged(self, customer, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            order = Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        order = Order.objects.get(pk=order.pk)
+        with django_capture_on_commit_callbacks(execute=True):
+            order.status = OrderStatus.COMPLETED
+            order.save()
+
+        logged, _, _ = events.event_log.read_since(customer.id, 0, limit=10)
+        assert [event['type'] for event in logged] == [events.ORDER_CREATED, events.ORDER_STATUS_CHANGED]
+        assert logged[1]['data']['status'] == 'Completed'
+
+    def test_log_keeps_only_recent_events(self, customer):
+        log = events.OrderEventLog(size=3)
+        for i in range(5):
+            log.append(customer.id, events.ORDER_UPDATED, {'n': i})
+
+        logged, last, _ = log.read_since(customer.id, 0, limit=10)
+        assert [event['data']['n'] for event in logged] == [2, 3, 4]
+        assert last == 5
+
+    def test_read_stops_before_an_event_still_being_written(self, customer):
+        log = events.OrderEventLog()
+        log.append(customer.id, events.ORDER_UPDATED, {'n': 1})
+        cache.incr(log._counter_key(customer.id))  # another writer took id 2 but has not stored it yet
+        log.append(customer.id, events.ORDER_UPDATED, {'n': 3})
+
+        logged, last, waiting = log.read_since(customer.id, 0, limit=10)
+        assert ([event['id'] for event in logged], last, waiting) == ([1], 1, True)
+
+        cache.set(log._event_key(customer.id, 2), {'id': 2, 'type': events.ORDER_UPDATED, 'data': {'n': 2}})
+        logged, last, waiting = log.read_since(customer.id, last, limit=10)
+        assert ([event['id'] for event in logged], last, waiting) == ([2, 3], 3, False)
+
+    def test_read_can_skip_events_that_stay_missing(self, customer):
+        log = events.OrderEventLog()
+        for i in range(3):
+            log.append(customer.id, events.ORDER_UPDATED, {'n': i})
+        cache.delete(log._event_key(customer.id, 2))  # evicted
+
+        logged, last, waiting = log.read_since(customer.id, 0, limit=10, skip_missing=True)
+        assert ([event['id'] for event in logged], last, waiting) == ([1, 3], 3, False)
+
+
+@pytest.mark.django_db
+class TestOrderEventStream:
+    @patch('firebase_admin.auth.verify_id_token', return_value={'uid': 'firebase_uid'})
+    def test_stream_pushes_published_events(self, mock_verify_id_token, customer):
+        async def scenario():
+            response = await AsyncClient().get(reverse('order-events'), headers={'Authorization': 'Bearer token'})
+            assert response.status_code == 200
+            assert response['Content-Type'] == 'text/event-stream'
+            content = response.streaming_content
+
+            assert (await _next_chunk(content)).startswith('retry:')
+            reading = asyncio.ensure_future(_next_chunk(content))
+            await asyncio.sleep(0.1)  # Let the stream subscribe before publishing
+            events.publish(customer.id, events.ORDER_CREATED, {'id': 1})
+            chunk = await reading
+            await content.aclose()
+            return chunk
+
+        chunk = async_to_sync(scenario)()
+        assert 'event: order.created' in chunk
+        assert 'data: {"id": 1}' in chunk
+
+    @patch('firebase_admin.auth.verify_id_token', return_value={'uid': 'firebase_uid'})
+    def test_stream_resumes_from_last_event_id(self, mock_verify_id_token, customer):
+        for i in range(3):
+            events.publish(customer.id, events.ORDER_UPDATED, {'n': i})
+
+        async def scenario():
+            response = await AsyncClient().get(reverse('order-events'),
+                                               headers={'Authorization': 'Bearer token', 'Last-Event-ID': '1'})
+            content = response.streaming_content
+            await _next_chunk(content)  # retry hint
+            chunks = [await _next_chunk(content), await _next_chunk(content)]
+            await content.aclose()
+            return chunks
+
+        chunks = async_to_sync(scenario)()
+        assert chunks[0].startswith('id: 2\n')
+        assert chunks[1].startswith('id: 3\n')
+
+    @patch('firebase_admin.auth.verify_id_token', return_value={'uid': 'firebase_uid'})
+    def test_stream_opens_with_a_ticket(self, mock_verify_id_token, customer):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer token')
+        ticket = client.post(reverse('order-events-ticket')).data['ticket']
+        events.publish(customer.id, events.ORDER_CREATED, {'id': 1})
+
+        async def scenario():
+            response = await AsyncClient().get(reverse('order-events'), {'ticket': ticket},
+                                               headers={'Last-Event-ID': '0'})
+            content = response.streaming_content
+            await _next_chunk(content)  # retry hint
+            chunk = await _next_chunk(content)
+            await content.aclose()
+            return response.status_code, chunk
+
+        status_code, chunk = async_to_sync(scenario)()
+        assert status_code == 200
+        assert 'data: {"id": 1}' in chunk
+
+    def test_stream_requires_authentication(self, customer):
+        async def scenario(params):
+            return await AsyncClient().get(reverse('order-events'), params)
+
+        assert async_to_sync(scenario)({}).status_code == 401
+        # Tickets are signed for the stream only; a profiling token or a forged value is refused.
+        for ticket in (f'{customer.pk}:forged', profiling.issue_token(customer)):
+            assert async_to_sync(scenario)({'ticket': ticket}).status_code == 401
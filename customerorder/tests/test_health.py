@@ -0,0 +1,27 @@
+from unittest.mock import patch
+
+import pytest
+from django.db import OperationalError
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+class TestHealthEndpoints:
+    def test_liveness(self):
+        response = APIClient().get(reverse('liveness'))
+        assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_readiness_when_database_is_up(self):
+        response = APIClient().get(reverse('readiness'))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'status': 'ok'}
+
+    @pytest.mark.django_db
+    @patch('django.db.backends.utils.CursorWrapper.execute',
+           side_effect=OperationalError('could not connect to server at db.internal:5432'))
+    def test_readiness_when_database_is_down(self, mock_execute):
+        response = APIClient().get(reverse('readiness'))
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json() == {'status': 'unavailable', 'database': 'default'}  # no connection details
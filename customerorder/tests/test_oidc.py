@@ -0,0 +1,51 @@
+import pytest
+from django.contrib.auth import get_user_model
+from oidc_provider.lib.claims import STANDARD_CLAIMS
+from oidc_provider.models import Client, Token
+
+from customerorder.oidc_views import CustomScopeClaims, userinfo
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='testuser', password='pass', email='testuser@example.com',
+                                    phone_number='+254700000000', customer_code='CUST2024092112000001',
+                                    first_name='Test', last_name='User')
+
+
+@pytest.mark.django_db
+class TestOIDCClaims:
+    def test_userinfo_emits_customer_claims(self, user):
+        info = userinfo(dict(STANDARD_CLAIMS), user)
+
+        assert info['name'] == 'Test User'
+        assert info['customer_id'] == str(user.id)
+        assert info['customer_code'] == 'CUST2024092112000001'
+        assert info['phone_number'] == '+254700000000'
+
+    def test_userinfo_needs_no_queries(self, user, django_assert_num_queries):
+        fresh = User.objects.get(pk=user.pk)
+
+        with django_assert_num_queries(0):
+            userinfo(dict(STANDARD_CLAIMS), fresh)
+
+    def test_claims_follow_user_changes(self, user):
+        userinfo(dict(STANDARD_CLAIMS), user)
+
+        user.customer_code = 'CUST2024092112000002'
+        user.save()
+        assert userinfo(dict(STANDARD_CLAIMS), user)['customer_code'] == 'CUST2024092112000002'
+
+        User.objects.filter(pk=user.pk).update(customer_code='CUST2024092112000003')
+        fresh = User.objects.get(pk=user.pk)
+        assert userinfo(dict(STANDARD_CLAIMS), fresh)['customer_code'] == 'CUST2024092112000003'
+
+    def test_customer_scope(self, user):
+        token = Token(user=user, client=Client(name='test', client_id='test'))
+        token.scope = ['openid', 'customer']
+
+        response = CustomScopeClaims(token).create_response_dic()
+
+        assert response == {'customer_id': str(user.id), 'customer_code': 'CUST2024092112000001'}
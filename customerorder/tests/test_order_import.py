@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from customerorder import rollups
+from customerorder.models import Order
+from customerorder.order_import import CustomerMap, OrderImporter
+from customerorder.search import search_orders
+
+User = get_user_model()
+
+
+@pytest.fixture
+def customers():
+    alice = User.objects.create_user(username='alice', password='pass', phone_number='+254700000001',
+                                     customer_code='CUST2020010100000001')
+    bob = User.objects.create_user(username='bob', password='pass', phone_number='+254700000002')
+    return alice, bob
+
+
+@pytest.mark.django_db
+class TestImportOrdersCommand:
+    def test_imports_orders_with_their_numbers_and_timestamps(self, customers, tmp_path):
+        alice, bob = customers
+        path = tmp_path / 'orders.csv'
+        path.write_text(
+            "order_number,phone_number,customer_code,item,amount,status,created_at\n"
+            "OLD-1,,CUST2020010100000001,Gaming Laptop,1500.00,completed,2020-01-05T10:00:00Z\n"
+            "OLD-2,+254700000002,,Desk Lamp,25.5,Pending,2020-01-05 11:30:00\n"
+            "OLD-3,+254700000001,,Laptop Bag,40,Canceled,2020-01-06T09:00:00+03:00\n"
+        )
+
+        call_command('import_orders', str(path), '--chunk-size', '2')
+
+        order = Order.objects.get(order_number='OLD-1')
+        assert (order.customer, order.status, order.amount) == (alice, 'Completed', Decimal('1500.00'))
+        assert order.created_at == datetime(2020, 1, 5, 10, tzinfo=dt_timezone.utc)
+        assert Order.objects.get(order_number='OLD-2').customer == bob
+        assert Order.objects.get(order_number='OLD-3').created_at == datetime(2020, 1, 6, 6, tzinfo=dt_timezone.utc)
+
+        # The bulk load bypasses signals; the search index and rollups are rebuilt afterwards.
+        assert sorted(o.item for o in search_orders('laptop', customer=alice)[:10]) == ['Gaming Laptop', 'Laptop Bag']
+        start = datetime(2020, 1, 5, tzinfo=dt_timezone.utc)
+        report = rollups.report(start, start + timedelta(days=2), 'day')
+        assert [day['order_count'] for day in report] == [2, 1]
+
+    def test_rejects_bad_rows_and_skips_already_imported_ones(self, customers, tmp_path):
+        path = tmp_path / 'orders.csv'
+        path.write_text(
+            "order_number,phone_number,item,amount,created_at\n"
+            "OLD-1,+254700000001,Laptop,1200,2020-01-05T10:00:00Z\n"
+            "OLD-2,+254799999999,Laptop,1200,2020-01-05T10:00:00Z\n"
+            "OLD-3,+254700000001,Laptop,lots,2020-01-05T10:00:00Z\n"
+            "OLD-4,+254700000001,Laptop,10,yesterday\n"
+            ",+254700000001,Laptop,10,2020-01-05T10:00:00Z\n"
+            "OLD-1,+254700000001,Laptop,1200,2020-01-05T10:00:00Z\n"
+        )
+        rejects = tmp_path / 'rejects.csv'
+
+        call_command('import_orders', str(path), '--rejects', str(rejects))
+        call_command('import_orders', str(path))  # running again imports nothing twice
+
+        assert list(Order.objects.values_list('order_number', flat=True)) == ['OLD-1']
+        reasons = rejects.read_text()
+        for reason in ('unknown customer', 'invalid amount', 'created_at must be an ISO datetime',
+                       'order_number is required', 'duplicate order_number in input'):
+            assert reason in reasons
+
+    def test_keeps_timestamps_without_changing_the_model(self, customers):
+        seen = []
+        importer = OrderImporter(customers=CustomerMap(), on_progress=lambda stats: seen.append(
+            Order._meta.get_field('created_at').auto_now_add))
+        records = [{'order_number': 'OLD-1', 'phone_number': '+254700000001', 'item': 'Laptop',
+                    'amount': '1200', 'created_at': '2020-01-05T10:00:00Z'}]
+
+        importer.run(records)
+
+        # Other threads creating orders during the import still get the current time.
+        assert seen == [True]
+        assert Order.objects.get().created_at == datetime(2020, 1, 5, 10, tzinfo=dt_timezone.utc)
@@ -0,0 +1,103 @@
+import os
+import pstats
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customer_order_service.profiling import TOKEN_SALT
+from customerorder.models import Order
+
+User = get_user_model()
+
+
+@pytest.fixture
+def profiles_dir(settings, tmp_path):
+    settings.PROFILING_DIR = str(tmp_path)
+    settings.PROFILING_SAMPLE_RATE = 0.0
+    return tmp_path
+
+
+@pytest.fixture
+def staff():
+    return User.objects.create_user(username='staff', password='pass', phone_number='+254700000001',
+                                    is_staff=True)
+
+
+@pytest.fixture
+def staff_client(staff):
+    client = APIClient()
+    client.force_authenticate(user=staff)
+    Order.objects.create(customer=staff, item='Laptop', amount='1200.00')
+    return client
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+    def test_requests_are_not_profiled_by_default(self, profiles_dir, staff_client):
+        response = staff_client.get(reverse('order-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'X-Profile-Id' not in response
+        assert os.listdir(profiles_dir) == []
+
+    def test_signed_header_profiles_the_request(self, profiles_dir, staff_client):
+        token = staff_client.post(reverse('profile-token')).data['token']
+
+        response = staff_client.get(reverse('order-list'), HTTP_X_PROFILE_TOKEN=token)
+
+        profile_id = response['X-Profile-Id']
+        summary = staff_client.get(reverse('profile-detail', kwargs={'profile_id': profile_id})).data
+        assert summary['reason'] == 'token'
+        assert summary['path'] == reverse('order-list')
+        assert summary['status_code'] == 200
+        assert summary['query_count'] == len(summary['queries']) > 0
+        assert any('customerorder_order' in query['sql'] for query in summary['queries'])
+        assert all(query['duration_ms'] >= 0 for query in summary['queries'])
+        assert 'list' in summary['top_functions']  # the view's list() shows up in the profile
+
+        listed = staff_client.get(reverse('profile-list')).data
+        assert [entry['id'] for entry in listed] == [profile_id]
+
+        download = staff_client.get(reverse('profile-detail', kwargs={'profile_id': profile_id}),
+                                    {'download': 'pstats'})
+        stats_path = profiles_dir / 'downloaded.prof'
+        stats_path.write_bytes(b''.join(download.streaming_content))
+        assert pstats.Stats(str(stats_path)).total_calls > 0
+
+    def test_forged_or_expired_tokens_are_ignored(self, profiles_dir, staff_client, settings):
+        forged = signing.TimestampSigner(key='not-the-secret-key', salt=TOKEN_SALT).sign('1')
+        response = staff_client.get(reverse('order-list'), HTTP_X_PROFILE_TOKEN=forged)
+        assert 'X-Profile-Id' not in response
+
+        settings.PROFILING_TOKEN_MAX_AGE = -1
+        token = staff_client.post(reverse('profile-token')).data['token']
+        response = APIClient().get(reverse('liveness'), HTTP_X_PROFILE_TOKEN=token)
+        assert 'X-Profile-Id' not in response
+
+    def test_sampling_profiles_without_a_header(self, profiles_dir, staff_client, settings):
+        settings.PROFILING_SAMPLE_RATE = 1.0
+
+        response = APIClient().get(reverse('liveness'))
+
+        assert response['X-Profile-Id']
+        assert len(os.listdir(profiles_dir)) == 2  # summary and cProfile stats
+
+
+@pytest.mark.django_db
+class TestProfileEndpoints:
+    def test_customers_cannot_get_tokens_or_profiles(self, profiles_dir):
+        customer = User.objects.create_user(username='customer', password='pass', phone_number='+254700000002')
+        client = APIClient()
+        client.force_authenticate(user=customer)
+
+        assert client.post(reverse('profile-token')).status_code == status.HTTP_403_FORBIDDEN
+        assert client.get(reverse('profile-list')).status_code == status.HTTP_403_FORBIDDEN
+
+    def test_unknown_or_malformed_ids_are_not_found(self, profiles_dir, staff_client):
+        for profile_id in ('20240101T000000-000000000000', '..secret'):
+            response = staff_client.get(reverse('profile-detail', kwargs={'profile_id': profile_id}))
+            assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,66 @@
+import datetime
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from customerorder.models import Order
+from customerorder.renderers import MessagePackParser, MessagePackRenderer, packb, unpackb
+from customerorder.serializers import OrderSerializer
+
+User = get_user_model()
+
+
+class TestMessagePackEncoding:
+    def test_decimal_and_datetime_round_trip(self):
+        data = {
+            'amount': Decimal('1200.50'),
+            'created_at': datetime.datetime(2024, 9, 21, 12, 30, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2024, 9, 21),
+            'items': ['Laptop', 1],
+        }
+        assert unpackb(MessagePackRenderer().render(data)) == data
+
+    def test_parser_rejects_garbage(self):
+        for body in (b'\xc1', b'\x81\x91\x01\x02'):  # an invalid byte; a map with a list as key
+            with pytest.raises(ParseError):
+                MessagePackParser().parse(BytesIO(body))
+
+
+@pytest.mark.django_db
+class TestMessagePackNegotiation:
+    def test_order_list_renders_msgpack_when_accepted(self):
+        user = User.objects.create_user(username='testuser', password='pass', phone_number='+254700000000')
+        order = Order.objects.create(customer=user, item='Laptop', amount='1200.00')
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.get(reverse('order-list'), HTTP_ACCEPT='application/msgpack')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/msgpack'
+        order.refresh_from_db()
+        assert unpackb(response.content) == [dict(OrderSerializer(order).data)]
+
+    @patch('customerorder.views.send_sms_alert')  # Avoid calling Africa's Talking
+    def test_order_create_accepts_msgpack_body(self, mock_send_sms_alert):
+        user = User.objects.create_user(username='testuser', password='pass', phone_number='+254700000000')
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.post(
+            reverse('order-create'),
+            data=packb({'item': 'Laptop', 'amount': Decimal('1200.00')}),
+            content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert unpackb(response.content)['amount'] == '1200.00'
+        assert Order.objects.get().amount == Decimal('1200.00')
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customerorder import rollups
+from customerorder.models import Order, OrderRollup, OrderRollupDelta, OrderStatus, RollupGranularity
+
+User = get_user_model()
+
+
+def _rollup(granularity, status_value):
+    rollups.compact()
+    # Deltas that cancel out before compaction never create a row.
+    rollup = OrderRollup.objects.filter(granularity=granularity, status=status_value).first()
+    return rollup or OrderRollup(order_count=0, total_amount=Decimal('0'))
+
+
+@pytest.fixture
+def customer():
+    return User.objects.create_user(username='testuser', password='pass', phone_number='+254700000000')
+
+
+@pytest.mark.django_db
+class TestOrderRollups:
+    def test_create_increments_hour_and_day(self, customer):
+        Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        Order.objects.create(customer=customer, item='Mouse', amount='20.00')
+
+        for granularity in RollupGranularity.values:
+            rollup = _rollup(granularity, OrderStatus.PENDING)
+            assert rollup.order_count == 2
+            assert rollup.total_amount == Decimal('1220.00')
+
+    def test_status_change_moves_between_rollups(self, customer):
+        order = Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        order = Order.objects.get(pk=order.pk)  # Reload, as views do
+        order.status = OrderStatus.COMPLETED
+        order.save()
+
+        assert _rollup(RollupGranularity.DAY, OrderStatus.PENDING).order_count == 0
+        completed = _rollup(RollupGranularity.DAY, OrderStatus.COMPLETED)
+        assert completed.order_count == 1
+        assert completed.total_amount == Decimal('1200.00')
+
+    def test_delete_decrements(self, customer):
+        order = Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        order.delete()
+
+        rollup = _rollup(RollupGranularity.HOUR, OrderStatus.PENDING)
+        assert rollup.order_count == 0
+        assert rollup.total_amount == Decimal('0')
+
+    def test_writes_append_deltas_until_compacted(self, customer):
+        Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        Order.objects.create(customer=customer, item='Mouse', amount='20.00')
+
+        # Order writes never touch the shared rollup rows; reports include pending deltas.
+        assert not OrderRollup.objects.exists()
+        assert OrderRollupDelta.objects.count() == 4
+        now = datetime.now(dt_timezone.utc)
+        [day] = rollups.report(now - timedelta(days=1), now + timedelta(days=1), 'day')
+        assert day['order_count'] == 2
+
+        call_command('compact_rollups')
+
+        assert not OrderRollupDelta.objects.exists()
+        assert rollups.report(now - timedelta(days=1), now + timedelta(days=1), 'day') == [day]
+
+    def test_concurrent_saves_of_one_order_apply_once(self, customer):
+        order = Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        first, second = Order.objects.get(pk=order.pk), Order.objects.get(pk=order.pk)
+
+        first.status = OrderStatus.COMPLETED
+        first.save()
+        second.status = OrderStatus.CANCELED  # still believes the order is pending
+        second.save()
+
+        assert _rollup(RollupGranularity.DAY, OrderStatus.PENDING).order_count == 0
+        assert _rollup(RollupGranularity.DAY, OrderStatus.COMPLETED).order_count == 0
+        assert _rollup(RollupGranularity.DAY, OrderStatus.CANCELED).order_count == 1
+
+    def test_backfill_rebuilds_from_orders(self, customer):
+        Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        rollups.compact()
+        OrderRollup.objects.update(order_count=99)  # Corrupt the incremental rollups
+
+        call_command('backfill_rollups')
+
+        assert OrderRollup.objects.count() == 2
+        assert set(OrderRollup.objects.values_list('order_count', flat=True)) == {1}
+
+
+@pytest.mark.django_db
+class TestOrderReportView:
+    def test_staff_report_by_day(self, customer):
+        Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        Order.objects.create(customer=customer, item='Mouse', amount='20.00', status=OrderStatus.CANCELED)
+        staff = User.objects.create_user(username='staff', password='pass', phone_number='+254700000009',
+                                         is_staff=True)
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        now = datetime.now(dt_timezone.utc)
+        response = client.get(reverse('order-report'), {
+            'start': (now - timedelta(days=1)).isoformat(),
+            'end': (now + timedelta(days=1)).isoformat(),
+            'granularity': 'day',
+        })
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 1
+        bucket = response.data[0]
+        assert bucket['order_count'] == 2
+        assert bucket['total_amount'] == '1220.00'
+        assert bucket['by_status']['Canceled']['order_count'] == 1
+
+    def test_report_requires_staff(self, customer):
+        client = APIClient()
+        client.force_authenticate(user=customer)
+
+        response = client.get(reverse('order-report'), {'start': '2024-01-01', 'end': '2024-02-01'})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+class TestSchemaArtifact:
+    def test_committed_schema_matches_views(self):
+        # Fails when views change without running `python manage.py generate_schema`
+        call_command('generate_schema', '--check')
+
+
+class TestCachedSchemaView:
+    def test_serves_yaml_with_cache_headers(self):
+        response = APIClient().get(reverse('schema'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/vnd.oai.openapi'
+        assert response.content.startswith(b'openapi:')
+        assert response['ETag']
+        assert 'max-age' in response['Cache-Control']
+
+    def test_serves_json_on_request(self):
+        response = APIClient().get(reverse('schema'), {'format': 'json'})
+
+        assert response['Content-Type'] == 'application/vnd.oai.openapi+json'
+        assert '/api/orders/' in json.loads(response.content)['paths']
+
+    def test_matching_etag_returns_not_modified(self):
+        client = APIClient()
+        etag = client.get(reverse('schema'))['ETag']
+
+        response = client.get(reverse('schema'), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+
+    @pytest.mark.django_db
+    def test_docs_pages_load(self):
+        assert APIClient().get(reverse('swagger-ui')).status_code == status.HTTP_200_OK
@@ -0,0 +1,91 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customerorder.models import Order
+from customerorder.search import search_orders
+
+User = get_user_model()
+
+
+@pytest.fixture
+def customers():
+    alice = User.objects.create_user(username='alice', password='pass', phone_number='+254700000001')
+    bob = User.objects.create_user(username='bob', password='pass', phone_number='+254700000002')
+    Order.objects.create(customer=alice, item='Gaming Laptop', amount='1500.00')
+    Order.objects.create(customer=alice, item='Laptop Bag', amount='40.00')
+    Order.objects.create(customer=alice, item='Desk Lamp', amount='25.00')
+    Order.objects.create(customer=bob, item='Laptop Stand', amount='30.00')
+    return alice, bob
+
+
+@pytest.mark.django_db
+class TestOrderSearch:
+    def test_prefix_search_matches_word_starts(self, customers):
+        alice, _ = customers
+        results = search_orders('lap', customer=alice)
+
+        items = sorted(order.item for order in results[:10])
+        assert items == ['Gaming Laptop', 'Laptop Bag']  # 'Desk Lamp' does not start with 'lap'
+        assert results.count() == 2
+
+    def test_prefix_search_ignores_mid_word_substrings(self, customers):
+        alice, _ = customers
+        assert search_orders('top', customer=alice).count() == 0  # 'top' only occurs inside 'laptop'
+
+    def test_fuzzy_search_tolerates_typos(self, customers):
+        alice, _ = customers
+        results = search_orders('labtop', customer=alice, mode='fuzzy')
+
+        items = [order.item for order in results[:10]]
+        assert 'Gaming Laptop' in items and 'Laptop Bag' in items
+
+    def test_global_search_spans_customers(self, customers):
+        assert search_orders('laptop').count() == 3
+
+    def test_index_follows_updates_and_deletes(self, customers):
+        alice, _ = customers
+        order = Order.objects.get(catalog_item__name='Desk Lamp')
+        order.item = 'Desk Laptop Riser'
+        order.save()
+        assert search_orders('riser', customer=alice).count() == 1
+
+        order.delete()
+        assert search_orders('riser', customer=alice).count() == 0
+
+
+@pytest.mark.django_db
+class TestOrderSearchView:
+    def test_customer_search_is_scoped_and_paginated(self, customers):
+        alice, _ = customers
+        client = APIClient()
+        client.force_authenticate(user=alice)
+
+        response = client.get(reverse('order-search'), {'q': 'laptop', 'page_size': 1})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 2  # Bob's laptop stand is not visible
+        assert len(response.data['results']) == 1
+
+    def test_staff_search_is_global(self, customers):
+        staff = User.objects.create_user(username='staff', password='pass', phone_number='+254700000003',
+                                         is_staff=True)
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        response = client.get(reverse('order-search'), {'q': 'laptop'})
+        assert response.data['count'] == 3
+
+        _, bob = customers
+        response = client.get(reverse('order-search'), {'q': 'laptop', 'customer': bob.id})
+        assert response.data['count'] == 1
+
+    def test_missing_query_is_rejected(self, customers):
+        alice, _ = customers
+        client = APIClient()
+        client.force_authenticate(user=alice)
+
+        response = client.get(reverse('order-search'))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
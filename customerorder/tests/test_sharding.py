@@ -0,0 +1,261 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customerorder import catalog, deletion, rollups, sharding
+from customerorder.models import Item, Order, WebhookDelivery, WebhookSubscription
+from customerorder.search import search_orders
+
+User = get_user_model()
+
+SHARDS = ['shard_a', 'shard_b']
+sharded_db = pytest.mark.django_db(databases=['default', *SHARDS])
+
+
+@pytest.fixture(scope='module', autouse=True)
+def shard_databases(django_db_setup, django_db_blocker):
+    """
+    Two extra in-memory SQLite databases acting as order shards for this module.
+    """
+    with override_settings(ORDER_SHARDS=SHARDS), django_db_blocker.unblock():
+        for alias in SHARDS:
+            default = connections.settings['default']
+            connections.settings[alias] = {**default, 'NAME': f'{alias}.sqlite3',
+                                           'TEST': {**default['TEST'], 'NAME': None}}
+            connections[alias].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        yield
+        for alias in SHARDS:
+            connections[alias].creation.destroy_test_db(f'{alias}.sqlite3', verbosity=0)
+            del connections[alias]
+            del connections.settings[alias]
+
+
+def _customer(username, shard, **extra):
+    customer = User.objects.create_user(username=username, password='pass', phone_number=f'+2547{len(username):08d}',
+                                        **extra)
+    User.objects.filter(pk=customer.pk).update(order_shard=shard)
+    customer.order_shard = shard
+    return customer
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@sharded_db
+class TestOrderRouting:
+    def test_orders_are_stored_and_read_on_the_customers_shard(self):
+        alice, bob = _customer('alice', 'shard_a'), _customer('bob', 'shard_b')
+
+        created = [
+            _client(alice).post(reverse('order-create'), {'item': 'Laptop', 'amount': '1200.00'}).data,
+            _client(bob).post(reverse('order-create'), {'item': 'Laptop Bag', 'amount': '40.00'}).data,
+        ]
+
+        assert Order.objects.using('shard_a').get().customer_id == alice.pk
+        assert Order.objects.using('shard_b').get().customer_id == bob.pk
+        assert not Order.objects.using('default').exists()
+        assert created[0]['id'] != created[1]['id']  # ids come from one sequence
+        assert [order['item'] for order in _client(alice).get(reverse('order-list')).data] == ['Laptop']
+        detail = _client(bob).get(reverse('order-detail', kwargs={'pk': created[1]['id']}))
+        assert detail.status_code == status.HTTP_200_OK
+        assert _client(alice).get(reverse('order-detail', kwargs={'pk': created[1]['id']})).status_code == \
+            status.HTTP_404_NOT_FOUND
+
+    def test_new_customers_are_placed_on_a_shard(self):
+        customer = User.objects.create_user(username='carol', password='pass', phone_number='+254700000003')
+
+        assert customer.order_shard in SHARDS
+        assert sharding.shard_for_customer(customer.pk) == customer.order_shard
+
+    def test_search_and_reports_span_shards(self):
+        alice, bob = _customer('alice', 'shard_a'), _customer('bob', 'shard_b')
+        Order(customer=alice, item='Gaming Laptop', amount='1500.00').save()
+        Order(customer=bob, item='Laptop Stand', amount='30.00').save()
+
+        assert [order.item for order in search_orders('laptop', customer=alice)[:10]] == ['Gaming Laptop']
+        results = search_orders('laptop')
+        assert results.count() == 2
+        assert sorted(order.item for order in results[:10]) == ['Gaming Laptop', 'Laptop Stand']
+        assert [order.customer.username for order in results[1:2]]  # customers are attached across databases
+
+        now = timezone.now()
+        [day] = rollups.report(now - timedelta(days=1), now + timedelta(days=1), 'day')
+        assert day['order_count'] == 2
+        assert str(day['total_amount']) == '1530.00'
+
+    def test_global_search_ranks_across_shards(self):
+        alice, bob = _customer('alice', 'shard_a'), _customer('bob', 'shard_b')
+        for n in range(3):
+            Order(customer=alice, item=f'Lamp {n} with a long laptop charging cable', amount='10.00').save()
+        Order(customer=bob, item='Laptop', amount='1200.00').save()
+
+        results = search_orders('laptop', mode='fuzzy')
+
+        # The best match is on the second shard, yet it heads the first page.
+        assert [order.item for order in results[:1]] == ['Laptop']
+        assert [order.customer_id for order in results[1:4]] == [alice.pk] * 3
+
+    def test_allow_migrate_keeps_orders_off_default(self):
+        router = sharding.OrderShardRouter()
+
+        assert router.allow_migrate('shard_a', 'customerorder', model_name='order') is True
+        assert router.allow_migrate('default', 'customerorder', model_name='order') is False
+        assert router.allow_migrate('default', 'customerorder', model_name='user') is True
+        assert router.allow_migrate('shard_b', 'customerorder', model_name='user') is False
+
+
+@sharded_db
+class TestCustomerMoves:
+    def test_move_carries_orders_index_and_rollups(self):
+        alice = _customer('alice', 'shard_a')
+        kept = Order(customer=alice, item='Gaming Laptop', amount='1500.00')
+        kept.save()
+        hidden = Order(customer=alice, item='Desk Lamp', amount='25.00')
+        hidden.save()
+        deletion.soft_delete_order(hidden, using='shard_a')
+
+        call_command('rebalance_shards', customer=[alice.pk], to='shard_b', settle=0)
+
+        alice.refresh_from_db()
+        assert alice.order_shard == 'shard_b'
+        assert not Order.all_objects.using('shard_a').exists()
+        moved = Order.all_objects.using('shard_b').get(pk=kept.pk)
+        assert (moved.order_number, moved.created_at) == (kept.order_number, kept.created_at)
+        assert Order.all_objects.using('shard_b').get(pk=hidden.pk).deleted_at is not None
+        assert [order.pk for order in search_orders('laptop', customer=alice)[:10]] == [kept.pk]
+        assert search_orders('laptop', using='shard_a').count() == 0
+        assert rollups.report(timezone.now() - timedelta(days=1), timezone.now() + timedelta(days=1), 'day',
+                              using='shard_a') == []
+
+    def test_move_keeps_item_counters(self, django_capture_on_commit_callbacks):
+        alice = _customer('alice', 'shard_a')
+        # Counter changes from a shard are applied when the shard's transaction commits.
+        with django_capture_on_commit_callbacks(using='shard_a', execute=True), \
+                django_capture_on_commit_callbacks(using='shard_b', execute=True):
+            Order(customer=alice, item='Laptop', amount='1200.00').save()
+            hidden = Order(customer=alice, item='Desk Lamp', amount='25.00')
+            hidden.save()
+            deletion.soft_delete_order(hidden, using='shard_a')
+
+            sharding.move_customer(alice, 'shard_b', settle=0)
+        catalog.compact()
+
+        laptop, lamp = Item.objects.get(name='Laptop'), Item.objects.get(name='Desk Lamp')
+        assert (laptop.order_count, laptop.total_amount) == (1, Decimal('1200.00'))
+        assert (lamp.order_count, lamp.total_amount) == (0, Decimal('0.00'))
+
+    def test_writes_are_refused_while_a_move_is_in_progress(self):
+        alice = _customer('alice', 'shard_a')
+        # The fence lives on the user row, so workers that did not start the move see it too.
+        User.objects.filter(pk=alice.pk).update(order_shard_moving_from='shard_a')
+
+        response = _client(alice).post(reverse('order-create'), {'item': 'Laptop', 'amount': '1200.00'})
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert not Order.objects.using('shard_a').exists()
+
+    def test_orders_written_during_the_copy_are_moved_not_deleted(self):
+        alice = _customer('alice', 'shard_a')
+        first = Order(customer=alice, item='Laptop', amount='1200.00')
+        first.save()
+        late = []
+
+        def write_during_copy(moved):
+            # A write that slipped past the fence lands on the old shard mid-move.
+            if not late:
+                late.append(Order(customer=alice, item='Laptop Bag', amount='40.00'))
+                late[0].save(using='shard_a')
+
+        moved = sharding.move_customer(alice, 'shard_b', settle=0, on_progress=write_during_copy)
+
+        assert moved == 2
+        assert not Order.all_objects.using('shard_a').exists()
+        assert set(Order.objects.using('shard_b').values_list('pk', flat=True)) == {first.pk, late[0].pk}
+        alice.refresh_from_db()
+        assert (alice.order_shard, alice.order_shard_moving_from) == ('shard_b', None)
+
+    def test_interrupted_move_is_resumed(self):
+        alice = _customer('alice', 'shard_a')
+        order = Order(customer=alice, item='Laptop', amount='1200.00')
+        order.save()
+
+        with patch('customerorder.models.User.save', side_effect=RuntimeError('crash')):
+            with pytest.raises(RuntimeError):
+                sharding.move_customer(alice, 'shard_b', settle=0)
+        alice = User.objects.get(pk=alice.pk)
+        assert alice.order_shard_moving_from == 'shard_a'  # still fenced
+
+        call_command('rebalance_shards', customer=[alice.pk], to='shard_b', settle=0)
+
+        assert not Order.all_objects.using('shard_a').exists()
+        assert Order.all_objects.using('shard_b').get().pk == order.pk
+        assert User.objects.get(pk=alice.pk).order_shard_moving_from is None
+
+
+@sharded_db
+class TestShardedHousekeeping:
+    def test_webhook_deliveries_queue_on_the_customers_shard(self):
+        bob = _customer('bob', 'shard_b')
+        subscription = WebhookSubscription.objects.create(url='http://example.invalid/hook', secret='s')
+
+        Order(customer=bob, item='Laptop', amount='1200.00').save()
+
+        delivery = WebhookDelivery.objects.using('shard_b').get()
+        assert delivery.subscription_id == subscription.pk
+        assert not WebhookDelivery.objects.using('default').exists()
+
+    def test_purge_removes_orders_from_every_shard_before_the_customer(self):
+        alice, bob = _customer('alice', 'shard_a'), _customer('bob', 'shard_b')
+        Order(customer=alice, item='Laptop', amount='1200.00').save()
+        Order(customer=bob, item='Laptop Bag', amount='40.00').save()
+        User.objects.filter(pk=alice.pk).update(deleted_at=timezone.now())
+
+        call_command('purge_deleted', pause=0)
+
+        assert not User.objects.filter(pk=alice.pk).exists()
+        assert not Order.all_objects.using('shard_a').exists()
+        assert Order.objects.using('shard_b').count() == 1
+
+    def test_import_writes_orders_to_each_customers_shard(self, tmp_path):
+        alice, bob = _customer('alice', 'shard_a'), _customer('bob', 'shard_b')
+        path = tmp_path / 'orders.csv'
+        path.write_text(
+            "order_number,phone_number,item,amount,created_at\n"
+            f"OLD-1,{alice.phone_number},Laptop,1200,2020-01-05T10:00:00Z\n"
+            f"OLD-2,{bob.phone_number},Laptop Bag,40,2020-01-05T11:00:00Z\n"
+        )
+
+        call_command('import_orders', str(path))
+
+        imported = [Order.objects.using(alias).get() for alias in SHARDS]
+        assert [order.customer_id for order in imported] == [alice.pk, bob.pk]
+        assert imported[0].pk != imported[1].pk
+        assert search_orders('laptop').count() == 2
+
+    def test_admin_lists_and_updates_one_shard_at_a_time(self, client):
+        alice, bob = _customer('alice', 'shard_a'), _customer('bob', 'shard_b')
+        Order(customer=alice, item='Laptop', amount='1200.00').save()
+        order = Order(customer=bob, item='Laptop Bag', amount='40.00')
+        order.save()
+        client.force_login(User.objects.create_superuser(username='admin', password='pass', email='a@example.com'))
+        url = reverse('admin:customerorder_order_changelist') + '?shard=shard_b'
+
+        response = client.get(url)
+        assert [o.customer for o in response.context['cl'].result_list] == [bob]
+
+        client.post(url, {'action': 'mark_canceled', '_selected_action': [order.pk]})
+        assert Order.objects.using('shard_b').get().status == 'Canceled'
+        assert client.get(reverse('admin:customerorder_order_change', args=[order.pk])).status_code == 200
@@ -0,0 +1,134 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from customerorder.user_import import UNIQUE_FIELDS
+
+User = get_user_model()
+
+
+class StubImportResult:
+    def __init__(self, errors=()):
+        self.errors = [type('ErrorInfo', (object,), {'index': index, 'reason': reason}) for index, reason in errors]
+
+
+def _write_users(path, count, start=0):
+    with open(path, 'w', encoding='utf-8') as handle:
+        for i in range(start, start + count):
+            handle.write(json.dumps({
+                'username': f'user{i}',
+                'email': f'user{i}@example.com',
+                'phone_number': f'+2547000{i:05d}',
+            }) + '\n')
+
+
+@pytest.mark.django_db
+class TestImportUsersCommand:
+    @patch('firebase_admin.auth.import_users')  # Stub the Firebase batch import API
+    def test_imports_in_chunks(self, mock_import_users, tmp_path):
+        mock_import_users.return_value = StubImportResult()
+        path = tmp_path / 'users.ndjson'
+        _write_users(path, 5)
+
+        call_command('import_users', str(path), '--chunk-size', '2', '--concurrency', '2')
+
+        assert mock_import_users.call_count == 3  # 2 + 2 + 1 users
+        assert User.objects.count() == 5
+        user = User.objects.get(username='user0')
+        assert user.uid and user.customer_code.startswith('CUST')
+        assert not user.has_usable_password()
+        assert len(set(User.objects.values_list('customer_code', flat=True))) == 5
+
+    @patch('firebase_admin.auth.import_users')
+    def test_rejects_invalid_and_firebase_failures(self, mock_import_users, tmp_path):
+        mock_import_users.return_value = StubImportResult(errors=[(1, 'invalid uid')])
+        User.objects.create_user(username='taken', password='pass', phone_number='+254711111111')
+        path = tmp_path / 'users.csv'
+        path.write_text(
+            "username,email,phone_number\n"
+            "good,good@example.com,+254700000001\n"
+            "firebase_fails,fails@example.com,+254700000002\n"
+            "bad_phone,bad@example.com,0700\n"
+            "long_phone,long@example.com,+254700000001234\n"
+            "taken,taken@example.com,+254700000003\n"
+        )
+        rejects = tmp_path / 'rejects.csv'
+
+        call_command('import_users', str(path), '--rejects', str(rejects))
+
+        assert set(User.objects.values_list('username', flat=True)) == {'taken', 'good'}
+        reasons = rejects.read_text()
+        assert 'firebase: invalid uid' in reasons
+        assert 'E.164' in reasons
+        assert 'phone_number must be at most 15 characters' in reasons
+        assert 'username already exists' in reasons
+
+    @patch('firebase_admin.auth.import_users')
+    def test_resumes_from_checkpoint(self, mock_import_users, tmp_path):
+        mock_import_users.side_effect = [StubImportResult(), RuntimeError('network down')]
+        path = tmp_path / 'users.ndjson'
+        _write_users(path, 4)
+
+        with pytest.raises(RuntimeError):
+            call_command('import_users', str(path), '--chunk-size', '2', '--concurrency', '1')
+        assert User.objects.count() == 2
+
+        mock_import_users.side_effect = None
+        mock_import_users.return_value = StubImportResult()
+        call_command('import_users', str(path), '--chunk-size', '2', '--concurrency', '1')
+
+        assert User.objects.count() == 4
+        resumed_batch = mock_import_users.call_args.args[0]
+        assert [user.display_name for user in resumed_batch] == ['user2', 'user3']
+
+    @patch('firebase_admin.auth.import_users')
+    def test_resumed_chunks_send_the_same_uids(self, mock_import_users, tmp_path):
+        # The first run reaches Firebase but crashes before the local users are written.
+        mock_import_users.return_value = StubImportResult()
+        path = tmp_path / 'users.ndjson'
+        _write_users(path, 2)
+
+        with patch('customerorder.user_import.User.objects.bulk_create', side_effect=RuntimeError('db down')):
+            with pytest.raises(RuntimeError):
+                call_command('import_users', str(path))
+        first_uids = [user.uid for user in mock_import_users.call_args.args[0]]
+        call_command('import_users', str(path))
+
+        assert [user.uid for user in mock_import_users.call_args.args[0]] == first_uids
+        assert sorted(User.objects.values_list('uid', flat=True)) == sorted(first_uids)
+
+    @patch('firebase_admin.auth.import_users')
+    def test_counts_only_inserted_users(self, mock_import_users, tmp_path):
+        mock_import_users.return_value = StubImportResult()
+        path = tmp_path / 'users.csv'
+        # Both chunks are validated before either is written, so the clash is only found when writing.
+        path.write_text(
+            "username,email,phone_number\n"
+            "first,first@example.com,+254700000001\n"
+            "second,second@example.com,+254700000001\n"
+        )
+        rejects = tmp_path / 'rejects.csv'
+        out = StringIO()
+
+        call_command('import_users', str(path), '--chunk-size', '1', '--concurrency', '2',
+                     '--rejects', str(rejects), stdout=out)
+
+        assert 'Import finished: 1 users created, 1 rejected.' in out.getvalue()
+        assert 'phone_number already exists' in rejects.read_text()
+
+    @patch('customerorder.user_import._taken_values', return_value={field: set() for field in UNIQUE_FIELDS})
+    @patch('firebase_admin.auth.import_users')
+    def test_rows_dropped_by_conflicts_are_not_counted(self, mock_import_users, _, tmp_path):
+        mock_import_users.return_value = StubImportResult()
+        User.objects.create_user(username='user0', password='pass', phone_number='+254711111111')
+        path = tmp_path / 'users.ndjson'
+        _write_users(path, 2)
+        out = StringIO()
+
+        call_command('import_users', str(path), stdout=out)
+
+        assert 'Import finished: 1 users created, 1 rejected.' in out.getvalue()
@@ -0,0 +1,255 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import ClientSession, web
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from customerorder import events, webhooks
+from customerorder.models import DeliveryStatus, Order, WebhookDelivery, WebhookSubscription
+
+User = get_user_model()
+
+
+@pytest.fixture
+def customer():
+    cache.clear()
+    return User.objects.create_user(username='testuser', password='pass', phone_number='+254700000000')
+
+
+class StubReceiver:
+    """
+    Local webhook endpoint recording what it receives. Paths starting with /fail answer 500;
+    paths starting with /hang answer after `hang` seconds.
+    """
+
+    def __init__(self, delay=0.0, hang=3.0):
+        self.delay = delay
+        self.hang = hang
+        self.received = {}
+        self.requests = 0
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self.bad_signatures = 0
+        self.secrets = {}
+
+    async def handle(self, request):
+        path = request.path
+        self.requests += 1
+        self.in_flight[path] = self.in_flight.get(path, 0) + 1
+        self.max_in_flight[path] = max(self.max_in_flight.get(path, 0), self.in_flight[path])
+        try:
+            await asyncio.sleep(self.hang if path.startswith('/hang') else self.delay)
+            body = await request.read()
+            secret = self.secrets.get(path)
+            if secret and not webhooks.verify_signature(secret, body, request.headers[webhooks.SIGNATURE_HEADER]):
+                self.bad_signatures += 1
+            if path.startswith('/fail'):
+                return web.Response(status=500)
+            self.received.setdefault(path, []).extend(json.loads(body)['deliveries'])
+            return web.Response(status=204)
+        finally:
+            self.in_flight[path] -= 1
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/{tail:.*}', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        return f'http://127.0.0.1:{port}'
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def _deliver(receiver, worker, subscriptions_for, rounds=1):
+    """
+    Start the stub receiver, create subscriptions pointing at it and run worker rounds.
+    Returns the number of deliveries attempted per round.
+    """
+    async def scenario():
+        base_url = await receiver.start()
+        try:
+            for subscription in await sync_to_async(subscriptions_for)(base_url):
+                receiver.secrets[subscription.url[len(base_url):]] = subscription.secret
+            attempted = []
+            async with ClientSession() as session:
+                for _ in range(rounds):
+                    attempted.append(await worker.run_once(session))
+            return attempted
+        finally:
+            await receiver.stop()
+
+    return async_to_sync(scenario)()
+
+
+@pytest.mark.django_db
+class TestWebhookQueueing:
+    def test_order_events_are_queued_for_matching_subscriptions(self, customer, django_capture_on_commit_callbacks):
+        other = User.objects.create_user(username='other', password='pass', phone_number='+254700000001')
+        everything = WebhookSubscription.objects.create(url='https://example.com/all')
+        created_only = WebhookSubscription.objects.create(url='https://example.com/created',
+                                                          events=[events.ORDER_CREATED])
+        WebhookSubscription.objects.create(url='https://example.com/other', customer=other)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            order = Order.objects.create(customer=customer, item='Laptop', amount='1200.00')
+        order.status = 'Completed'
+        order.save()
+
+        queued = WebhookDelivery.objects.order_by('id')
+        assert [(d.subscription_id, d.event_type) for d in queued] == [
+            (everything.id, events.ORDER_CREATED),
+            (created_only.id, events.ORDER_CREATED),
+            (everything.id, events.ORDER_STATUS_CHANGED),  # the other customer's hook sees nothing
+        ]
+        assert queued[0].payload['order_number'] == order.order_number
+
+    def test_subscription_changes_invalidate_the_cache(self, customer):
+        assert webhooks.active_subscriptions() == []
+        subscription = WebhookSubscription.objects.create(url='https://example.com/hook')
+        assert webhooks.active_subscriptions() == [subscription]
+
+        subscription.is_active = False
+        subscription.save()
+        assert webhooks.active_subscriptions() == []
+
+    def test_signature_round_trip(self):
+        body = b'{"deliveries": []}'
+        header = webhooks.signature_header('secret', body)
+
+        assert webhooks.verify_signature('secret', body, header)
+        assert not webhooks.verify_signature('other-secret', body, header)
+        assert not webhooks.verify_signature('secret', body + b' ', header)
+        assert not webhooks.verify_signature('secret', body, webhooks.signature_header('secret', body, 1))  # stale
+
+
+@pytest.mark.django_db
+class TestWebhookWorker:
+    def test_delivers_thousands_of_events_in_batches(self, customer):
+        receiver = StubReceiver(delay=0.01)
+        worker = webhooks.WebhookWorker(batch_size=100)
+        paths = ['/a', '/b', '/c']
+
+        def subscriptions_for(base_url):
+            subscriptions = [WebhookSubscription.objects.create(url=base_url + path, max_concurrency=2)
+                             for path in paths]
+            WebhookDelivery.objects.bulk_create(
+                WebhookDelivery(subscription=subscription, event_type=events.ORDER_CREATED, payload={'n': n})
+                for subscription in subscriptions for n in range(1000)
+            )
+            return subscriptions
+
+        # Each round sends every endpoint at most max_concurrency batches.
+        assert _deliver(receiver, worker, subscriptions_for, rounds=6) == [600] * 5 + [0]
+        assert WebhookDelivery.objects.filter(status=DeliveryStatus.DELIVERED).count() == 3000
+        assert all(len(receiver.received[path]) == 1000 for path in paths)
+        assert receiver.requests == 30  # 100 events per POST
+        assert receiver.bad_signatures == 0
+        assert max(receiver.max_in_flight.values()) <= 2  # per-endpoint concurrency limit
+
+    def test_failing_endpoint_backs_off_then_dead_letters(self, customer):
+        receiver = StubReceiver()
+        worker = webhooks.WebhookWorker(max_attempts=3)
+
+        def subscriptions_for(base_url):
+            subscriptions = [WebhookSubscription.objects.create(url=base_url + '/ok'),
+                             WebhookSubscription.objects.create(url=base_url + '/fail')]
+            for subscription in subscriptions:
+                WebhookDelivery.objects.create(subscription=subscription, event_type=events.ORDER_CREATED,
+                                               payload={})
+            return subscriptions
+
+        # The failed delivery is rescheduled into the future, so the next round finds nothing due.
+        assert _deliver(receiver, worker, subscriptions_for, rounds=2) == [2, 0]
+        failed = WebhookDelivery.objects.get(subscription__url__endswith='/fail')
+        assert failed.status == DeliveryStatus.PENDING
+        assert failed.attempts == 1
+        assert failed.last_error == 'HTTP 500'
+        assert WebhookDelivery.objects.get(subscription__url__endswith='/ok').status == DeliveryStatus.DELIVERED
+
+        # The receiver is gone now; connection errors count as failed attempts too.
+        for _ in range(2):
+            WebhookDelivery.objects.filter(pk=failed.pk).update(next_attempt_at=timezone.now())
+            async_to_sync(self._run_once)(worker)
+
+        failed.refresh_from_db()
+        assert failed.status == DeliveryStatus.DEAD
+        assert failed.attempts == 3
+
+    def test_hanging_endpoint_does_not_hold_up_others(self, customer):
+        receiver = StubReceiver(hang=3.0)
+        worker = webhooks.WebhookWorker(batch_size=1, timeout=1)
+
+        def queue(*subscriptions):
+            for subscription in subscriptions:
+                WebhookDelivery.objects.create(subscription=subscription, event_type=events.ORDER_CREATED, payload={})
+
+        async def received(path, count):
+            while len(receiver.received.get(path, [])) < count:
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            base_url = await receiver.start()
+            stop = asyncio.Event()
+            running = None
+            try:
+                ok, hang = await sync_to_async(lambda: [
+                    WebhookSubscription.objects.create(url=base_url + path, max_concurrency=1)
+                    for path in ('/ok', '/hang')
+                ])()
+                await sync_to_async(queue)(ok, hang)
+                running = asyncio.ensure_future(worker.run(idle_sleep=0.05, stop=stop))
+                await asyncio.wait_for(received('/ok', 1), 10)
+                await sync_to_async(queue)(ok)
+                await asyncio.wait_for(received('/ok', 2), 10)
+                # The second /ok delivery went out while the /hang request was still waiting.
+                return await sync_to_async(
+                    lambda: WebhookDelivery.objects.get(subscription=hang).attempts
+                )()
+            finally:
+                stop.set()
+                if running is not None:
+                    await running
+                await receiver.stop()
+
+        assert async_to_sync(scenario)() == 0
+
+    async def _run_once(self, worker):
+        async with ClientSession() as session:
+            return await worker.run_once(session)
+
+
+@pytest.mark.django_db
+class TestWebhookSubscriptionViews:
+    def test_staff_can_register_subscriptions(self, customer):
+        staff = User.objects.create_user(username='staff', password='pass', phone_number='+254700000003',
+                                         is_staff=True)
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        response = client.post(reverse('webhook-list'), {'url': 'https://example.com/hook',
+                                                         'events': [events.ORDER_CREATED]}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data['secret']) == 64
+
+        response = client.post(reverse('webhook-list'), {'url': 'https://example.com/hook',
+                                                         'events': ['order.exploded']}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_customers_cannot_manage_subscriptions(self, customer):
+        client = APIClient()
+        client.force_authenticate(user=customer)
+
+        response = client.get(reverse('webhook-list'))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
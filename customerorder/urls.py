@@ -1,7 +1,9 @@
 from django.urls import path
 
-from customerorder.views import OrderDetailView, \
-    RegisterView, OrderCreateView, OrderListView, LoginView
+from customerorder.views import CustomerDeleteView, OrderDetailView, \
+    RegisterView, OrderCreateView, OrderListView, LoginView, OrderSearchView, \
+    OrderReportView, WebhookSubscriptionDetailView, WebhookSubscriptionListCreateView, OrderEventTicketView, \
+    order_event_stream
 
 urlpatterns = [
     # URLs for Customer
@@ -9,5 +11,12 @@ urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
     path('orders/', OrderListView.as_view(), name='order-list'),
     path('orders/create/', OrderCreateView.as_view(), name='order-create'),
+    path('orders/search/', OrderSearchView.as_view(), name='order-search'),
+    path('orders/events/', order_event_stream, name='order-events'),
+    path('orders/events/ticket/', OrderEventTicketView.as_view(), name='order-events-ticket'),
     path('orders/<int:pk>/', OrderDetailView.as_view(), name='order-detail'),
+    path('customers/<int:pk>/', CustomerDeleteView.as_view(), name='customer-delete'),
+    path('reports/orders/', OrderReportView.as_view(), name='order-report'),
+    path('webhooks/', WebhookSubscriptionListCreateView.as_view(), name='webhook-list'),
+    path('webhooks/<int:pk>/', WebhookSubscriptionDetailView.as_view(), name='webhook-detail'),
 ]
@@ -0,0 +1,317 @@
+import base64
+import csv
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db.models import Q
+from django.utils import timezone
+from firebase_admin import auth as firebase_auth
+from firebase_admin import exceptions as firebase_exceptions
+
+from .models import User
+from .utils import chunks
+
+logger = logging.getLogger(__name__)
+
+FIREBASE_IMPORT_LIMIT = 1000
+PHONE_RE = re.compile(r'^\+[1-9]\d{6,13}$')  # at most 15 characters, as User.phone_number holds
+UNIQUE_FIELDS = ('username', 'email', 'phone_number', 'uid', 'customer_code')
+TRANSIENT_ERRORS = (
+    firebase_exceptions.UnavailableError,
+    firebase_exceptions.DeadlineExceededError,
+    firebase_exceptions.ResourceExhaustedError,
+    firebase_exceptions.InternalError,
+)
+
+# Records without a uid get one derived from their email, so a resumed import sends Firebase the same uid again.
+UID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'customer-order-system/user-import')
+
+HASH_ALGORITHMS = {
+    'bcrypt': lambda rounds: firebase_auth.UserImportHash.bcrypt(),
+    'pbkdf2_sha256': lambda rounds: firebase_auth.UserImportHash.pbkdf2_sha256(rounds=rounds),
+    'sha256': lambda rounds: firebase_auth.UserImportHash.sha256(rounds=rounds),
+    'sha512': lambda rounds: firebase_auth.UserImportHash.sha512(rounds=rounds),
+}
+
+
+def read_records(path):
+    """
+    Stream user records from a CSV (with header) or NDJSON file, one dict at a time.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        if path.endswith(('.ndjson', '.jsonl')):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(handle)
+
+
+def import_uid(email):
+    """
+    Returns the uid given to an imported user without one: stable for a normalized email.
+    """
+    return uuid.uuid5(UID_NAMESPACE, email).hex
+
+
+def _taken_values(values_by_field):
+    """
+    Returns, per unique field, which of the given values already belong to a local user, in one query.
+    """
+    lookup = Q()
+    for field, values in values_by_field.items():
+        if values:
+            lookup |= Q(**{f'{field}__in': values})
+    taken = {field: set() for field in UNIQUE_FIELDS}
+    if lookup:
+        for row in User.objects.filter(lookup).values_list(*UNIQUE_FIELDS):
+            for field, value in zip(UNIQUE_FIELDS, row):
+                taken[field].add(value)
+    return taken
+
+
+def _conflict(values, taken):
+    return next((field for field, value in values.items() if value and value in taken[field]), None)
+
+
+class Checkpoint:
+    """
+    Persists how many input records have been fully imported so an interrupted run can resume.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path, encoding='utf-8') as handle:
+            return json.load(handle).get('processed', 0)
+
+    def save(self, processed):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump({'processed': processed}, handle)
+        os.replace(tmp_path, self.path)
+
+
+class CustomerCodeAllocator:
+    """
+    Hands out customer codes in the CUST<yyyymmdd><8-digit sequence> format without a query per user.
+    """
+
+    def __init__(self):
+        self.prefix = f"CUST{timezone.now():%Y%m%d}"
+        self.lock = threading.Lock()
+        current = (
+            User.objects.filter(customer_code__startswith=self.prefix)
+            .order_by('-customer_code')
+            .values_list('customer_code', flat=True)
+            .first()
+        )
+        suffix = current[len(self.prefix):] if current else ''
+        self.next_value = int(suffix) + 1 if suffix.isdigit() else 1
+
+    def allocate(self):
+        with self.lock:
+            value = self.next_value
+            self.next_value += 1
+        return f"{self.prefix}{value:08d}"
+
+
+class ImportStats:
+    """
+    Running totals for an import.
+    """
+
+    def __init__(self, processed=0):
+        self.processed = processed
+        self.created = 0
+        self.rejected = 0
+
+
+class UserImporter:
+    """
+    Imports users into Firebase with import_users and creates the matching local User rows in bulk.
+
+    Chunks are validated locally, sent to Firebase by a bounded pool of worker threads,
+    and written to the database in input order so the checkpoint always marks a prefix
+    of the input as done.
+    """
+
+    def __init__(self, auth_client=firebase_auth, chunk_size=FIREBASE_IMPORT_LIMIT, concurrency=4,
+                 hash_alg=None, max_attempts=3, checkpoint=None, on_reject=None, on_progress=None):
+        if not 0 < chunk_size <= FIREBASE_IMPORT_LIMIT:
+            raise ValueError(f"chunk_size must be between 1 and {FIREBASE_IMPORT_LIMIT}.")
+        self.auth = auth_client
+        self.chunk_size = chunk_size
+        self.concurrency = max(1, concurrency)
+        self.hash_alg = hash_alg
+        self.max_attempts = max_attempts
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.on_reject = on_reject or (lambda record, reason: None)
+        self.on_progress = on_progress or (lambda stats: None)
+        self.codes = CustomerCodeAllocator()
+
+    def run(self, records):
+        """
+        Import an iterable of record dicts, skipping any prefix already recorded by the checkpoint.
+        """
+        stats = ImportStats(self.checkpoint.load())
+        records = iter(records)
+        for _ in range(stats.processed):
+            next(records, None)
+
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for chunk in chunks(records, self.chunk_size):
+                accepted = self._validate(chunk, stats)
+                future = pool.submit(self._import_to_firebase, accepted) if accepted else None
+                pending.append((len(chunk), accepted, future))
+                # Keep at most `concurrency` chunks in flight; finish the oldest first.
+                while len(pending) > self.concurrency:
+                    self._finish(pending.popleft(), stats)
+            while pending:
+                self._finish(pending.popleft(), stats)
+        return stats
+
+    def _reject(self, record, reason, stats):
+        stats.rejected += 1
+        self.on_reject(record, reason)
+
+    def _validate(self, chunk, stats):
+        """
+        Normalise and validate a chunk, rejecting records that clash within the chunk or with
+        existing users. Returns (record, values) pairs for the accepted records.
+        """
+        seen = {field: set() for field in UNIQUE_FIELDS}
+        candidates = []
+        for record in chunk:
+            username = (record.get('username') or '').strip()
+            email = (record.get('email') or '').strip().lower()
+            phone_number = (record.get('phone_number') or '').strip()
+            uid = (record.get('uid') or '').strip() or import_uid(email)
+            customer_code = (record.get('customer_code') or '').strip() or None
+            values = {'username': username, 'email': email, 'phone_number': phone_number, 'uid': uid,
+                      'customer_code': customer_code}
+
+            if not username:
+                self._reject(record, "username is required", stats)
+                continue
+            too_long = next((field for field, value in values.items()
+                             if value and len(value) > User._meta.get_field(field).max_length), None)
+            if too_long:
+                max_length = User._meta.get_field(too_long).max_length
+                self._reject(record, f"{too_long} must be at most {max_length} characters", stats)
+                continue
+            try:
+                validate_email(email)
+            except ValidationError:
+                self._reject(record, "invalid email", stats)
+                continue
+            if not PHONE_RE.match(phone_number):
+                self._reject(record, "phone_number must be in E.164 format", stats)
+                continue
+            duplicate = next((field for field, value in values.items() if value and value in seen[field]), None)
+            if duplicate:
+                self._reject(record, f"duplicate {duplicate} in input", stats)
+                continue
+            for field, value in values.items():
+                if value:
+                    seen[field].add(value)
+            candidates.append((record, values))
+
+        # One query finds every chunk value that already belongs to a local user.
+        taken = _taken_values(seen) if candidates else {}
+
+        accepted = []
+        for record, values in candidates:
+            conflict = _conflict(values, taken)
+            if conflict:
+                self._reject(record, f"{conflict} already exists", stats)
+                continue
+            accepted.append((record, values))
+        return accepted
+
+    def _firebase_record(self, record, values):
+        password_hash = record.get('password_hash')
+        password_salt = record.get('password_salt')
+        return firebase_auth.ImportUserRecord(
+            uid=values['uid'],
+            email=values['email'],
+            phone_number=values['phone_number'],
+            display_name=values['username'],
+            password_hash=base64.b64decode(password_hash) if password_hash else None,
+            password_salt=base64.b64decode(password_salt) if password_salt else None,
+        )
+
+    def _import_to_firebase(self, accepted):
+        """
+        Send one chunk to Firebase, retrying transient failures with backoff.
+        Returns the chunk positions Firebase rejected, mapped to the reason.
+        """
+        users = [self._firebase_record(record, values) for record, values in accepted]
+        has_hashes = any(user.password_hash for user in users)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                result = self.auth.import_users(users, hash_alg=self.hash_alg if has_hashes else None)
+                return {error.index: error.reason for error in result.errors}
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_attempts:
+                    raise
+                logger.warning(f"Firebase import attempt {attempt} failed: {e}")
+                time.sleep(2 ** attempt)
+
+    def _finish(self, entry, stats):
+        """
+        Wait for a chunk's Firebase import and create the local users that succeeded.
+        """
+        size, accepted, future = entry
+        failures = future.result() if future else {}
+        imported = []
+        for index, (record, values) in enumerate(accepted):
+            if index in failures:
+                self._reject(record, f"firebase: {failures[index]}", stats)
+                continue
+            imported.append((record, values))
+
+        # Earlier chunks of this run, or other writers, may have taken values since validation.
+        taken = _taken_values({field: {values[field] for _, values in imported} for field in UNIQUE_FIELDS})
+        users = {}
+        for record, values in imported:
+            conflict = _conflict(values, taken)
+            if conflict:
+                self._reject(record, f"{conflict} already exists", stats)
+                continue
+            users[values['uid']] = (record, User(
+                username=values['username'],
+                email=values['email'],
+                phone_number=values['phone_number'],
+                uid=values['uid'],
+                customer_code=values['customer_code'] or self.codes.allocate(),
+                password=make_password(None),
+            ))
+        User.objects.bulk_create([user for _, user in users.values()], batch_size=self.chunk_size,
+                                 ignore_conflicts=True)
+
+        # Rows that still lost a race were dropped by ignore_conflicts; only count what was inserted.
+        created = set(User.objects.filter(uid__in=users).values_list('uid', flat=True))
+        for uid, (record, _) in users.items():
+            if uid not in created:
+                self._reject(record, "conflicts with a user created during the import", stats)
+        stats.created += len(created)
+        stats.processed += size
+        self.checkpoint.save(stats.processed)
+        self.on_progress(stats)
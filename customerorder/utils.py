@@ -16,3 +16,17 @@ def refresh_firebase_token(refresh_token):
         return response.json()['id_token']
     else:
         raise Exception('Could not refresh token')
+
+
+def chunks(records, size):
+    """
+    Group an iterable into lists of at most `size` items.
+    """
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -1,17 +1,33 @@
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from firebase_admin import auth as firebase_auth
 from rest_framework import generics, status
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 import logging
 from .africastalking_utils import send_sms_alert
 from .authentication import FirebaseAuthentication
-from .models import Order, User
-from .serializers import OrderSerializer, UserSerializer
+from . import events
+from .events import stream_events
+from . import deletion, rollups, sharding
+from .models import Order, User, WebhookSubscription
+from .renderers import MessagePackParser, MessagePackRenderer
+from .search import SEARCH_MODES, search_orders
+from .serializers import OrderEventTicketSerializer, OrderReportBucketSerializer, OrderReportQuerySerializer, \
+    OrderSerializer, UserSerializer, WebhookSubscriptionSerializer
 
 logger = logging.getLogger(__name__)
 
+# Order endpoints also speak MessagePack for service-to-service callers.
+ORDER_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, MessagePackRenderer]
+ORDER_PARSER_CLASSES = [*api_settings.DEFAULT_PARSER_CLASSES, MessagePackParser]
+
 class RegisterView(generics.CreateAPIView):
     """
     API view for user registration. Creates a Firebase user and saves them in the local database.
@@ -107,11 +123,14 @@ class OrderCreateView(generics.CreateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [FirebaseAuthentication]
+    renderer_classes = ORDER_RENDERER_CLASSES
+    parser_classes = ORDER_PARSER_CLASSES
 
     def perform_create(self, serializer):
         """
         Automatically associate the order with the authenticated user and send an SMS alert.
         """
+        sharding.ensure_writable(self.request.user)
         order = serializer.save(customer=self.request.user)
 
         send_sms_alert(
@@ -130,12 +149,29 @@ class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [FirebaseAuthentication]
+    renderer_classes = ORDER_RENDERER_CLASSES
+    parser_classes = ORDER_PARSER_CLASSES
 
     def get_queryset(self):
         """
-        Filter orders to only include those belonging to the authenticated user.
+        Filter orders to only include those belonging to the authenticated user, on the user's shard.
+        """
+        user = self.request.user
+        return sharding.with_customers(self.queryset.using(sharding.shard_for_customer(user)).filter(customer=user))
+
+    def perform_update(self, serializer):
+        """
+        Save the changes unless the user's orders are being moved to another shard.
+        """
+        sharding.ensure_writable(self.request.user)
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        """
+        Soft-delete the order; the purge_deleted command removes it later.
         """
-        return self.queryset.filter(customer=self.request.user)
+        sharding.ensure_writable(self.request.user)
+        deletion.soft_delete_order(instance, using=instance._state.db)
 
 class OrderListView(generics.ListAPIView):
     """
@@ -145,9 +181,174 @@ class OrderListView(generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [FirebaseAuthentication]
+    renderer_classes = ORDER_RENDERER_CLASSES
+    parser_classes = ORDER_PARSER_CLASSES
 
     def get_queryset(self):
         """
-        Return orders for the authenticated user.
+        Return orders for the authenticated user, read from the user's shard.
+        """
+        user = self.request.user
+        return sharding.with_customers(self.queryset.using(sharding.shard_for_customer(user)).filter(customer=user))
+
+
+class OrderSearchPagination(PageNumberPagination):
+    """
+    Pagination for order search results.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class OrderSearchView(generics.ListAPIView):
+    """
+    API view to search orders by item text, ranked by relevance.
+    Customers search their own orders; staff search globally or pass `customer` to scope.
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [FirebaseAuthentication]
+    renderer_classes = ORDER_RENDERER_CLASSES
+    parser_classes = ORDER_PARSER_CLASSES
+    pagination_class = OrderSearchPagination
+
+    def get_queryset(self):
+        """
+        Run the search described by the `q`, `mode` and `customer` query parameters.
+        """
+        params = self.request.query_params
+        query = params.get('q', '').strip()
+        mode = params.get('mode', 'prefix')
+
+        if not query:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        if mode not in SEARCH_MODES:
+            raise ValidationError({'mode': f"Must be one of: {', '.join(SEARCH_MODES)}."})
+
+        customer = self.request.user
+        if self.request.user.is_staff:
+            customer = params.get('customer') or None
+            if customer is not None:
+                if not customer.isdigit():
+                    raise ValidationError({'customer': 'Must be a customer id.'})
+                customer = int(customer)
+
+        return search_orders(query, customer=customer, mode=mode)
+
+
+class OrderReportView(generics.GenericAPIView):
+    """
+    API view reporting order volume and revenue over time, read from the pre-aggregated rollups.
+    """
+    serializer_class = OrderReportBucketSerializer
+    permission_classes = [IsAdminUser]
+    authentication_classes = [FirebaseAuthentication]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Return per-bucket counts and revenue for the requested range and granularity.
+        """
+        query = OrderReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        buckets = rollups.report(**query.validated_data)
+        serializer = self.get_serializer(buckets, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class CustomerDeleteView(generics.DestroyAPIView):
+    """
+    API view for staff to delete a customer. The customer is deactivated immediately;
+    their orders and the user row are removed in the background by purge_deleted.
+    """
+    queryset = User.objects.filter(deleted_at__isnull=True)
+    serializer_class = UserSerializer
+    permission_classes = [IsAdminUser]
+    authentication_classes = [FirebaseAuthentication]
+
+    def perform_destroy(self, instance):
+        """
+        Soft-delete the customer instead of cascading over their orders in this request.
         """
-        return self.queryset.filter(customer=self.request.user)
+        deletion.soft_delete_customer(instance)
+
+
+class WebhookSubscriptionListCreateView(generics.ListCreateAPIView):
+    """
+    API view for staff to list and register webhook subscriptions.
+    """
+    queryset = WebhookSubscription.objects.order_by('id')
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [IsAdminUser]
+    authentication_classes = [FirebaseAuthentication]
+
+
+class WebhookSubscriptionDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    API view for staff to retrieve, update, or remove a webhook subscription.
+    """
+    queryset = WebhookSubscription.objects.all()
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [IsAdminUser]
+    authentication_classes = [FirebaseAuthentication]
+
+
+class OrderEventTicketView(generics.GenericAPIView):
+    """
+    API view issuing a short-lived ticket for the order event stream, for clients such as
+    browsers' EventSource that cannot send an Authorization header.
+    """
+    serializer_class = OrderEventTicketSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [FirebaseAuthentication]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Issue a stream ticket for the authenticated user.
+        """
+        serializer = self.get_serializer({'ticket': events.issue_ticket(request.user),
+                                          'expires_in': events.TICKET_MAX_AGE})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+def _stream_user(request):
+    """
+    Authenticate a stream request by its `?ticket=` or its Firebase bearer token.
+    """
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = events.ticket_user_id(ticket)
+        user = User.objects.filter(pk=user_id, is_active=True).first() if user_id else None
+        if user is None:
+            raise AuthenticationFailed('Invalid or expired ticket.')
+        return user
+    result = FirebaseAuthentication().authenticate(request)
+    return result[0] if result else None
+
+
+@require_GET
+async def order_event_stream(request):
+    """
+    Server-Sent Events stream of the authenticated customer's order events.
+
+    Browsers' EventSource cannot set headers, so it passes a ticket from OrderEventTicketView
+    as `?ticket=` instead of the Firebase token, which would end up in access logs.
+    Reconnecting clients resume from the `Last-Event-ID` header.
+    Serve this view from an ASGI worker; under WSGI every open stream holds a thread.
+    """
+    try:
+        user = await sync_to_async(_stream_user)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_event_id = int(last_event_id) if last_event_id.isdigit() else None
+
+    response = StreamingHttpResponse(stream_events(user.pk, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,282 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+from datetime import timedelta
+
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DeliveryStatus, WebhookDelivery, WebhookSubscription
+from .sharding import assign_ids, delivery_ids, order_shards
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTIONS_CACHE_KEY = 'webhook-subscriptions'
+SUBSCRIPTIONS_CACHE_TIMEOUT = getattr(settings, 'WEBHOOK_SUBSCRIPTIONS_CACHE_TIMEOUT', 30)
+SIGNATURE_HEADER = 'X-Webhook-Signature'
+MAX_ATTEMPTS = getattr(settings, 'WEBHOOK_MAX_ATTEMPTS', 8)
+BACKOFF_BASE_SECONDS = getattr(settings, 'WEBHOOK_BACKOFF_BASE_SECONDS', 5)
+BACKOFF_MAX_SECONDS = getattr(settings, 'WEBHOOK_BACKOFF_MAX_SECONDS', 3600)
+
+
+def sign(secret, timestamp, body):
+    """
+    Returns the HMAC-SHA256 signature of a request body, bound to its timestamp.
+    """
+    message = f"{timestamp}.".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def signature_header(secret, body, timestamp=None):
+    """
+    Build the value of the X-Webhook-Signature header: `t=<unix time>,v1=<signature>`.
+    """
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    return f"t={timestamp},v1={sign(secret, timestamp, body)}"
+
+
+def verify_signature(secret, body, header, tolerance=300):
+    """
+    Check an X-Webhook-Signature header, as a receiver would.
+    """
+    try:
+        parts = dict(part.split('=', 1) for part in header.split(','))
+        timestamp = int(parts['t'])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(parts.get('v1', ''), sign(secret, timestamp, body))
+
+
+def backoff_delay(attempts):
+    """
+    Exponential backoff for the given number of failed attempts, jittered so endpoints
+    that fail together do not retry in lockstep.
+    """
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return random.uniform(delay / 2, delay)
+
+
+def active_subscriptions():
+    """
+    Returns the active subscriptions, cached for WEBHOOK_SUBSCRIPTIONS_CACHE_TIMEOUT seconds.
+    Saving or deleting a subscription drops the cached list at once for every process sharing
+    the cache; the timeout bounds how long changes the signal does not see (QuerySet.update(),
+    a per-process cache) take to apply.
+    """
+    subscriptions = cache.get(SUBSCRIPTIONS_CACHE_KEY)
+    if subscriptions is None:
+        subscriptions = list(WebhookSubscription.objects.filter(is_active=True).only('id', 'events', 'customer'))
+        cache.set(SUBSCRIPTIONS_CACHE_KEY, subscriptions, SUBSCRIPTIONS_CACHE_TIMEOUT)
+    return subscriptions
+
+
+def invalidate_subscriptions():
+    cache.delete(SUBSCRIPTIONS_CACHE_KEY)
+
+
+def enqueue(event_type, payload, customer_id, using='default'):
+    """
+    Queue an event for every subscription that wants it. This is a single INSERT in the
+    order's transaction; delivery happens in the webhook worker, outside the request.
+    """
+    return enqueue_many([(event_type, payload, customer_id)], using=using)
+
+
+def enqueue_many(order_events, using='default'):
+    """
+    Queue many (event type, payload, customer id) events with a single INSERT, e.g. for
+    a bulk change to many orders.
+    """
+    subscriptions = active_subscriptions()
+    deliveries = [
+        WebhookDelivery(subscription_id=subscription.id, event_type=event_type, payload=payload)
+        for event_type, payload, customer_id in order_events
+        for subscription in subscriptions
+        if subscription.wants(event_type, customer_id)
+    ]
+    if deliveries:
+        WebhookDelivery.objects.using(using).bulk_create(assign_ids(deliveries, delivery_ids))
+    return len(deliveries)
+
+
+class WebhookWorker:
+    """
+    Delivers queued webhook events with asyncio.
+
+    Every active subscription is served by its own loop, so a slow or failing endpoint only
+    delays its own deliveries. Each wave leases at most `max_concurrency` batches of one
+    subscription's due deliveries, by pushing their next attempt past the lease, and sends
+    them at once (one signed POST per batch). A wave therefore takes at most `timeout`
+    seconds, shorter than the lease, so no other worker re-sends deliveries still in flight.
+    Failed batches are retried with exponential backoff until MAX_ATTEMPTS, after which they
+    are dead-lettered.
+    """
+
+    def __init__(self, batch_size=100, timeout=10, lease_seconds=60, max_attempts=MAX_ATTEMPTS):
+        if timeout >= lease_seconds:
+            raise ValueError("timeout must be shorter than lease_seconds.")
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.subscriptions = {}
+
+    def refresh_subscriptions(self):
+        """
+        Reload the active subscriptions. Pending deliveries whose subscription was deleted are
+        dead-lettered; the subscriptions live on `default`, so deleting one cannot cascade to a shard.
+        """
+        subscriptions = WebhookSubscription.objects.in_bulk()
+        for alias in order_shards():
+            WebhookDelivery.objects.using(alias).filter(status=DeliveryStatus.PENDING) \
+                .exclude(subscription_id__in=list(subscriptions)) \
+                .update(status=DeliveryStatus.DEAD, last_error='Subscription was deleted.')
+        self.subscriptions = {pk: subscription for pk, subscription in subscriptions.items() if subscription.is_active}
+        return self.subscriptions
+
+    def claim(self, subscription):
+        """
+        Lease up to `max_concurrency` batches of a subscription's due deliveries from the order
+        shards, so no other worker picks them up meanwhile. Returns the batches.
+        """
+        batches = []
+        for alias in order_shards():
+            slots = subscription.max_concurrency - len(batches)
+            if slots <= 0:
+                break
+            now = timezone.now()
+            deliveries = WebhookDelivery.objects.using(alias)
+            with transaction.atomic(using=alias):
+                due = (
+                    deliveries
+                    .filter(status=DeliveryStatus.PENDING, next_attempt_at__lte=now, subscription_id=subscription.id)
+                    .order_by('next_attempt_at')
+                )
+                if connections[alias].features.has_select_for_update_skip_locked:
+                    due = due.select_for_update(skip_locked=True)
+                claimed = list(due[:slots * self.batch_size])
+                deliveries.filter(id__in=[d.id for d in claimed]).update(
+                    next_attempt_at=now + timedelta(seconds=self.lease_seconds)
+                )
+            for delivery in claimed:
+                delivery.subscription = subscription
+            batches.extend(claimed[start:start + self.batch_size] for start in range(0, len(claimed), self.batch_size))
+        return batches
+
+    def record_success(self, batch):
+        WebhookDelivery.objects.using(batch[0]._state.db).filter(id__in=[d.id for d in batch]).update(
+            status=DeliveryStatus.DELIVERED, attempts=F('attempts') + 1,
+            delivered_at=timezone.now(), last_error='',
+        )
+
+    def record_failure(self, batch, error):
+        """
+        Schedule a retry for a failed batch, or dead-letter it when out of attempts.
+        """
+        attempts = max(delivery.attempts for delivery in batch) + 1
+        deliveries = WebhookDelivery.objects.using(batch[0]._state.db).filter(id__in=[d.id for d in batch])
+        if attempts >= self.max_attempts:
+            deliveries.update(status=DeliveryStatus.DEAD, attempts=attempts, last_error=error[:1000])
+            logger.warning(f"Dead-lettered {len(batch)} webhook deliveries after {attempts} attempts: {error}")
+            return
+        deliveries.update(
+            attempts=attempts, last_error=error[:1000],
+            next_attempt_at=timezone.now() + timedelta(seconds=backoff_delay(attempts)),
+        )
+
+    async def send_batch(self, session, subscription, batch):
+        """
+        POST one batch of events to a subscription's endpoint.
+        """
+        body = json.dumps({
+            'deliveries': [
+                {'id': delivery.id, 'event': delivery.event_type, 'data': delivery.payload}
+                for delivery in batch
+            ],
+        }).encode()
+        headers = {'Content-Type': 'application/json', SIGNATURE_HEADER: signature_header(subscription.secret, body)}
+
+        error = None
+        try:
+            async with session.post(subscription.url, data=body, headers=headers) as response:
+                if response.status >= 300:
+                    error = f"HTTP {response.status}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = f"{type(e).__name__}: {e}"
+
+        if error is None:
+            await sync_to_async(self.record_success)(batch)
+        else:
+            await sync_to_async(self.record_failure)(batch, error)
+        return error is None
+
+    async def send_wave(self, session, subscription):
+        """
+        Claim and send one wave of a subscription's due deliveries. Returns how many were attempted.
+        """
+        batches = await sync_to_async(self.claim)(subscription)
+        await asyncio.gather(*(self.send_batch(session, subscription, batch) for batch in batches))
+        return sum(len(batch) for batch in batches)
+
+    async def run_once(self, session):
+        """
+        Send one wave to every active subscription. Returns how many deliveries were attempted.
+        """
+        subscriptions = await sync_to_async(self.refresh_subscriptions)()
+        sent = await asyncio.gather(*(self.send_wave(session, subscription)
+                                      for subscription in subscriptions.values()))
+        return sum(sent)
+
+    async def serve(self, session, subscription_id, idle_sleep, stop):
+        """
+        Send waves to one subscription until `stop` is set or the subscription goes away.
+        """
+        while not stop.is_set() and subscription_id in self.subscriptions:
+            if not await self.send_wave(session, self.subscriptions[subscription_id]):
+                await _wait(stop, idle_sleep)
+
+    async def run(self, idle_sleep=1.0, stop=None):
+        """
+        Deliver continuously until `stop` (an asyncio.Event) is set. The subscription list is
+        reloaded every `idle_sleep` seconds; each active subscription is served by its own task.
+        """
+        stop = stop or asyncio.Event()
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        tasks = {}
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            try:
+                while not stop.is_set():
+                    for subscription_id in await sync_to_async(self.refresh_subscriptions)():
+                        task = tasks.get(subscription_id)
+                        if task is None or task.done():
+                            if task is not None:
+                                task.result()  # re-raise what stopped it
+                            tasks[subscription_id] = asyncio.ensure_future(
+                                self.serve(session, subscription_id, idle_sleep, stop)
+                            )
+                    await _wait(stop, idle_sleep)
+            finally:
+                # Serving tasks stop after their current wave.
+                stop.set()
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+
+async def _wait(stop, seconds):
+    """
+    Sleep for `seconds`, or until `stop` is set.
+    """
+    try:
+        await asyncio.wait_for(stop.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
@@ -0,0 +1,46 @@
+"""
+Gunicorn configuration for serving customer_order_service in production.
+
+Every setting can be tuned from the environment so the same image works on
+machines of different sizes:
+
+    GUNICORN_BIND             address to listen on (default 0.0.0.0:8000)
+    WEB_CONCURRENCY           worker processes (default 2 * CPUs + 1)
+    GUNICORN_THREADS          threads per worker for the gthread worker (default 4)
+    GUNICORN_WORKER_CLASS     worker class (default gthread)
+    GUNICORN_TIMEOUT          seconds before a silent worker is killed (default 30)
+    GUNICORN_GRACEFUL_TIMEOUT seconds workers get to finish requests on reload/stop (default 30)
+    GUNICORN_KEEPALIVE        keep-alive seconds for idle client connections (default 5)
+    GUNICORN_MAX_REQUESTS     recycle a worker after this many requests, 0 to disable (default 1000)
+
+The application is preloaded in the master so workers share its memory
+copy-on-write. Because the master holds the loaded code, `kill -HUP` only
+restarts workers with the same code; to roll out new code without dropping
+requests send `USR2` (start a new master), then `WINCH` and `QUIT` to the old one.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """
+    Drop database connections inherited from the master so workers never share a socket.
+    """
+    from django.db import connections
+
+    connections.close_all()